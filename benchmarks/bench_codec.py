@@ -0,0 +1,93 @@
+"""Compare stdlib json with src.app.utils.codec on the payloads we actually store.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_codec
+"""
+from __future__ import annotations
+
+import json
+import time
+import timeit
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.app.utils import codec
+
+
+def _services(n: int = 180) -> List[Dict[str, Any]]:
+    return [
+        {"id": str(i), "name": f"سرویس {i}", "name_en": f"Service {i}", "active": 1}
+        for i in range(n)
+    ]
+
+
+def _countries(n: int = 160) -> List[Dict[str, Any]]:
+    return [
+        {"id": str(i), "name": f"کشور {i}", "name_en": f"Country {i}", "emoji": "🇮🇷", "active": 1}
+        for i in range(n)
+    ]
+
+
+def payloads() -> Dict[str, Any]:
+    now = int(time.time())
+    order = {
+        "id": "74001",
+        "number": "+79313226657",
+        "amount": "2200",
+        "time": "00:20:00",
+        "repeat": "1",
+        "ts": now,
+        "expire_ts": now + 1200,
+        "status": "active",
+        "provider": "numberland",
+    }
+    return {
+        "wallet_tx": {"type": "debit", "amount": 2200, "ts": now, "meta": "order:numberland:74001"},
+        "topup": {"user_id": 123456789, "amount": 500000, "status": "pending"},
+        "order": order,
+        "active_order_code": dict(order, status="code", code="52871"),
+        # FSM data during the buy flow carries the whole catalog page source
+        "fsm_buy_flow": {
+            "services": _services(),
+            "countries": _countries(),
+            "sv_page": 3,
+            "ct_page": 1,
+            "lang": "fa",
+            "provider_key": "numberland",
+            "service_id": "1",
+            "country_id": "8",
+            "operator": "any",
+            "quote": {"amount": 1700, "final_price": 2100, "count": 1087, "repeat": "1", "time": "00:20:00"},
+        },
+    }
+
+
+def _stdlib_dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _bench(fn: Callable[[], Any], number: int) -> float:
+    best = min(timeit.repeat(fn, number=number, repeat=5))
+    return best / number * 1e6  # µs per call
+
+
+def run(number: int = 2000) -> List[Tuple[str, str, float, float]]:
+    rows: List[Tuple[str, str, float, float]] = []
+    for name, obj in payloads().items():
+        encoded_std = _stdlib_dumps(obj)
+        encoded_fast = codec.dumps(obj)
+        n = number if name != "fsm_buy_flow" else max(1, number // 20)
+        rows.append(("dumps", name, _bench(lambda: _stdlib_dumps(obj), n), _bench(lambda: codec.dumps(obj), n)))
+        rows.append(("loads", name, _bench(lambda: json.loads(encoded_std), n), _bench(lambda: codec.loads(encoded_fast), n)))
+    return rows
+
+
+def main() -> None:
+    print(f"codec backend: {codec.BACKEND}")
+    print(f"{'op':<6} {'payload':<18} {'json µs':>10} {'codec µs':>10} {'speedup':>8}")
+    for op, name, std, fast in run():
+        print(f"{op:<6} {name:<18} {std:>10.2f} {fast:>10.2f} {std / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Bulk price sheet vs the scalar calculate_price loop over a synthetic tariff table.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_price_sheet
+"""
+from __future__ import annotations
+
+import random
+import time
+from typing import Any, Dict, List
+
+from src.app.services.pricing import (
+    PricingEngine,
+    PricingIndex,
+    PricingRule,
+    calculate_price,
+    calculate_prices_bulk,
+    round_to_step,
+)
+
+
+def tariff_table(services: int = 60, countries: int = 90, operators: int = 4, seed: int = 7) -> List[Dict[str, Any]]:
+    rnd = random.Random(seed)
+    rows: List[Dict[str, Any]] = []
+    for sv in range(1, services + 1):
+        for ct in range(1, countries + 1):
+            for op in range(1, operators + 1):
+                rows.append({
+                    "service": str(sv),
+                    "country": str(ct),
+                    "operator": str(op),
+                    "amount": rnd.choice([0, 850, 1200, 1700, 2200, 4999, 12500, 33333]) + rnd.randint(0, 99),
+                    "count": rnd.randint(0, 2000),
+                })
+    return rows
+
+
+def engine_with_rules() -> PricingEngine:
+    engine = PricingEngine()
+    engine._index = PricingIndex([
+        PricingRule(scope="global", margin_percent=18.5, round_to=100),
+        PricingRule(scope="service", service_id="1", margin_percent=35, min_margin=700),
+        PricingRule(scope="country", country_id="8", round_to=500),
+        PricingRule(scope="operator", operator="4", min_margin=1500),
+        PricingRule(scope="combo", service_id="2", country_id="8", operator="1", margin_percent=7.25, round_to=0),
+    ])
+    return engine
+
+
+def main() -> None:
+    rows = tariff_table()
+    engine = engine_with_rules()
+    quads = [(r["service"], r["country"], r["operator"], r["amount"]) for r in rows]
+
+    # warm the rule-resolution memo so both sides measure only price math
+    engine.quote_bulk(quads)
+
+    t0 = time.perf_counter()
+    resolve = engine.index.resolve
+    scalar = [calculate_price(base, resolve(sv, ct, op)) for sv, ct, op, base in quads]
+    t_scalar = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    bulk = engine.quote_bulk(quads)
+    t_bulk = time.perf_counter() - t0
+
+    assert bulk == scalar, "bulk pricing diverged from calculate_price"
+
+    # price math only, parameters already resolved per row
+    params = [engine.index.params(sv, ct, op) for sv, ct, op, _ in quads]
+    bases = [q[3] for q in quads]
+    margins, steps, mins = (list(x) for x in zip(*params))
+
+    t0 = time.perf_counter()
+    kernel_scalar = []
+    for base, m, step, mm in zip(bases, margins, steps, mins):
+        price = round_to_step(base * (1.0 + m / 100.0), step)
+        if price - base < mm:
+            price = round_to_step(base + mm, step)
+        kernel_scalar.append(price)
+    t_kscalar = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    kernel_bulk = calculate_prices_bulk(bases, margins, steps, mins)
+    t_kbulk = time.perf_counter() - t0
+    assert kernel_bulk == kernel_scalar
+
+    print(f"rows: {len(rows)}")
+    print(f"end-to-end  scalar loop : {t_scalar * 1000:8.2f} ms")
+    print(f"end-to-end  bulk        : {t_bulk * 1000:8.2f} ms  ({t_scalar / t_bulk:.1f}x)")
+    print(f"price math  scalar loop : {t_kscalar * 1000:8.2f} ms")
+    print(f"price math  vectorized  : {t_kbulk * 1000:8.2f} ms  ({t_kscalar / t_kbulk:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Replay recorded provider traffic through the real parsing paths.
+
+Cassettes come from running the bot with HTTP_CASSETTE_MODE=record (against
+the real APIs or the `python -m src.app.sandbox` stand-ins); these cases look
+in --cassettes (default HTTP_CASSETTE_DIR) and are skipped when nothing was
+recorded. One op is a pass over the whole cassette with no delay, so
+timings cover request building, the httpx client round trip, JSON decoding
+and RESULT handling on real payload sizes.
+"""
+from __future__ import annotations
+
+import os
+from typing import List, Optional, Tuple
+
+import httpx
+
+from benchmarks.registry import case
+from src.app.providers.base import ProviderAPIError
+from src.app.providers.onlinesim.adapter import _HTTP as OnlineSimHTTP
+from src.app.services.cassettes import Cassette, ReplayTransport, cassette_path
+from src.app.services.numberland_client import NumberlandClient, NumberlandError
+
+
+def _load(options, provider: str) -> Optional[Cassette]:
+    for gz in (False, True):
+        path = cassette_path(provider, options.cassettes or None, gz=gz)
+        if os.path.exists(path):
+            cassette = Cassette.load(path)
+            return cassette if cassette.items else None
+    return None
+
+
+def _calls(cassette: Cassette) -> List[Tuple[str, dict]]:
+    return [(it.path, dict(it.query)) for it in cassette.items]
+
+
+@case("cassette.numberland.replay")
+def nl_replay(options):
+    cassette = _load(options, "numberland")
+    if cassette is None:
+        return None
+    cl = NumberlandClient(api_key="bench")
+    cl._client = httpx.AsyncClient(transport=ReplayTransport(cassette, speed=0))
+    calls = [(q.pop("method", ""), q) for _path, q in _calls(cassette)]
+
+    async def run():
+        for method, params in calls:
+            try:
+                await cl._get(method, params)
+            except NumberlandError:
+                pass
+
+    return run
+
+
+@case("cassette.onlinesim.replay")
+def os_replay(options):
+    cassette = _load(options, "onlinesim")
+    if cassette is None:
+        return None
+    http = OnlineSimHTTP("bench")
+    http._client = httpx.AsyncClient(transport=ReplayTransport(cassette, speed=0))
+    calls = [(path.rsplit("/", 1)[-1], q) for path, q in _calls(cassette)]
+
+    async def run():
+        for endpoint, params in calls:
+            try:
+                await http.get(endpoint, params)
+            except ProviderAPIError:
+                pass
+
+    return run
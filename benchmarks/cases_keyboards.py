@@ -0,0 +1,63 @@
+"""Inline keyboard builders from main.py (rendered on almost every callback) and message lookups."""
+from __future__ import annotations
+
+from benchmarks.registry import case
+from src.app import main as bot
+
+SERVICES = [
+    {"id": str(i), "name": f"سرویس {i}", "name_en": f"Service {i}", "active": 1 if i % 13 else 0}
+    for i in range(1, 181)
+]
+COUNTRIES = [
+    {"id": str(i), "name": f"کشور {i}", "name_en": f"Country {i}", "emoji": "🇮🇷", "active": 1}
+    for i in range(1, 161)
+]
+SERVICE_FLOORS = {str(i): 1200 + i * 100 for i in range(1, 181, 2)}
+COUNTRY_FLOORS = {str(i): 2500 + i * 10 for i in range(1, 161)}
+
+
+@case("keyboards.main_kb")
+def main_kb(_options):
+    return lambda: bot.main_kb("fa", "numberland")
+
+
+@case("keyboards.services_kb.page0")
+def services_first(_options):
+    return lambda: bot.services_kb(SERVICES, 0, 8, "fa", SERVICE_FLOORS)
+
+
+@case("keyboards.services_kb.last_page")
+def services_last(_options):
+    last = (len(SERVICES) - 1) // 8
+    return lambda: bot.services_kb(SERVICES, last, 8, "en", SERVICE_FLOORS)
+
+
+@case("keyboards.countries_kb.page5")
+def countries_mid(_options):
+    return lambda: bot.countries_kb(COUNTRIES, 5, 8, "en", COUNTRY_FLOORS)
+
+
+@case("keyboards.operators_kb")
+def operators(_options):
+    return lambda: bot.operators_kb("ru")
+
+
+@case("keyboards.status_kb")
+def status(_options):
+    return lambda: bot.status_kb("fa", "numberland", "74001")
+
+
+@case("i18n.tr.plain", ops=3)
+def tr_plain(_options):
+    from src.app.i18n import tr
+
+    return lambda: (tr("buy.choose_service", "fa"), tr("common.back", "en"), tr("menu.wallet", "de"))
+
+
+@case("i18n.tr.template")
+def tr_template(_options):
+    from src.app.i18n import tr
+
+    return lambda: tr(
+        "buy.quote", "fa", count=120, amount=2200, price=2700, repeat=tr("common.yes", "fa"), time="00:20:00"
+    )
@@ -0,0 +1,44 @@
+"""Permanent number index: building it from a provider list and answering browser filters."""
+from __future__ import annotations
+
+from benchmarks.registry import case
+from src.app.sandbox.market import SandboxConfig, SandboxMarket
+from src.app.services.perm_numbers import PermCatalog
+
+ROWS = SandboxMarket(SandboxConfig(perm_numbers=5000)).perm_numbers
+QUERIES = ["1234", "555", "0000", "98", "2468", "70"]
+
+
+@case("perm_numbers.build.5k")
+def build(_options):
+    return lambda: PermCatalog.build("sandbox", ROWS)
+
+
+@case("perm_numbers.select.tag")
+def select_tag(_options):
+    cat = PermCatalog.build("sandbox", ROWS)
+    return lambda: cat.select("repeat")
+
+
+@case("perm_numbers.select.contains", ops=len(QUERIES))
+def select_contains(_options):
+    cat = PermCatalog.build("sandbox", ROWS)
+
+    def run():
+        for q in QUERIES:
+            cat.select(None, q)
+
+    return run
+
+
+@case("perm_numbers.select.scan_baseline", ops=len(QUERIES))
+def scan_baseline(_options):
+    # what select(None, q) replaces: a substring test over every number
+    cat = PermCatalog.build("sandbox", ROWS)
+    numbers = cat.numbers
+
+    def run():
+        for q in QUERIES:
+            [n for n in numbers if q in n.digits]
+
+    return run
@@ -0,0 +1,58 @@
+"""Scalar pricing: calculate_price / round_to_step and rule resolution."""
+from __future__ import annotations
+
+import random
+
+from benchmarks.registry import case
+from src.app.services.pricing import PricingIndex, PricingRule, calculate_price, round_to_step
+
+_rnd = random.Random(11)
+BASES = [_rnd.randint(300, 40_000) for _ in range(1000)]
+RULE = PricingRule(scope="service", service_id="1", margin_percent=22.5, min_margin=700, round_to=500)
+
+
+@case("pricing.round_to_step", ops=len(BASES))
+def round_step(_options):
+    def run():
+        for b in BASES:
+            round_to_step(b * 1.225, 100)
+
+    return run
+
+
+@case("pricing.calculate_price.default", ops=len(BASES))
+def calc_default(_options):
+    def run():
+        for b in BASES:
+            calculate_price(b)
+
+    return run
+
+
+@case("pricing.calculate_price.rule", ops=len(BASES))
+def calc_rule(_options):
+    def run():
+        for b in BASES:
+            calculate_price(b, RULE)
+
+    return run
+
+
+@case("pricing.index.resolve_cold", ops=240)
+def resolve_cold(_options):
+    rules = [
+        PricingRule(scope="global", margin_percent=18.5, round_to=100),
+        PricingRule(scope="service", service_id="1", margin_percent=35),
+        PricingRule(scope="country", country_id="8", round_to=500),
+        PricingRule(scope="operator", operator="4", min_margin=1500),
+        PricingRule(scope="combo", service_id="2", country_id="8", operator="1", margin_percent=7.25),
+    ]
+    keys = [(str(sv), str(ct), str(op)) for sv in range(1, 7) for ct in range(1, 11) for op in range(1, 5)]
+
+    def run():
+        # fresh index each call: measures precedence resolution, not the memo lookup
+        index = PricingIndex(rules)
+        for sv, ct, op in keys:
+            index.resolve(sv, ct, op)
+
+    return run
@@ -0,0 +1,140 @@
+"""Provider response handling without the network.
+
+Numberland goes through the real NumberlandClient._get over an httpx
+MockTransport (request building, JSON decode, RESULT checks). OnlineSim's
+HTTP layer is replaced with canned payloads so only tariff normalization
+and the status heuristics are measured.
+"""
+from __future__ import annotations
+
+import random
+from typing import Any, Dict
+
+import httpx
+
+from benchmarks.fakes import by_param, json_transport
+from benchmarks.registry import case
+from src.app.config import settings
+from src.app.providers.onlinesim import adapter as onlinesim
+from src.app.services.numberland_client import NumberlandClient
+
+
+def _numberland_getinfo(rows: int = 400) -> list:
+    rnd = random.Random(3)
+    return [
+        {
+            "service": str(1 + i % 40),
+            "country": str(1 + i // 40),
+            "operator": str(1 + i % 4),
+            "amount": str(rnd.randint(900, 30000)),
+            "count": str(rnd.randint(0, 900)),
+            "repeat": "1",
+            "time": "00:20:00",
+        }
+        for i in range(rows)
+    ]
+
+
+NUMBERLAND_ANSWERS: Dict[str, Any] = {
+    "getinfo": _numberland_getinfo(),
+    "getnum": {"RESULT": "1", "ID": "74001", "NUMBER": "+79313226657", "AREACODE": "7", "AMOUNT": "2200",
+               "REPEAT": "1", "TIME": "00:20:00"},
+    "checkstatus": {"RESULT": "2", "CODE": "52871", "DESCRIPTION": "code received"},
+}
+
+
+def _numberland_client() -> NumberlandClient:
+    cl = NumberlandClient(api_key="bench")
+    cl._client = httpx.AsyncClient(transport=json_transport(by_param("method", NUMBERLAND_ANSWERS)))
+    return cl
+
+
+@case("numberland._get.getinfo_400_rows")
+def nl_getinfo(_options):
+    cl = _numberland_client()
+    return lambda: cl.get_info()
+
+
+@case("numberland._get.getnum")
+def nl_getnum(_options):
+    cl = _numberland_client()
+    return lambda: cl.get_num(service=1, country=1, operator="any")
+
+
+@case("numberland._get.checkstatus")
+def nl_status(_options):
+    cl = _numberland_client()
+    return lambda: cl.check_status(id="74001")
+
+
+def _onlinesim_tariffs(countries: int = 60, services: int = 50) -> Dict[str, Any]:
+    rnd = random.Random(5)
+    codes = ["tg", "wa", "fb", "vk", "go", "ig", "tw"] + [f"s{i}" for i in range(services - 7)]
+    return {
+        "response": 1,
+        "tariffs": {
+            str(c): {s: {"cost": f"{rnd.uniform(5, 90):.2f}", "count": rnd.randint(0, 500)} for s in codes}
+            for c in range(1, countries + 1)
+        },
+    }
+
+
+class _CannedHTTP:
+    answers: Dict[str, Any] = {}
+
+    def __init__(self, api_key: str, timeout: float = 15.0) -> None:
+        pass
+
+    async def __aenter__(self) -> "_CannedHTTP":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    async def get(self, endpoint: str, params: Any = None) -> Any:
+        return self.answers[endpoint]
+
+
+def _onlinesim(answers: Dict[str, Any]) -> onlinesim.OnlineSimProvider:
+    # module-level swap: the adapter instantiates _HTTP per call
+    settings.ONLINESIM_API_KEY = settings.ONLINESIM_API_KEY or "bench"
+    _CannedHTTP.answers = answers
+    onlinesim._HTTP = _CannedHTTP  # type: ignore[misc]
+    return onlinesim.OnlineSimProvider(key="onlinesim", display_name="OnlineSim")
+
+
+TARIFFS = _onlinesim_tariffs()
+
+
+@case("onlinesim.tariffs.normalize_3000")
+def os_tariffs(_options):
+    prov = _onlinesim({"getTariffs.php": TARIFFS})
+    return lambda: prov.tariffs()
+
+
+@case("onlinesim.get_services")
+def os_services(_options):
+    prov = _onlinesim({"getTariffs.php": TARIFFS})
+    return lambda: prov.get_services()
+
+
+STATES = [
+    [{"tzid": 1, "msg": "TZ_NUM_WAIT"}],
+    {"response": 1, "state": [{"tzid": 1, "code": "52871", "msg": "TZ_NUM_ANSWER"}]},
+    {"tzid": 1, "msg": "TZ_OVER_OK"},
+    {"tzid": 1, "status": "TZ_NUM_WAIT_AGAIN"},
+    {"tzid": 1, "msg": "cancelled"},
+]
+
+
+@case("onlinesim.status.heuristics", ops=len(STATES))
+def os_status(_options):
+    prov = _onlinesim({})
+    answers = [{"getState.php": s} for s in STATES]
+
+    async def run():
+        for ans in answers:
+            _CannedHTTP.answers = ans
+            await prov.status(id=1)
+
+    return run
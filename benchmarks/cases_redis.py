@@ -0,0 +1,95 @@
+"""Wallet, order and analytics Redis operations, against --redis or the in-memory stand-in."""
+from __future__ import annotations
+
+import itertools
+import time
+
+from benchmarks.fakes import redis_for
+from benchmarks.registry import case
+from src.app import main as bot
+from src.app.services import analytics
+from src.app.services.redis_client import set_redis_client
+
+_client = None
+
+
+async def _redis(options):
+    global _client
+    if _client is None:
+        _client = redis_for(options.redis)
+        await _client.ping()
+        set_redis_client(_client)  # main.get_redis() returns it
+        await _client.delete(*[f"wallet:bal:{u}" for u in range(1, 11)], "wallet:tx:1", "orders:1", "active:1")
+    return _client
+
+
+@case("redis.wallet_credit")
+async def credit(options):
+    await _redis(options)
+    users = itertools.cycle(range(1, 11))
+    return lambda: bot.wallet_credit(next(users), 1000, "bench")
+
+
+@case("redis.wallet_debit")
+async def debit(options):
+    await _redis(options)
+    users = itertools.cycle(range(1, 11))
+    return lambda: bot.wallet_debit(next(users), 1, "bench")
+
+
+@case("redis.wallet_history")
+async def history(options):
+    r = await _redis(options)
+    for i in range(50):
+        await bot.wallet_add_tx(1, {"type": "credit", "amount": i, "ts": int(time.time()), "meta": "bench"})
+    return lambda: bot.wallet_history(1, 10)
+
+
+def _entry(i: int) -> dict:
+    now = int(time.time())
+    return {
+        "id": str(74000 + i), "number": "+79313226657", "amount": 2200, "time": "00:20:00", "repeat": "1",
+        "ts": now, "expire_ts": now + 1200, "status": "active", "provider": "numberland",
+    }
+
+
+@case("redis.order_persist")
+async def persist(options):
+    r = await _redis(options)
+    ids = itertools.count()
+    return lambda: bot._persist_order(r, 1, "numberland", _entry(next(ids) % 20), 1200)
+
+
+@case("redis.order_update_status")
+async def update(options):
+    r = await _redis(options)
+    for i in range(20):
+        await bot._persist_order(r, 1, "numberland", _entry(i), 1200)
+    ids = itertools.cycle(range(20))
+    return lambda: bot._update_active_order(1, str(74000 + next(ids)), "code", {"code": "52871"}, "numberland")
+
+
+def _dims(i: int) -> dict:
+    return analytics.dimension_values("numberland", ("tg", "wa", "ig")[i % 3], ("1", "7", "98")[i % 3 - 1], "any")
+
+
+@case("redis.analytics_record")
+async def analytics_record(options):
+    r = await _redis(options)
+    ids = itertools.count()
+
+    async def run():
+        i = next(ids)
+        await analytics.record_purchase(r, f"bench:{i}", i % 500, time.time(), _dims(i), 1500, 1000)
+        await analytics.record_settlement(r, f"bench:{i}", filled=i % 2 == 0)
+
+    return run
+
+
+@case("redis.analytics_report")
+async def analytics_report(options):
+    r = await _redis(options)
+    now = time.time()
+    for i in range(300):
+        await analytics.record_purchase(r, f"bench:r:{i}", i, now - i * 3600, _dims(i), 1500, 1000)
+    return lambda: analytics.report(r, "h", 24, "service")
@@ -0,0 +1,188 @@
+"""Network-free stand-ins used by the benchmark and load tooling."""
+from __future__ import annotations
+
+import asyncio
+import itertools
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Type, Union
+from typing import Counter as TypingCounter
+
+import httpx
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import Chat, Message, User
+from redis.asyncio import ConnectionPool
+
+from src.app.providers.base import Provider
+from src.app.services.redis_client import InstrumentedRedis
+from src.app.utils import codec
+
+
+def memory_redis(cls: Type[InstrumentedRedis] = InstrumentedRedis) -> InstrumentedRedis:
+    """InstrumentedRedis backed by fakeredis: same client code path as production, no server."""
+    try:
+        import fakeredis
+        from fakeredis.aioredis import FakeConnection
+    except ImportError as e:  # pragma: no cover - dev dependency
+        raise SystemExit("fakeredis is required for the in-memory Redis (pip install fakeredis)") from e
+    pool = ConnectionPool(connection_class=FakeConnection, server=fakeredis.FakeServer())
+    return cls(connection_pool=pool)
+
+
+def redis_for(url: str = "", cls: Type[InstrumentedRedis] = InstrumentedRedis) -> InstrumentedRedis:
+    return cls.from_url(url) if url else memory_redis(cls)
+
+
+def json_transport(route: Callable[[httpx.Request], Any], status: int = 200) -> httpx.MockTransport:
+    """httpx transport answering every request with ``route(request)`` encoded as JSON."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(status, content=codec.dumps(route(request)), headers={"Content-Type": "application/json"})
+
+    return httpx.MockTransport(handler)
+
+
+def by_param(param: str, answers: Dict[str, Any], default: Optional[Any] = None) -> Callable[[httpx.Request], Any]:
+    """Route on a query parameter (Numberland's ``method``)."""
+
+    def route(request: httpx.Request) -> Any:
+        return answers.get(request.url.params.get(param, ""), default)
+
+    return route
+
+
+# ---------------------- Telegram ----------------------
+
+class FakeTelegramSession(BaseSession):
+    """Bot session that never leaves the process: serializes the call like the
+    real session would, waits ``latency`` seconds and returns a plausible result."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__(json_loads=codec.loads, json_dumps=codec.dumps_str)
+        self.latency = latency
+        self.calls: TypingCounter[str] = Counter()
+        self._message_ids = itertools.count(10_000)
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[Any], timeout: Optional[int] = None) -> Any:
+        self.calls[method.__api_method__] += 1
+        files: Dict[str, Any] = {}
+        for value in method.model_dump(warnings=False).values():
+            self.prepare_value(value, bot=bot, files=files)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        returning = method.__returning__
+        if returning is Message:
+            chat_id = getattr(method, "chat_id", None) or 1
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(timezone.utc),
+                chat=Chat(id=int(chat_id), type="private"),
+                text=getattr(method, "text", None),
+            )
+        if returning is User:
+            return User(id=1, is_bot=True, first_name="bench", username="bench_bot")
+        return True
+
+    async def stream_content(self, url: str, headers: Optional[Dict[str, Any]] = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        if False:  # pragma: no cover - nothing to download
+            yield b""
+
+    async def close(self) -> None:
+        return None
+
+
+# ---------------------- Provider ----------------------
+
+class SyntheticProvider(Provider):
+    """In-memory provider with a generated catalog and per-call latency.
+
+    Orders report a code after ``code_after`` status checks.
+    """
+
+    def __init__(self, *, key: str, display_name: str, services: int = 60, countries: int = 40,
+                 latency: float = 0.0, code_after: int = 2) -> None:
+        self.key = key
+        self.display_name = display_name
+        self.latency = latency
+        self.code_after = code_after
+        self._services = [
+            {"id": str(i), "name": f"سرویس {i}", "name_en": f"Service {i}", "active": 1} for i in range(1, services + 1)
+        ]
+        self._countries = [
+            {"id": str(i), "name": f"کشور {i}", "name_en": f"Country {i}", "emoji": "🏳️", "active": 1}
+            for i in range(1, countries + 1)
+        ]
+        self._ids = itertools.count(500_000)
+        self._checks: Dict[str, int] = {}
+
+    async def _wait(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def balance(self) -> Dict[str, Any]:
+        await self._wait()
+        return {"BALANCE": "1000000", "CURRENCY": "Toman"}
+
+    async def get_services(self) -> List[Dict[str, Any]]:
+        await self._wait()
+        return list(self._services)
+
+    async def get_countries(self) -> List[Dict[str, Any]]:
+        await self._wait()
+        return list(self._countries)
+
+    @staticmethod
+    def _amount(service: Union[int, str], country: Union[int, str]) -> int:
+        return 900 + (int(service) * 37 + int(country) * 53) % 9000
+
+    async def quote(
+        self, *, service: Union[int, str], country: Union[int, str], operator: Union[int, str]
+    ) -> Dict[str, Any]:
+        await self._wait()
+        return {"amount": self._amount(service, country), "count": 100, "repeat": "1", "time": "00:20:00"}
+
+    async def tariffs(self) -> List[Dict[str, Any]]:
+        await self._wait()
+        return [
+            {"service": s["id"], "country": c["id"], "operator": "any",
+             "amount": self._amount(s["id"], c["id"]), "count": 100}
+            for s in self._services
+            for c in self._countries
+        ]
+
+    async def buy_temp(self, *, service: Union[int, str], country: Union[int, str], operator: Union[int, str],
+                       price: Optional[Union[int, str]] = None) -> Dict[str, Any]:
+        await self._wait()
+        oid = str(next(self._ids))
+        self._checks[oid] = 0
+        return {"RESULT": 1, "ID": oid, "NUMBER": f"+7900{oid}", "AREACODE": "7", "AMOUNT": int(price or 0),
+                "REPEAT": "1", "TIME": "00:20:00"}
+
+    async def status(self, *, id: Union[int, str]) -> Dict[str, Any]:
+        await self._wait()
+        oid = str(id)
+        n = self._checks.get(oid, 0) + 1
+        self._checks[oid] = n
+        if n > self.code_after:
+            return {"RESULT": 2, "CODE": "52871", "DESCRIPTION": "code received"}
+        return {"RESULT": 1, "CODE": "", "DESCRIPTION": "wait code"}
+
+    async def cancel(self, *, id: Union[int, str]) -> Dict[str, Any]:
+        await self._wait()
+        self._checks.pop(str(id), None)
+        return {"RESULT": 3, "DESCRIPTION": "number canceled"}
+
+    async def ban(self, *, id: Union[int, str]) -> Dict[str, Any]:
+        return await self.cancel(id=id)
+
+    async def repeat(self, *, id: Union[int, str]) -> Dict[str, Any]:
+        await self._wait()
+        return {"RESULT": 5, "DESCRIPTION": "wait code again"}
+
+    async def close(self, *, id: Union[int, str]) -> Dict[str, Any]:
+        await self._wait()
+        self._checks.pop(str(id), None)
+        return {"RESULT": 6, "DESCRIPTION": "completed"}
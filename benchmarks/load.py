@@ -0,0 +1,313 @@
+"""End-to-end load harness: synthetic users pushed through Dispatcher.feed_update.
+
+Everything runs in-process: a fake Telegram session, a synthetic provider
+(registered as "synthetic") and Redis from fakeredis or --redis. Each user
+walks /start -> buy_temp -> services page -> service -> country -> operator
+-> confirm -> refresh. Run from the repository root:
+
+    python -m benchmarks.load --users 1000 --concurrency 200
+    python -m benchmarks.load --users 300 --provider-latency 0.15 --telegram-latency 0.05 --json out.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import itertools
+import os
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+os.environ.setdefault("BOT_TOKEN", "0:loadtest")
+
+from aiogram.types import Update  # noqa: E402
+
+from benchmarks.fakes import FakeTelegramSession, SyntheticProvider, redis_for  # noqa: E402
+from src.app import main as bot_main  # noqa: E402
+from src.app.config import settings  # noqa: E402
+from src.app.providers.registry import register_provider  # noqa: E402
+from src.app.services.order_events import order_events  # noqa: E402
+from src.app.services.outbox import start_outbox, stop_outbox  # noqa: E402
+from src.app.services.redis_client import InstrumentedPipeline, InstrumentedRedis, set_redis_client  # noqa: E402
+from src.app.utils import codec  # noqa: E402
+
+PROVIDER_KEY = "synthetic"
+
+# Redis round trips made on behalf of the update currently being fed. Tasks a
+# handler spawns (status pollers) inherit the cell but it is read before they run.
+_redis_ops: ContextVar[Optional[List[int]]] = ContextVar("loadtest_redis_ops", default=None)
+
+
+def _count_op() -> None:
+    cell = _redis_ops.get()
+    if cell is not None:
+        cell[0] += 1
+
+
+class CountingPipeline(InstrumentedPipeline):
+    async def execute(self, raise_on_error: bool = True):
+        _count_op()
+        return await super().execute(raise_on_error)
+
+
+class CountingRedis(InstrumentedRedis):
+    async def execute_command(self, *args: Any, **options: Any):
+        _count_op()
+        return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None):
+        return CountingPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+# ---------------------- synthetic updates ----------------------
+
+_update_ids = itertools.count(1)
+
+
+def _user(uid: int) -> Dict[str, Any]:
+    return {"id": uid, "is_bot": False, "first_name": f"u{uid}", "language_code": "fa"}
+
+
+def message_update(uid: int, text: str) -> Dict[str, Any]:
+    return {
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": next(_update_ids),
+            "date": int(time.time()),
+            "chat": {"id": uid, "type": "private"},
+            "from": _user(uid),
+            "text": text,
+        },
+    }
+
+
+def callback_update(uid: int, data: str) -> Dict[str, Any]:
+    return {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "from": _user(uid),
+            "chat_instance": str(uid),
+            "data": data,
+            "message": {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": uid, "type": "private"},
+                "from": {"id": 1, "is_bot": True, "first_name": "bot"},
+                "text": "menu",
+            },
+        },
+    }
+
+
+def flow(uid: int) -> List[tuple]:
+    sid = 1 + uid % 60
+    cid = 1 + uid % 40
+    return [
+        ("start", message_update, "/start"),
+        ("browse", callback_update, "buy_temp"),
+        ("browse_page", callback_update, "sv:p:1"),
+        ("service", callback_update, f"sv:s:{sid}:1"),
+        ("country", callback_update, f"ct:s:{cid}:0"),
+        ("quote", callback_update, "op:any"),
+        ("confirm", callback_update, "cf:buy"),
+        ("refresh", callback_update, None),  # needs the order id from confirm
+    ]
+
+
+# ---------------------- harness ----------------------
+
+class Stats:
+    def __init__(self) -> None:
+        self.latency: Dict[str, List[float]] = {}
+        self.redis_ops: Dict[str, List[int]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add(self, kind: str, seconds: float, ops: int) -> None:
+        self.latency.setdefault(kind, []).append(seconds)
+        self.redis_ops.setdefault(kind, []).append(ops)
+
+
+def _pct(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        # peak, not current, outside Linux; KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+async def feed(dp, bot, stats: Stats, kind: str, raw: Dict[str, Any]) -> None:
+    update = Update.model_validate(raw, context={"bot": bot})
+    cell = [0]
+    token = _redis_ops.set(cell)
+    start = time.perf_counter()
+    try:
+        await dp.feed_update(bot, update)
+    except Exception as e:
+        stats.errors[f"{kind}:{type(e).__name__}"] = stats.errors.get(f"{kind}:{type(e).__name__}", 0) + 1
+    finally:
+        stats.add(kind, time.perf_counter() - start, cell[0])
+        _redis_ops.reset(token)
+
+
+async def run_user(dp, bot, redis, stats: Stats, uid: int) -> None:
+    for kind, make, payload in flow(uid):
+        if kind == "refresh":
+            # the order index is written by the "active" event consumer, a moment after the purchase
+            fields = await redis.hkeys(f"active:{uid}")
+            deadline = time.monotonic() + 2.0
+            while not fields and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+                fields = await redis.hkeys(f"active:{uid}")
+            if not fields:
+                stats.errors["refresh:no_order"] = stats.errors.get("refresh:no_order", 0) + 1
+                continue
+            field = fields[0].decode() if isinstance(fields[0], bytes) else fields[0]
+            prov_key, rid = field.split(":", 1)
+            payload = f"st:refresh:{prov_key}:{rid}"
+        await feed(dp, bot, stats, kind, make(uid, payload))
+
+
+async def run(options: argparse.Namespace) -> Dict[str, Any]:
+    settings.ENABLED_PROVIDERS = PROVIDER_KEY
+    settings.TRACE_ENABLED = options.trace
+    settings.OUTBOX_GLOBAL_RATE = max(settings.OUTBOX_GLOBAL_RATE, 1000.0)
+    register_provider(
+        PROVIDER_KEY,
+        lambda *, key, display_name: SyntheticProvider(key=key, display_name=display_name, latency=options.provider_latency),
+    )
+    redis = redis_for(options.redis, CountingRedis)
+    set_redis_client(redis)
+    if options.redis:
+        await redis.flushdb()
+
+    session = FakeTelegramSession(latency=options.telegram_latency)
+    bot = bot_main.create_bot(session)
+    dp = bot_main.build_dispatcher(bot)
+    start_outbox(bot)
+    order_events.start()
+
+    users = list(range(100_000, 100_000 + options.users))
+    for uid in users:
+        await redis.set(f"user:provider:{uid}", PROVIDER_KEY)
+
+    if options.tracemalloc:
+        tracemalloc.start()
+    gc.collect()
+    rss_before = rss_mb()
+    heap_before = tracemalloc.get_traced_memory()[0] if options.tracemalloc else 0
+
+    stats = Stats()
+    sem = asyncio.Semaphore(options.concurrency)
+
+    async def one(uid: int) -> None:
+        async with sem:
+            await run_user(dp, bot, redis, stats, uid)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(u) for u in users))
+    wall = time.perf_counter() - t0
+
+    for task in list(bot_main.POLL_TASKS.values()):
+        task.cancel()
+    await asyncio.gather(*bot_main.POLL_TASKS.values(), return_exceptions=True)
+    await order_events.stop()
+    await stop_outbox()
+
+    gc.collect()
+    rss_after = rss_mb()
+    heap_after = tracemalloc.get_traced_memory()[0] if options.tracemalloc else 0
+    await bot.session.close()
+
+    total = sum(len(v) for v in stats.latency.values())
+    all_lat = [x for v in stats.latency.values() for x in v]
+    all_ops = [x for v in stats.redis_ops.values() for x in v]
+    report: Dict[str, Any] = {
+        "users": options.users,
+        "concurrency": options.concurrency,
+        "provider_latency": options.provider_latency,
+        "telegram_latency": options.telegram_latency,
+        "redis": options.redis or "memory",
+        "updates": total,
+        "wall_s": round(wall, 3),
+        "updates_per_s": round(total / wall, 1) if wall else 0.0,
+        "p50_ms": round(_pct(all_lat, 0.50) * 1000, 2),
+        "p99_ms": round(_pct(all_lat, 0.99) * 1000, 2),
+        "redis_ops_per_update": round(statistics.mean(all_ops), 2) if all_ops else 0.0,
+        "telegram_calls": dict(session.calls),
+        "rss_mb_before": round(rss_before, 1),
+        "rss_mb_after": round(rss_after, 1),
+        "rss_kb_per_1k_updates": round((rss_after - rss_before) * 1024 / max(1, total / 1000), 1),
+        "errors": stats.errors,
+        "by_kind": {
+            kind: {
+                "n": len(lat),
+                "p50_ms": round(_pct(lat, 0.50) * 1000, 2),
+                "p99_ms": round(_pct(lat, 0.99) * 1000, 2),
+                "redis_ops": round(statistics.mean(stats.redis_ops[kind]), 2),
+            }
+            for kind, lat in stats.latency.items()
+        },
+    }
+    if options.tracemalloc:
+        report["py_heap_kb_growth"] = round((heap_after - heap_before) / 1024, 1)
+        tracemalloc.stop()
+    return report
+
+
+def print_report(r: Dict[str, Any]) -> None:
+    print(f"users={r['users']} concurrency={r['concurrency']} redis={r['redis']} "
+          f"provider_latency={r['provider_latency']}s telegram_latency={r['telegram_latency']}s")
+    print(f"updates: {r['updates']} in {r['wall_s']}s -> {r['updates_per_s']} updates/s")
+    print(f"latency: p50 {r['p50_ms']} ms, p99 {r['p99_ms']} ms; redis ops/update {r['redis_ops_per_update']}")
+    print(f"memory: RSS {r['rss_mb_before']} -> {r['rss_mb_after']} MB ({r['rss_kb_per_1k_updates']} KB per 1k updates)"
+          + (f", python heap +{r['py_heap_kb_growth']} KB" if "py_heap_kb_growth" in r else ""))
+    print(f"\n  {'update':<12} {'n':>7} {'p50 ms':>9} {'p99 ms':>9} {'redis ops':>10}")
+    for kind, k in r["by_kind"].items():
+        print(f"  {kind:<12} {k['n']:>7} {k['p50_ms']:>9} {k['p99_ms']:>9} {k['redis_ops']:>10}")
+    print(f"\ntelegram calls: {r['telegram_calls']}")
+    if r["errors"]:
+        print(f"errors: {r['errors']}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.load", description=__doc__.split("\n")[0])
+    ap.add_argument("--users", type=int, default=500)
+    ap.add_argument("--concurrency", type=int, default=100, help="users in flight at once")
+    ap.add_argument("--provider-latency", type=float, default=0.0, help="seconds per synthetic provider call")
+    ap.add_argument("--telegram-latency", type=float, default=0.0, help="seconds per Bot API call")
+    ap.add_argument("--redis", default="", help="Redis URL (default: in-memory stand-in); the DB is flushed")
+    ap.add_argument("--trace", action="store_true", help="keep per-update tracing enabled")
+    ap.add_argument("--tracemalloc", action="store_true", help="also report Python heap growth (slower)")
+    ap.add_argument("--json", default="", help="write the report to this file")
+    return ap.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = parse_args(argv)
+    bot_main.setup_logging()
+    bot_main.install_event_loop()
+    report = asyncio.run(run(options))
+    print_report(report)
+    if options.json:
+        with open(options.json, "wb") as f:
+            f.write(codec.dumps(report))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
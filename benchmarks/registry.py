@@ -0,0 +1,26 @@
+"""Case registry shared by benchmarks.suite and the cases_* modules."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, List
+
+
+@dataclass
+class Case:
+    name: str
+    factory: Callable[..., Any]
+    ops: int = 1  # operations per call of the returned function, for per-op timings
+
+
+CASES: List[Case] = []
+
+
+def case(name: str, ops: int = 1) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Register a case factory. It receives the run options and returns the callable to time
+    (sync or async; the factory itself may be async to do async setup, or return None to skip)."""
+
+    def deco(factory: Callable[..., Any]) -> Callable[..., Any]:
+        CASES.append(Case(name, factory, ops))
+        return factory
+
+    return deco
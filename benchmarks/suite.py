@@ -0,0 +1,232 @@
+"""Micro-benchmark suite for the bot's hot paths, with per-commit result history.
+
+Run from the repository root (no network needed):
+
+    python -m benchmarks.suite                    # run everything, compare with the last stored run
+    python -m benchmarks.suite -k keyboards       # only cases whose name contains "keyboards"
+    python -m benchmarks.suite --save             # store results under benchmarks/results/<commit>.json
+    python -m benchmarks.suite --redis redis://localhost:6379/15   # Redis cases against a real server
+
+Redis cases default to an in-memory stand-in (fakeredis) behind the same
+InstrumentedRedis client the bot uses. Comparisons pick the newest stored
+result from an ancestor commit (or --baseline <file|commit>) and flag cases
+whose median got slower than --threshold.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import inspect
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+
+from benchmarks.registry import CASES, Case  # noqa: E402
+from src.app.utils import codec  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+CASE_MODULES = (
+    "benchmarks.cases_pricing",
+    "benchmarks.cases_keyboards",
+    "benchmarks.cases_providers",
+    "benchmarks.cases_redis",
+    "benchmarks.cases_cassettes",
+    "benchmarks.cases_perm_numbers",
+)
+
+
+# ---------------------- timing ----------------------
+
+async def _time_async(fn: Callable[[], Any], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        await fn()
+    return time.perf_counter() - start
+
+
+def _time_sync(fn: Callable[[], Any], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return time.perf_counter() - start
+
+
+async def measure(fn: Callable[[], Any], repeat: int, min_time: float) -> List[float]:
+    """Seconds per call for each repeat; the loop count is calibrated to last ~min_time."""
+    # warm-up (imports, memo tables, connection setup); also tells sync from async,
+    # since cases are often lambdas returning a coroutine
+    first = fn()
+    is_async = inspect.isawaitable(first)
+    if is_async:
+        await first
+
+    async def timed(number: int) -> float:
+        return await _time_async(fn, number) if is_async else _time_sync(fn, number)
+
+    number = 1
+    while True:
+        elapsed = await timed(number)
+        if elapsed >= min_time / 10 or number >= 1_000_000:
+            break
+        number *= 10
+    per_repeat = max(1, int(number * (min_time / max(elapsed, 1e-9))))
+    return [await timed(per_repeat) / per_repeat for _ in range(repeat)]
+
+
+async def run_cases(cases: List[Case], options: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    for c in cases:
+        made = c.factory(options)
+        if inspect.isawaitable(made):
+            made = await made
+        if made is None:
+            print(f"  {c.name:<44} skipped")
+            continue
+        samples = await measure(made, options.repeat, options.min_time)
+        per_op = [s / c.ops for s in samples]
+        results[c.name] = {
+            "median_ns": statistics.median(per_op) * 1e9,
+            "min_ns": min(per_op) * 1e9,
+            "stdev_ns": (statistics.stdev(per_op) if len(per_op) > 1 else 0.0) * 1e9,
+            "ops": c.ops,
+            "repeat": len(per_op),
+        }
+        print(f"  {c.name:<44} {_fmt_ns(results[c.name]['median_ns']):>10}/op")
+    return results
+
+
+def _fmt_ns(ns: float) -> str:
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} us"
+    return f"{ns:.0f} ns"
+
+
+# ---------------------- storage / comparison ----------------------
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=True, cwd=RESULTS_DIR.parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def current_commit() -> Tuple[str, bool]:
+    sha = _git("rev-parse", "--short=12", "HEAD") or "unknown"
+    dirty = bool(_git("status", "--porcelain", "--untracked-files=no"))
+    return sha, dirty
+
+
+def save_results(results: Dict[str, Dict[str, Any]], options: argparse.Namespace) -> Path:
+    sha, dirty = current_commit()
+    RESULTS_DIR.mkdir(exist_ok=True)
+    path = RESULTS_DIR / f"{sha}{'-dirty' if dirty else ''}.json"
+    doc = {
+        "commit": sha,
+        "dirty": dirty,
+        "created_at": int(time.time()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "json_backend": codec.BACKEND,
+        "redis": options.redis or "memory",
+        "results": results,
+    }
+    path.write_bytes(codec.dumps(doc))
+    return path
+
+
+def find_baseline(explicit: Optional[str]) -> Optional[Path]:
+    if explicit:
+        p = Path(explicit)
+        if p.is_file():
+            return p
+        p = RESULTS_DIR / f"{explicit[:12]}.json"
+        return p if p.is_file() else None
+    if not RESULTS_DIR.is_dir():
+        return None
+    # newest stored run on an ancestor commit (HEAD itself counts when comparing a dirty tree)
+    sha, dirty = current_commit()
+    for rev in _git("rev-list", "--max-count=200", "--abbrev-commit", "--abbrev=12", "HEAD").split():
+        if rev == sha and not dirty:
+            continue
+        p = RESULTS_DIR / f"{rev}.json"
+        if p.is_file():
+            return p
+    return None
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Path, threshold: float) -> List[str]:
+    base = codec.loads(baseline.read_bytes())
+    print(f"\nvs {baseline.name} (commit {base.get('commit')}, python {base.get('python')}):")
+    regressions: List[str] = []
+    for name, cur in results.items():
+        old = base.get("results", {}).get(name)
+        if not old:
+            print(f"  {name:<44} new")
+            continue
+        ratio = cur["median_ns"] / old["median_ns"] if old["median_ns"] else 1.0
+        mark = ""
+        if ratio > 1 + threshold:
+            mark = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            mark = "  faster"
+        print(f"  {name:<44} {_fmt_ns(old['median_ns']):>10} -> {_fmt_ns(cur['median_ns']):>10}  ({ratio:.2f}x){mark}")
+    return regressions
+
+
+# ---------------------- CLI ----------------------
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__.split("\n")[0])
+    ap.add_argument("-k", "--filter", default="", help="only run cases whose name contains this substring")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+    ap.add_argument("--redis", default="", help="Redis URL for the Redis cases (default: in-memory stand-in)")
+    ap.add_argument("--cassettes", default="", help="cassette directory for the replay cases (default HTTP_CASSETTE_DIR)")
+    ap.add_argument("--save", action="store_true", help="store results under benchmarks/results/")
+    ap.add_argument("--baseline", default="", help="results file or commit to compare with")
+    ap.add_argument("--threshold", type=float, default=0.10, help="relative slowdown reported as regression")
+    ap.add_argument("--fail-on-regression", action="store_true")
+    ap.add_argument("--list", action="store_true", help="list case names and exit")
+    return ap.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = parse_args(argv)
+    for mod in CASE_MODULES:
+        importlib.import_module(mod)
+    cases = [c for c in CASES if options.filter in c.name]
+    if options.list:
+        print("\n".join(c.name for c in cases))
+        return 0
+
+    print(f"{len(cases)} cases, repeat={options.repeat}, min_time={options.min_time}s")
+    results = asyncio.run(run_cases(cases, options))
+
+    baseline = find_baseline(options.baseline)
+    regressions: List[str] = []
+    if baseline is not None:
+        regressions = compare(results, baseline, options.threshold)
+    if options.save:
+        print(f"\nsaved {save_results(results, options)}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {options.threshold:.0%}: {', '.join(regressions)}")
+        if options.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
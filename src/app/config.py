@@ -1,3 +1,5 @@
+from typing import Any, Optional
+
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -8,16 +10,114 @@ class Settings(BaseSettings):
     NUMBERLAND_API_KEY: str = Field("", description="Numberland API key")
     FIVESIM_API_KEY: str = Field("", description="5SIM API key")
     ONLINESIM_API_KEY: str = Field("", description="OnlineSim API key")
+    NUMBERLAND_BASE_URL: str = "https://api.numberland.ir/v2.php"
+    ONLINESIM_BASE_URL: str = "https://onlinesim.io/api"
 
     DB_DSN: str = Field("postgresql+asyncpg://viranum:viranum@db:5432/viranum")
     REDIS_DSN: str = Field("redis://redis:6379/0")
 
     BASE_MARKUP_PERCENT: float = 20.0
     MARKUP_ROUND_TO: int = 100
+    PRICE_SHEET_REFRESH_SECONDS: int = 600
+    CATALOG_REFRESH_SECONDS: int = 900
+    PERM_NUMBERS_REFRESH_SECONDS: int = Field(1800, description="Permanent number list re-download interval")
+    # Catalog, price sheet and permanent number snapshot loaded at boot and rewritten after each catalog refresh
+    SNAPSHOT_PATH: str = Field("data/snapshot.json", description="Snapshot file (empty = disabled)")
+    SNAPSHOT_MMAP_BYTES: int = Field(1_048_576, description="Snapshots at least this large are read via mmap")
 
     BOT_MODE: str = "polling"
     LOCALE_DEFAULT: str = "fa"
 
+    # Webhook mode (BOT_MODE=webhook)
+    WEBHOOK_BASE_URL: str = Field("", description="Public HTTPS base URL Telegram posts updates to")
+    WEBHOOK_PATH: str = "/tg/webhook"
+    WEBHOOK_SECRET: str = Field("", description="X-Telegram-Bot-Api-Secret-Token value")
+    WEBHOOK_HOST: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8080
+    WEBHOOK_MAX_CONCURRENCY: int = Field(64, description="Max updates processed at once per replica (0 = unbounded)")
+    WEBHOOK_MAX_PENDING: int = Field(256, description="Acked-but-unfinished updates before answering 503 (0 = no cap)")
+    WEBHOOK_DRAIN_SECONDS: float = Field(25.0, description="Time acked updates get to finish on shutdown")
+    WEBHOOK_MAX_CONNECTIONS: int = Field(40, description="max_connections passed to setWebhook")
+    WEBHOOK_SET_ON_STARTUP: bool = True
+
+    # Update throttling (middlewares/throttle.py): per-user token buckets and a per-replica in-flight cap
+    THROTTLE_USER_RATE: float = Field(2.0, description="Updates per second per user (0 disables throttling)")
+    THROTTLE_USER_BURST: int = 6
+    THROTTLE_MAX_CONCURRENCY: int = Field(200, description="Updates in flight before browsing is shed (0 = no cap)")
+    THROTTLE_CRITICAL_WAIT: float = Field(2.0, description="Longest wait of an over-rate purchase/order action")
+
+    # Prometheus-style /metrics (served on the webhook port in webhook mode)
+    METRICS_ENABLED: bool = True
+    METRICS_HOST: str = "0.0.0.0"
+    METRICS_PORT: int = 9100
+
+    # Per-update tracing: updates slower than TRACE_SLOW_MS are always written to
+    # the slow-log with their span tree; others with probability TRACE_SAMPLE_RATE
+    TRACE_ENABLED: bool = True
+    TRACE_SLOW_MS: float = 1500.0
+    TRACE_SAMPLE_RATE: float = 0.0
+    TRACE_MAX_SPANS: int = 200
+    TRACE_LOG_PATH: str = Field("", description="JSON-lines file for slow/sampled traces (empty = stdout only)")
+
+    # Outbound message queue (Telegram limits: ~30 msg/s overall, ~1 msg/s per chat)
+    OUTBOX_GLOBAL_RATE: float = 25.0
+    OUTBOX_PER_CHAT_RATE: float = 1.0
+    OUTBOX_PER_CHAT_BURST: int = 3
+    OUTBOX_WORKERS: int = 8
+    OUTBOX_MAX_ATTEMPTS: int = 5
+
+    # Order lifecycle events (services/order_events.py): Redis Stream + consumer groups
+    ORDER_EVENTS_STREAM: str = "orders:events"
+    ORDER_EVENTS_MAXLEN: int = Field(100_000, description="Approximate number of events the stream retains")
+    ORDER_EVENT_GROUPS: str = Field(
+        "active,notify,wallet,analytics", description="Consumer groups this replica runs (empty = publish only)"
+    )
+    ORDER_EVENTS_BATCH: int = 64
+    ORDER_EVENTS_CLAIM_IDLE_MS: int = Field(60_000, description="Pending entries idle this long are claimed and retried")
+    ORDER_EVENTS_MAX_ATTEMPTS: int = Field(5, description="Failed deliveries before an event is dead-lettered")
+    # Per-user purchase lock (services/purchase_guard.py); outlives the slowest getnum with retries
+    PURCHASE_LOCK_SECONDS: float = 60.0
+    # Debit the final price from the wallet on purchase; refunded when the order ends without a code
+    WALLET_CHARGE_ORDERS: bool = False
+
+    # Order expiry sweeper (services/order_expiry.py): closes orders past expire_ts with the provider
+    ORDER_EXPIRY_SWEEP_SECONDS: float = Field(10.0, description="Sweep interval; 0 disables the sweeper")
+    ORDER_EXPIRY_BATCH: int = 200
+    ORDER_EXPIRY_CONCURRENCY: int = Field(8, description="Provider cancel/close calls in flight per sweep")
+    ORDER_EXPIRY_PROVIDER_RATE: float = Field(5.0, description="Cancel/close calls per second per provider")
+
+    # Operator code-delivery stats (services/operator_stats.py)
+    OPERATOR_STATS_HALF_LIFE_HOURS: float = 6.0
+    OPERATOR_STATS_WINDOW_HOURS: int = 48
+    OPERATOR_STATS_MIN_SAMPLES: float = Field(5.0, description="Decayed outcomes before an operator is recommended")
+    OPERATOR_STATS_CACHE_SECONDS: float = 60.0
+    # Buy "any" from the recommended operator when there is one
+    OPERATOR_ROUTING: bool = True
+    # Per-operator quotes fetched once per country pick (services/operator_quotes.py)
+    OPERATOR_QUOTES_CACHE_SECONDS: float = 30.0
+    # Speculative quotes for the most popular countries on the page a user is browsing (services/quote_prefetch.py)
+    QUOTE_PREFETCH_COUNTRIES: int = Field(4, description="Countries prefetched per page view (0 disables)")
+    QUOTE_PREFETCH_RATE: float = Field(2.0, description="Prefetch calls per second per provider")
+    # "Not active" provider answers (-210/-211/-212) remembered and hidden from menus (services/negative_cache.py)
+    NEGATIVE_CACHE_SECONDS: float = Field(300.0, description="Service/country blocks (0 disables)")
+    NEGATIVE_CACHE_OPERATOR_SECONDS: float = Field(120.0, description="Operator blocks (0 disables)")
+
+    # Provider HTTP record/replay (services/cassettes.py): record | replay | empty
+    HTTP_CASSETTE_MODE: str = ""
+    HTTP_CASSETTE_DIR: str = "cassettes"
+    HTTP_CASSETTE_SPEED: float = Field(1.0, description="Replay speed factor (2 = twice as fast, 0 = no delay)")
+    HTTP_CASSETTE_GZIP: bool = False
+
+    # Sandbox provider / local API stand-ins (python -m src.app.sandbox)
+    SANDBOX_SEED: int = 1
+    SANDBOX_LATENCY: str = Field("lognormal:120:600", description="fixed:MS | uniform:MIN:MAX | lognormal:MEDIAN:P99")
+    SANDBOX_ERROR_RATES: str = Field("", description="Fault rates, e.g. -205:0.01,-210:0.01,5xx:0.02,bad_json:0.01")
+    SANDBOX_STOCK: int = 200
+    SANDBOX_BALANCE: int = 10_000_000
+    SANDBOX_CODE_DELAY: str = "uniform:5000:30000"
+    SANDBOX_CODE_RATE: float = 0.9
+    SANDBOX_PORT: int = 8089
+
     # Providers
     ENABLED_PROVIDERS: str = Field(
         "onlinesim", description="Comma separated provider keys (e.g., onlinesim,numberland)"
@@ -31,4 +131,27 @@ class Settings(BaseSettings):
         env_file_encoding = "utf-8"
 
 
-settings = Settings()
+_settings: Optional[Settings] = None
+
+
+def get_settings() -> Settings:
+    """Settings are read from the environment / .env on first use, not at import."""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+
+class _LazySettings:
+    """Module-level ``settings`` handle: attribute reads and writes go to get_settings()."""
+
+    __slots__ = ()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(get_settings(), name, value)
+
+
+settings: Settings = _LazySettings()  # type: ignore[assignment]
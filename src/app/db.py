@@ -1,8 +1,41 @@
 from __future__ import annotations
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from typing import TYPE_CHECKING, Any, Optional
+
 from .config import settings
 
-engine = create_async_engine(settings.DB_DSN, pool_pre_ping=True, future=True)
-async_session_maker = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Postgres is optional: SQLAlchemy is imported and the engine created only
+# when something asks for it (``engine`` / ``async_session_maker`` still work
+# as module attributes).
+_engine: Optional["AsyncEngine"] = None
+_session_maker: Any = None
+
+
+def get_engine() -> "AsyncEngine":
+    global _engine
+    if _engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        _engine = create_async_engine(settings.DB_DSN, pool_pre_ping=True, future=True)
+    return _engine
+
+
+def get_session_maker() -> Any:
+    global _session_maker
+    if _session_maker is None:
+        from sqlalchemy.ext.asyncio import AsyncSession
+        from sqlalchemy.orm import sessionmaker
+
+        _session_maker = sessionmaker(get_engine(), expire_on_commit=False, class_=AsyncSession)
+    return _session_maker
+
+
+def __getattr__(name: str) -> Any:
+    if name == "engine":
+        return get_engine()
+    if name == "async_session_maker":
+        return get_session_maker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,6 +1,15 @@
-from typing import Dict
+import sys
+from typing import Any, Dict, Mapping
 
-# Minimal i18n stub with in-memory dicts for MVP. Later replace with gettext .po files.
+# Message catalog. _STRINGS is the source (one block per language, str.format
+# templates for messages with values); it is compiled once at import into one
+# flat table per language with the fallback to DEFAULT_LANG already applied and
+# interned keys, so tr() is a single dict lookup (plus format_map for
+# templates). Adding a language means adding a block here, not touching
+# handlers.
+
+LANGS = ("fa", "en", "ru")
+DEFAULT_LANG = "fa"
 
 _STRINGS: Dict[str, Dict[str, str]] = {
     "fa": {
@@ -10,14 +19,140 @@ _STRINGS: Dict[str, Dict[str, str]] = {
         "wallet.info": "کیف پول: به زودی امکانات شارژ و تاریخچه اضافه می‌شود.",
         "support.info": "پشتیبانی: راهنما و ارتباط بزودی.",
         "buy_temp.stub": "خرید شماره عادی: به زودی لیست سرویس/کشور/اپراتور افزوده می‌شود.",
-        "buy_perm.stub": "خرید شماره دائمی: به زودی لیست رُند/نیمه‌رُند افزوده می‌شود.",
+        "perm.choose": "شماره‌های دائمی ({count} عدد). دسته یا جستجو را انتخاب کنید:",
+        "perm.filter.all": "همه",
+        "perm.filter.round": "رُند",
+        "perm.filter.half": "نیمه‌رُند",
+        "perm.filter.repeat": "ارقام تکراری",
+        "perm.filter.seq": "ارقام پشت‌سرهم",
+        "perm.search": "جستجوی ارقام 🔎",
+        "perm.search_prompt": "ارقامی که شماره باید شامل آن باشد را بفرستید (مثلاً 1234):",
+        "perm.search_invalid": "فقط رقم بفرستید (حداقل ۲ رقم).",
+        "perm.results": "{filter}: {count} شماره (ارزان‌ترین اول)",
+        "perm.results_query": "{filter} شامل «{query}»: {count} شماره (ارزان‌ترین اول)",
+        "perm.none": "در حال حاضر شماره دائمی موجود نیست.",
+        "perm.error": "خطا در دریافت لیست شماره‌های دائمی.",
+        "perm.gone": "این شماره دیگر موجود نیست.",
+        "perm.detail": (
+            "شماره دائمی:\n\n- شماره: {number}\n- نوع: {kind}\n- قیمت: {price} تومان\n\n"
+            "برای خرید به پشتیبانی پیام دهید."
+        ),
         "menu.buy_temp": "خرید شماره عادی",
         "menu.buy_perm": "خرید شماره دائمی",
         "menu.wallet": "کیف پول",
         "menu.support": "راهنما و پشتیبانی",
         "menu.language": "تنظیمات زبان",
+        "menu.providers": "ارائه‌دهنده‌ها",
         "menu.orders": "سفارش‌های من",
         "menu.active": "سفارش‌های فعال",
+        # common
+        "common.back": "بازگشت",
+        "common.prev": "⬅️ قبلی",
+        "common.next": "بعدی ➡️",
+        "common.yes": "بله",
+        "common.no": "خیر",
+        "common.no_permission": "دسترسی ندارید.",
+        "common.redis_error": "خطا در Redis.",
+        "common.read_error": "خطا در خواندن داده‌ها.",
+        "common.error": "خطا: {error}",
+        "price.from": " · از {price:,}",
+        # provider errors
+        "api.price_not_set": "قیمت برای خرید تنظیم نشده است.",
+        "api.no_balance": "موجودی پنل کافی نیست.",
+        "api.bad_params": "پارامترها نامعتبر هستند.",
+        "throttle.slow_down": "کمی آهسته‌تر؛ چند لحظه بعد دوباره امتحان کنید.",
+        "api.service_inactive": "این سرویس فعلاً غیرفعال است.",
+        "api.operator_inactive": "این اپراتور فعلاً غیرفعال است.",
+        "api.country_inactive": "این کشور فعلاً غیرفعال است.",
+        "api.unknown": "خطای نامشخص.",
+        # wallet / top-up
+        "wallet.balance": "موجودی کیف پول شما: {balance} تومان",
+        "wallet.insufficient": "موجودی کافی نیست. قیمت: {price} تومان، موجودی: {balance} تومان",
+        "wallet.topup": "افزایش موجودی",
+        "wallet.history": "تاریخچه",
+        "wallet.history_empty": "تاریخچه‌ای موجود نیست.",
+        "wallet.credit": "+ شارژ {amount}",
+        "wallet.debit": "- برداشت {amount}",
+        "panel.balance": "موجودی شما: {balance} {currency}",
+        "panel.balance_error": "خطا در دریافت موجودی.",
+        "topup.ask_amount": "مبلغ شارژ را به تومان ارسال کنید:",
+        "topup.invalid_amount": "مبلغ نامعتبر است. یک عدد ارسال کنید.",
+        "topup.amount_positive": "مبلغ باید بزرگتر از صفر باشد.",
+        "topup.approve": "تایید ✅",
+        "topup.reject": "رد ❌",
+        "topup.admin_note": "درخواست شارژ جدید\nID: {id}\nUser: {user}\nAmount: {amount}",
+        "topup.submitted": "درخواست شما ثبت شد و در انتظار تایید است.",
+        "topup.not_found": "درخواست یافت نشد یا منقضی شده.",
+        "topup.already_processed": "این درخواست قبلاً پردازش شده است.",
+        "topup.credit_failed": "شارژ کیف پول انجام نشد؛ درخواست دوباره در انتظار تایید است.",
+        "topup.approved_user": "شارژ شما با موفقیت انجام شد.",
+        "topup.approved": "درخواست تایید شد.",
+        "topup.rejected_user": "درخواست شارژ شما رد شد.",
+        "topup.rejected": "درخواست رد شد.",
+        # pricing admin
+        "pricing.none": "قانون قیمت‌گذاری فعالی وجود ندارد.",
+        "pricing.saved": "قانون ذخیره شد: {key}",
+        "pricing.deleted": "حذف شد.",
+        "pricing.not_found": "یافت نشد.",
+        "admin.orders_none": "سفارش فعالی وجود ندارد.",
+        "admin.orders_header": "سفارش‌های فعال: {total} (صفحه {page})",
+        "admin.order_line": "{provider}:{id} | کاربر {uid} | {number} | {status}",
+        "admin.topups_none": "درخواستی وجود ندارد.",
+        "admin.topups_header": "درخواست‌های شارژ: {total} (صفحه {page})",
+        "admin.topup_line": "{id} | کاربر {user} | {amount}",
+        "admin.topups_settled": "انجام شد: {done}، نادیده: {skipped}",
+        "admin.report_empty": "در این بازه فروشی ثبت نشده است.",
+        "admin.report_header": "گزارش {buckets} بازه‌ی {gran} بر اساس {dim}:",
+        "admin.report_line": (
+            "{name}: سفارش {orders}، موفق {filled} ({rate}%)، فروش {revenue}، هزینه {cost}، سود {margin}، "
+            "خریدار {buyers}"
+        ),
+        # buy flow
+        "buy.choose_provider": "ارائه‌دهنده را انتخاب کنید:",
+        "buy.choose_service": "یک سرویس را انتخاب کنید:",
+        "buy.choose_country": "کشور را انتخاب کنید:",
+        "buy.choose_operator": "اپراتور را انتخاب کنید:",
+        "buy.no_services": "سرویسی یافت نشد. تنظیمات یا موجودی را بررسی کنید.",
+        "buy.no_numbers": "شماره‌ای یافت نشد.",
+        "buy.op_min": "ارزان‌ترین (min)",
+        "buy.op_any": "هرکدام (any)",
+        "buy.op_any_best": "هرکدام (any → {op})",
+        "buy.op_rate": "{op} · {rate}%",
+        "buy.op_price": "{op} · {price} ({count})",
+        "buy.op_empty": "{op} · ناموجود",
+        "buy.op_empty_alert": "این اپراتور فعلاً شماره ندارد.",
+        "buy.confirm": "تایید خرید ✅",
+        "buy.quote": (
+            "اطلاعات شماره:\n\n- موجودی: {count}\n- قیمت پایه: {amount} تومان\n- قیمت نهایی: {price} تومان\n"
+            "- قابلیت کد مجدد: {repeat}\n- بازه زمانی: {time}"
+        ),
+        "buy.error": "خطا در خرید: {error}",
+        "buy.done": (
+            "شماره خریداری شد:\n\n- آیدی: {id}\n- شماره: {number}\n- قیمت: {amount} تومان\n"
+            "- بازه زمانی: {time}\n- کد مجدد: {repeat}"
+        ),
+        # order status
+        "status.cancel": "لغو",
+        "status.repeat": "کد مجدد",
+        "status.close": "بستن",
+        "status.refresh": "به‌روزرسانی",
+        "status.current": "وضعیت: {status}",
+        "status.final": "وضعیت نهایی: {status}",
+        "status.expired": "مهلت سفارش {id} بدون دریافت کد به پایان رسید.",
+        "status.code": "کد دریافت شد:\n\n<code>{code}</code>",
+        "status.code_with_status": "کد دریافت شد:\n\n<code>{code}</code>\n\nوضعیت: {status}",
+        "desc.wait_code": "در انتظار دریافت کد",
+        "desc.canceled": "شماره کنسل شده",
+        "desc.banned": "شماره مسدود شده",
+        "desc.wait_code_again": "در انتظار دریافت کد مجدد",
+        "desc.completed": "تکمیل درخواست",
+        "desc.code_received": "کد دریافت شد",
+        # order lists
+        "orders.none": "سفارشی یافت نشد.",
+        "orders.line": "آیدی: {id} | شماره: {number} | قیمت: {amount}",
+        "active.none": "سفارش فعالی یافت نشد.",
+        "active.line": "آیدی: {id} | شماره: {number} | وضعیت: {status} | مانده: {mins:02d}:{secs:02d}",
+        "active.code": " | کد: {code}",
     },
     "en": {
         "greet": "Welcome to Viranum bot. Choose an option:",
@@ -26,7 +161,24 @@ _STRINGS: Dict[str, Dict[str, str]] = {
         "wallet.info": "Wallet: Top-up and history coming soon.",
         "support.info": "Support: Help and contact coming soon.",
         "buy_temp.stub": "Temporary number purchase: service/country/operator list coming soon.",
-        "buy_perm.stub": "Permanent numbers: round/half-round list coming soon.",
+        "perm.choose": "Permanent numbers ({count}). Pick a category or search:",
+        "perm.filter.all": "All",
+        "perm.filter.round": "Round",
+        "perm.filter.half": "Half-round",
+        "perm.filter.repeat": "Repeated digits",
+        "perm.filter.seq": "Sequences",
+        "perm.search": "Search digits 🔎",
+        "perm.search_prompt": "Send the digits the number must contain (e.g. 1234):",
+        "perm.search_invalid": "Send digits only (at least 2).",
+        "perm.results": "{filter}: {count} numbers (cheapest first)",
+        "perm.results_query": "{filter} containing \"{query}\": {count} numbers (cheapest first)",
+        "perm.none": "No permanent numbers available right now.",
+        "perm.error": "Could not load the permanent number list.",
+        "perm.gone": "This number is no longer available.",
+        "perm.detail": (
+            "Permanent number:\n\n- Number: {number}\n- Type: {kind}\n- Price: {price} Toman\n\n"
+            "Message support to buy it."
+        ),
         "menu.buy_temp": "Buy Temporary Number",
         "menu.buy_perm": "Buy Permanent Number",
         "menu.wallet": "Wallet",
@@ -35,6 +187,107 @@ _STRINGS: Dict[str, Dict[str, str]] = {
         "menu.providers": "Providers",
         "menu.orders": "My purchases",
         "menu.active": "Active orders",
+        "common.back": "Back",
+        "common.prev": "⬅️ Prev",
+        "common.next": "Next ➡️",
+        "common.yes": "Yes",
+        "common.no": "No",
+        "common.no_permission": "No permission.",
+        "common.redis_error": "Redis error.",
+        "common.read_error": "Data read error.",
+        "common.error": "Error: {error}",
+        "price.from": " · from {price:,}",
+        "api.price_not_set": "Price is not set for purchase.",
+        "api.no_balance": "Insufficient panel balance.",
+        "api.bad_params": "Invalid parameters.",
+        "throttle.slow_down": "Slow down a little and try again in a moment.",
+        "api.service_inactive": "This service is not active right now.",
+        "api.operator_inactive": "This operator is not active right now.",
+        "api.country_inactive": "This country is not active right now.",
+        "api.unknown": "Unknown error.",
+        "wallet.balance": "Your wallet balance: {balance} Toman",
+        "wallet.insufficient": "Insufficient balance. Price: {price} Toman, balance: {balance} Toman",
+        "wallet.topup": "Increase balance",
+        "wallet.history": "History",
+        "wallet.history_empty": "No history.",
+        "wallet.credit": "+ Credit {amount}",
+        "wallet.debit": "- Debit {amount}",
+        "panel.balance": "Your balance: {balance} {currency}",
+        "panel.balance_error": "Failed to fetch balance.",
+        "topup.ask_amount": "Send top-up amount (Toman):",
+        "topup.invalid_amount": "Invalid amount. Send a number.",
+        "topup.amount_positive": "Amount must be greater than zero.",
+        "topup.approve": "Approve ✅",
+        "topup.reject": "Reject ❌",
+        "topup.admin_note": "New top-up request\nID: {id}\nUser: {user}\nAmount: {amount}",
+        "topup.submitted": "Your request was submitted and awaits approval.",
+        "topup.not_found": "Request not found or expired.",
+        "topup.already_processed": "Request already processed.",
+        "topup.credit_failed": "Crediting the wallet failed; the request is pending again.",
+        "topup.approved_user": "Your top-up was approved.",
+        "topup.approved": "Request approved.",
+        "topup.rejected_user": "Your top-up request was rejected.",
+        "topup.rejected": "Request rejected.",
+        "pricing.none": "No active pricing rules.",
+        "pricing.saved": "Rule saved: {key}",
+        "pricing.deleted": "Deleted.",
+        "pricing.not_found": "Not found.",
+        "admin.orders_none": "No active orders.",
+        "admin.orders_header": "Active orders: {total} (page {page})",
+        "admin.order_line": "{provider}:{id} | user {uid} | {number} | {status}",
+        "admin.topups_none": "No requests.",
+        "admin.topups_header": "Top-up requests: {total} (page {page})",
+        "admin.topup_line": "{id} | user {user} | {amount}",
+        "admin.topups_settled": "Done: {done}, skipped: {skipped}",
+        "admin.report_empty": "No sales in this period.",
+        "admin.report_header": "Last {buckets} {gran} buckets by {dim}:",
+        "admin.report_line": (
+            "{name}: orders {orders}, filled {filled} ({rate}%), revenue {revenue}, cost {cost}, margin {margin}, "
+            "buyers {buyers}"
+        ),
+        "buy.choose_provider": "Choose a provider:",
+        "buy.choose_service": "Choose a service:",
+        "buy.choose_country": "Choose a country:",
+        "buy.choose_operator": "Choose an operator:",
+        "buy.no_services": "No services available. Check configuration or balance.",
+        "buy.no_numbers": "No numbers available.",
+        "buy.op_min": "Cheapest (min)",
+        "buy.op_any": "Any (any)",
+        "buy.op_any_best": "Any (any → {op})",
+        "buy.op_rate": "{op} · {rate}%",
+        "buy.op_price": "{op} · {price} ({count})",
+        "buy.op_empty": "{op} · sold out",
+        "buy.op_empty_alert": "This operator has no numbers right now.",
+        "buy.confirm": "Confirm Purchase ✅",
+        "buy.quote": (
+            "Number info:\n\n- Available: {count}\n- Base amount: {amount} Toman\n- Final price: {price} Toman\n"
+            "- Repeat capable: {repeat}\n- Time window: {time}"
+        ),
+        "buy.error": "Purchase error: {error}",
+        "buy.done": (
+            "Number purchased:\n\n- ID: {id}\n- Number: {number}\n- Price: {amount} Toman\n"
+            "- Time: {time}\n- Repeat: {repeat}"
+        ),
+        "status.cancel": "Cancel",
+        "status.repeat": "Repeat",
+        "status.close": "Close",
+        "status.refresh": "Refresh",
+        "status.current": "Status: {status}",
+        "status.final": "Final status: {status}",
+        "status.expired": "Order {id} expired without a code.",
+        "status.code": "Code received:\n\n<code>{code}</code>",
+        "status.code_with_status": "Code received:\n\n<code>{code}</code>\n\nStatus: {status}",
+        "desc.wait_code": "wait code",
+        "desc.canceled": "number canceled",
+        "desc.banned": "number banned",
+        "desc.wait_code_again": "wait code again",
+        "desc.completed": "completed",
+        "desc.code_received": "code received",
+        "orders.none": "No purchases yet.",
+        "orders.line": "ID: {id} | Number: {number} | Price: {amount}",
+        "active.none": "No active orders.",
+        "active.line": "ID: {id} | Number: {number} | Status: {status} | Remaining: {mins:02d}:{secs:02d}",
+        "active.code": " | Code: {code}",
     },
     "ru": {
         "greet": "Добро пожаловать в бота Viranum. Выберите действие:",
@@ -42,22 +295,169 @@ _STRINGS: Dict[str, Dict[str, str]] = {
         "language_set": "Язык установлен.",
         "wallet.info": "Кошелёк: пополнение и история скоро.",
         "support.info": "Поддержка: помощь и контакты скоро.",
-        "buy_temp.stub": "Покупка временно��о номера: список сервис/страна/оператор скоро.",
-        "buy_perm.stub": "Постоянные номера: список красивых/полукрасивых скоро.",
+        "buy_temp.stub": "Покупка временного номера: список сервис/страна/оператор скоро.",
+        "perm.choose": "Постоянные номера ({count}). Выберите категорию или поиск:",
+        "perm.filter.all": "Все",
+        "perm.filter.round": "Красивые",
+        "perm.filter.half": "Полукрасивые",
+        "perm.filter.repeat": "Повторы цифр",
+        "perm.filter.seq": "Последовательности",
+        "perm.search": "Поиск по цифрам 🔎",
+        "perm.search_prompt": "Отправьте цифры, которые должен содержать номер (например 1234):",
+        "perm.search_invalid": "Отправьте только цифры (минимум 2).",
+        "perm.results": "{filter}: {count} номеров (сначала дешёвые)",
+        "perm.results_query": "{filter} с «{query}»: {count} номеров (сначала дешёвые)",
+        "perm.none": "Постоянных номеров сейчас нет.",
+        "perm.error": "Не удалось загрузить список постоянных номеров.",
+        "perm.gone": "Этот номер больше недоступен.",
+        "perm.detail": (
+            "Постоянный номер:\n\n- Номер: {number}\n- Тип: {kind}\n- Цена: {price} Томан\n\n"
+            "Для покупки напишите в поддержку."
+        ),
         "menu.buy_temp": "Купить временный номер",
         "menu.buy_perm": "Купить постоянный номер",
         "menu.wallet": "Кошелёк",
         "menu.support": "Поддержка",
         "menu.language": "Язык",
+        "menu.providers": "Провайдеры",
         "menu.orders": "Мои покупки",
         "menu.active": "Активные покупки",
+        "common.back": "Назад",
+        "common.prev": "⬅️ Назад",
+        "common.next": "Далее ➡️",
+        "common.yes": "Да",
+        "common.no": "Нет",
+        "common.no_permission": "Нет доступа.",
+        "common.redis_error": "Ошибка Redis.",
+        "common.read_error": "Ошибка чтения данных.",
+        "common.error": "Ошибка: {error}",
+        "price.from": " · от {price:,}",
+        "api.price_not_set": "Цена для покупки не установлена.",
+        "api.no_balance": "Недостаточно средств на панели.",
+        "api.bad_params": "Неверные параметры.",
+        "throttle.slow_down": "Не так быстро, повторите через мгновение.",
+        "api.service_inactive": "Этот сервис сейчас неактивен.",
+        "api.operator_inactive": "Этот оператор сейчас неактивен.",
+        "api.country_inactive": "Эта страна сейчас неактивна.",
+        "api.unknown": "Неизвестная ошибка.",
+        "wallet.balance": "Баланс кошелька: {balance} Томан",
+        "wallet.insufficient": "Недостаточно средств. Цена: {price} Томан, баланс: {balance} Томан",
+        "wallet.topup": "Пополнить баланс",
+        "wallet.history": "История",
+        "wallet.history_empty": "История отсутствует.",
+        "wallet.credit": "+ Пополнение {amount}",
+        "wallet.debit": "- Списание {amount}",
+        "panel.balance": "Ваш баланс: {balance} {currency}",
+        "panel.balance_error": "Не удалось получить баланс.",
+        "topup.ask_amount": "Отправьте сумму пополнения (Томан):",
+        "topup.invalid_amount": "Неверная сумма. Отправьте число.",
+        "topup.amount_positive": "Сумма должна быть больше нуля.",
+        "topup.approve": "Одобрить ✅",
+        "topup.reject": "Отклонить ❌",
+        "topup.admin_note": "Новый запрос на пополнение\nID: {id}\nUser: {user}\nAmount: {amount}",
+        "topup.submitted": "Ваш запрос отправлен и ожидает одобрения.",
+        "topup.not_found": "Запрос не найден или истёк.",
+        "topup.already_processed": "Запрос уже обработан.",
+        "topup.credit_failed": "Не удалось пополнить кошелёк; запрос снова ожидает подтверждения.",
+        "topup.approved_user": "Ваше пополнение одобрено.",
+        "topup.approved": "Запрос одобрен.",
+        "topup.rejected_user": "Ваш запрос на пополнение отклонён.",
+        "topup.rejected": "Запрос отклонён.",
+        "pricing.none": "Нет активных правил цен.",
+        "pricing.saved": "Правило сохранено: {key}",
+        "pricing.deleted": "Удалено.",
+        "pricing.not_found": "Не найдено.",
+        "admin.orders_none": "Нет активных заказов.",
+        "admin.orders_header": "Активные заказы: {total} (стр. {page})",
+        "admin.order_line": "{provider}:{id} | пользователь {uid} | {number} | {status}",
+        "admin.topups_none": "Запросов нет.",
+        "admin.topups_header": "Запросы на пополнение: {total} (стр. {page})",
+        "admin.topup_line": "{id} | пользователь {user} | {amount}",
+        "admin.topups_settled": "Готово: {done}, пропущено: {skipped}",
+        "admin.report_empty": "Продаж за этот период нет.",
+        "admin.report_header": "Последние {buckets} интервалов {gran} по {dim}:",
+        "admin.report_line": (
+            "{name}: заказы {orders}, выполнено {filled} ({rate}%), выручка {revenue}, себестоимость {cost}, "
+            "маржа {margin}, покупатели {buyers}"
+        ),
+        "buy.choose_provider": "Выберите провайдера:",
+        "buy.choose_service": "Выберите сервис:",
+        "buy.choose_country": "Выберите страну:",
+        "buy.choose_operator": "Выберите оператора:",
+        "buy.no_services": "Сервисы недоступны. Проверьте настройки или баланс.",
+        "buy.no_numbers": "Нет доступных номеров.",
+        "buy.op_min": "Самый дешёвый (min)",
+        "buy.op_any": "Любой (any)",
+        "buy.op_any_best": "Любой (any → {op})",
+        "buy.op_rate": "{op} · {rate}%",
+        "buy.op_price": "{op} · {price} ({count})",
+        "buy.op_empty": "{op} · нет в наличии",
+        "buy.op_empty_alert": "У этого оператора сейчас нет номеров.",
+        "buy.confirm": "Подтвердить покупку ✅",
+        "buy.quote": (
+            "Информация о номере:\n\n- Доступно: {count}\n- Базовая цена: {amount} Томан\n"
+            "- Итоговая цена: {price} Томан\n- Повтор возможен: {repeat}\n- Временное окно: {time}"
+        ),
+        "buy.error": "Ошибка покупки: {error}",
+        "buy.done": (
+            "Номер куплен:\n\n- ID: {id}\n- Номер: {number}\n- Цена: {amount} Томан\n"
+            "- Время: {time}\n- Повтор: {repeat}"
+        ),
+        "status.cancel": "Отмена",
+        "status.repeat": "Повтор",
+        "status.close": "Закрыть",
+        "status.refresh": "Обновить",
+        "status.current": "Статус: {status}",
+        "status.final": "Итоговый статус: {status}",
+        "status.expired": "Заказ {id} истёк без кода.",
+        "status.code": "Код получен:\n\n<code>{code}</code>",
+        "status.code_with_status": "Код получен:\n\n<code>{code}</code>\n\nСтатус: {status}",
+        "desc.wait_code": "ожидайте код",
+        "desc.canceled": "номер отменён",
+        "desc.banned": "номер заблокирован",
+        "desc.wait_code_again": "ожидание повторного кода",
+        "desc.completed": "завершено",
+        "desc.code_received": "код получен",
+        "orders.none": "Покупки отсутствуют.",
+        "orders.line": "ID: {id} | Номер: {number} | Цена: {amount}",
+        "active.none": "Активных покупок нет.",
+        "active.line": "ID: {id} | Номер: {number} | Статус: {status} | Осталось: {mins:02d}:{secs:02d}",
+        "active.code": " | Код: {code}",
     },
 }
 
+# provider status descriptions (lower-cased) -> catalog key
+STATUS_DESC_KEYS = {
+    "wait code": "desc.wait_code",
+    "number canceled": "desc.canceled",
+    "number banned": "desc.banned",
+    "wait code again": "desc.wait_code_again",
+    "completed": "desc.completed",
+    "code received": "desc.code_received",
+}
+
+
+def _compile(strings: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+    base = strings[DEFAULT_LANG]
+    keys = sorted({k for msgs in strings.values() for k in msgs})
+    return {
+        lang: {sys.intern(k): msgs.get(k, base.get(k, k)) for k in keys}
+        for lang, msgs in strings.items()
+    }
+
+
+_CATALOGS = _compile(_STRINGS)
+_DEFAULT = _CATALOGS[DEFAULT_LANG]
+
+
+def catalog(lang: str) -> Mapping[str, str]:
+    """Compiled message table for ``lang`` (DEFAULT_LANG for unknown languages)."""
+    return _CATALOGS.get(lang, _DEFAULT)
+
 
-def tr(key: str, lang: str) -> str:
-    lang = lang if lang in _STRINGS else "fa"
-    return _STRINGS.get(lang, {}).get(key, _STRINGS["fa"].get(key, key))
+def tr(key: str, lang: str, **fields: Any) -> str:
+    msg = _CATALOGS.get(lang, _DEFAULT).get(key, key)
+    return msg.format_map(fields) if fields else msg
 
 
 def set_locale_middleware(dp):
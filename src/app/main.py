@@ -1,42 +1,91 @@
-import asyncio
-import logging
-import json
-import time
-from typing import Any, Dict, List, Optional, Tuple
-
-from aiogram import Bot, Dispatcher, F
-from aiogram.enums import ParseMode
-from aiogram.fsm.context import FSMContext
-from aiogram.fsm.state import State, StatesGroup
-from aiogram.fsm.storage.redis import RedisStorage
-from aiogram.types import Message, CallbackQuery
-from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.client.default import DefaultBotProperties
-from aiogram.exceptions import TelegramBadRequest
-
-from .config import settings
-from .i18n import tr, set_locale_middleware
-from .utils.logger import setup_logging
-from .services.numberland_client import NumberlandClient, NumberlandAPIError
-from .services.pricing import calculate_price
-from .utils.enums import NumberStatus
-from .providers.registry import (
+from .utils.startup import startup
+
+startup.trace_imports()
+
+import asyncio  # noqa: E402
+import logging  # noqa: E402
+import time  # noqa: E402
+from typing import Any, Dict, List, Optional, Set, Tuple  # noqa: E402
+
+from aiogram import Bot, Dispatcher, F  # noqa: E402
+from aiogram.enums import ParseMode  # noqa: E402
+from aiogram.fsm.context import FSMContext  # noqa: E402
+from aiogram.fsm.state import State, StatesGroup  # noqa: E402
+from aiogram.fsm.storage.redis import RedisStorage  # noqa: E402
+from aiogram.types import Message, CallbackQuery, InlineKeyboardButton  # noqa: E402
+from aiogram.utils.keyboard import InlineKeyboardBuilder  # noqa: E402
+from aiogram.client.default import DefaultBotProperties  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.exceptions import TelegramBadRequest  # noqa: E402
+from redis.exceptions import WatchError  # noqa: E402
+
+from .config import settings  # noqa: E402
+from .i18n import LANGS, STATUS_DESC_KEYS, tr, set_locale_middleware  # noqa: E402
+from .utils.logger import setup_logging  # noqa: E402
+from .utils import codec  # noqa: E402
+from .services.pricing import PricingRule, pricing_engine, rule_key  # noqa: E402
+from .services.price_sheet import price_sheets  # noqa: E402
+from .utils.enums import NumberStatus, OrderEventKind  # noqa: E402
+from .providers.registry import (  # noqa: E402
     get_provider,
     enabled_providers,
     provider_display_name_map,
 )
-from .utils.keyboards_ext import status_kb_provider
-
+from .utils.keyboards_ext import status_kb_provider  # noqa: E402
+from .services.outbox import Priority, get_outbox, start_outbox, stop_outbox  # noqa: E402
+from .services.order_events import EVENT_FOR_STATUS, TERMINAL, UNFILLED, OrderEvent, order_events, publish  # noqa: E402
+from .services.order_expiry import EXPIRY_KEY, member as expiry_member, order_expiry  # noqa: E402
+from .services.analytics import (  # noqa: E402
+    DIMENSIONS,
+    GRANULARITY,
+    dimension_values,
+    purchase_target,
+    record_purchase,
+    record_settlement,
+    report,
+)
+from .services.operator_stats import (  # noqa: E402
+    OPERATORS,
+    OperatorStat,
+    best_operator,
+    operator_stats,
+    ranked as ranked_operators,
+    record_outcome,
+)
+from .services.operator_quotes import cheapest, in_stock, operator_quotes  # noqa: E402
+from .services.quote_prefetch import quote_prefetch  # noqa: E402
+from .services.negative_cache import Blocked, negative_cache  # noqa: E402
+from .services import purchase_guard  # noqa: E402
+from .services.admin_index import (  # noqa: E402
+    ORDER_STATUSES,
+    TOPUP_STATUSES,
+    create_topup,
+    index_order,
+    list_orders,
+    list_topups,
+    move_order_status,
+    pending_topup_ids,
+    set_topup_status,
+    unindex_order,
+)
+from .services.catalog import catalogs, load_snapshot, save_snapshot  # noqa: E402
+from .services.perm_numbers import TAGS as PERM_TAGS, PermNumber, perm_numbers  # noqa: E402
+from .services.redis_client import close_redis_client, get_redis_client  # noqa: E402
+from .middlewares.metrics import HandlerMetricsMiddleware  # noqa: E402
+from .middlewares.throttle import ThrottleMiddleware  # noqa: E402
+from .middlewares.tracing import setup_tracing  # noqa: E402
+from .utils.metrics import GAUGES, start_metrics_server  # noqa: E402
+from .utils.tracing import Tracer  # noqa: E402
+
+startup.stop_tracing_imports()
+startup.mark("imports")
 
 # ---------------------- Helpers ----------------------
 
 def get_lang_from_user(obj) -> str:
     lang = getattr(getattr(obj, "from_user", None), "language_code", None) or settings.LOCALE_DEFAULT
-    return lang if lang in {"fa", "en", "ru"} else settings.LOCALE_DEFAULT
-
-
-def t(lang: str, fa: str, en: str, ru: str) -> str:
-    return {"fa": fa, "en": en, "ru": ru}.get(lang, fa)
+    return lang if lang in LANGS else settings.LOCALE_DEFAULT
 
 
 def parse_time_to_seconds(time_str: str) -> int:
@@ -55,14 +104,32 @@ def localize_api_error(lang: str, code: Optional[int], description: str) -> str:
 
     # Known mappings
     if code == -206 or desc_key == "price not set":
-        return t(lang, "قیمت برای خرید تنظیم نشده است.", "Price is not set for purchase.", "Цена для покупки не установлена.")
+        return tr("api.price_not_set", lang)
     if code == -205 or desc_key == "no balance":
-        return t(lang, "موجودی پنل کافی نیست.", "Insufficient panel balance.", "Недостаточно средств на панели.")
+        return tr("api.no_balance", lang)
     if code == -202 or desc_key == "parameters not found":
-        return t(lang, "پارامترها نامعتبر هستند.", "Invalid parameters.", "Неверные параметры.")
+        return tr("api.bad_params", lang)
+    if code == -210 or desc_key == "service is not active":
+        return tr("api.service_inactive", lang)
+    if code == -211 or desc_key == "operator is not active":
+        return tr("api.operator_inactive", lang)
+    if code == -212 or desc_key == "country is not active":
+        return tr("api.country_inactive", lang)
 
     # Fallback
-    return description or t(lang, "خطای نامشخص.", "Unknown error.", "Неизвестная ошибка.")
+    return description or tr("api.unknown", lang)
+
+
+async def notify(bot: Bot, chat_id: int, text: str, priority: Priority = Priority.USER, **kwargs: Any) -> None:
+    # Go through the outbound queue so bursts are smoothed instead of dropped
+    outbox = get_outbox()
+    if outbox is not None:
+        outbox.send(chat_id, text, priority=priority, **kwargs)
+        return
+    try:
+        await bot.send_message(chat_id, text, **kwargs)
+    except Exception:
+        pass
 
 
 # ---------------------- Keyboards ----------------------
@@ -86,7 +153,7 @@ def main_kb(lang: str, provider_key: Optional[str] = None):
     b.button(text=tr("menu.orders", lang), callback_data="orders")
     b.button(text=tr("menu.support", lang), callback_data="support")
     b.button(text=tr("menu.language", lang), callback_data="language")
-    b.button(text=t(lang, "ارائه‌دهنده‌ها", "Providers", "Провайдеры"), callback_data="providers")
+    b.button(text=tr("menu.providers", lang), callback_data="providers")
     b.adjust(2, 2, 3)
     return b.as_markup()
 
@@ -100,98 +167,207 @@ def language_kb():
     return b.as_markup()
 
 
-def services_kb(services: List[Dict[str, Any]], page: int, per_page: int, lang: str):
+def price_from_label(lang: str, price: Optional[int]) -> str:
+    if not price:
+        return ""
+    return tr("price.from", lang, price=price)
+
+
+def services_kb(
+    services: List[Dict[str, Any]],
+    page: int,
+    per_page: int,
+    lang: str,
+    from_prices: Optional[Dict[str, int]] = None,
+    hidden: Optional[Set[str]] = None,
+):
     b = InlineKeyboardBuilder()
+    from_prices = from_prices or {}
+    hidden = hidden or set()
     start = page * per_page
     end = start + per_page
     page_items = services[start:end]
 
     for sv in page_items:
-        if str(sv.get("active", 1)) != "1":
+        if str(sv.get("active", 1)) != "1" or str(sv["id"]) in hidden:
             continue
         name_fa = sv.get("name") or ""
         name_en = sv.get("name_en") or name_fa
         name = name_fa if lang == "fa" else name_en
+        name += price_from_label(lang, from_prices.get(str(sv["id"])))
         b.button(text=name, callback_data=f"sv:s:{sv['id']}:{page}")
 
     nav_row = []
     if page > 0:
-        nav_row.append((t(lang, "⬅️ قبلی", "⬅️ Prev", "⬅️ Назад"), f"sv:p:{page-1}"))
+        nav_row.append((tr("common.prev", lang), f"sv:p:{page-1}"))
     if end < len(services):
-        nav_row.append((t(lang, "بعدی ➡️", "Next ➡️", "Далее ➡️"), f"sv:p:{page+1}"))
+        nav_row.append((tr("common.next", lang), f"sv:p:{page+1}"))
 
     for text, data in nav_row:
         b.button(text=text, callback_data=data)
 
-    b.button(text=t(lang, "بازگشت", "Back", "Назад"), callback_data="home")
+    b.button(text=tr("common.back", lang), callback_data="home")
     b.adjust(2)
     return b.as_markup()
 
 
-def countries_kb(countries: List[Dict[str, Any]], page: int, per_page: int, lang: str):
+def countries_kb(
+    countries: List[Dict[str, Any]],
+    page: int,
+    per_page: int,
+    lang: str,
+    from_prices: Optional[Dict[str, int]] = None,
+    hidden: Optional[Set[str]] = None,
+):
     b = InlineKeyboardBuilder()
+    from_prices = from_prices or {}
+    hidden = hidden or set()
     start = page * per_page
     end = start + per_page
     page_items = countries[start:end]
 
     for ct in page_items:
-        if str(ct.get("active", 1)) != "1":
+        if str(ct.get("active", 1)) != "1" or str(ct["id"]) in hidden:
             continue
         name_fa = ct.get("name") or ""
         name_en = ct.get("name_en") or name_fa
         name = name_fa if lang == "fa" else name_en
         emoji = ct.get("emoji") or ""
-        b.button(text=f"{emoji} {name}", callback_data=f"ct:s:{ct['id']}:{page}")
+        price = price_from_label(lang, from_prices.get(str(ct["id"])))
+        b.button(text=f"{emoji} {name}{price}", callback_data=f"ct:s:{ct['id']}:{page}")
 
     nav_row = []
     if page > 0:
-        nav_row.append((t(lang, "⬅️ قبلی", "⬅️ Prev", "⬅️ Назад"), f"ct:p:{page-1}"))
+        nav_row.append((tr("common.prev", lang), f"ct:p:{page-1}"))
     if end < len(countries):
-        nav_row.append((t(lang, "بعدی ➡️", "Next ➡️", "Далее ➡️"), f"ct:p:{page+1}"))
+        nav_row.append((tr("common.next", lang), f"ct:p:{page+1}"))
 
     for text, data in nav_row:
         b.button(text=text, callback_data=data)
 
-    b.button(text=t(lang, "بازگشت", "Back", "Назад"), callback_data="buy_temp")
+    b.button(text=tr("common.back", lang), callback_data="buy_temp")
     b.adjust(2)
     return b.as_markup()
 
 
-def operators_kb(lang: str):
-    b = InlineKeyboardBuilder()
-    ops = [
-        ("1", "1"),
-        ("2", "2"),
-        ("3", "3"),
-        ("4", "4"),
-        (t(lang, "ارزان‌ترین (min)", "Cheapest (min)", "Самый дешёвый (min)"), "min"),
-        (t(lang, "هرکدام (any)", "Any (any)", "Любой (any)"), "any"),
+def visible_country_ids(
+    countries: List[Dict[str, Any]], page: int, per_page: int, hidden: Optional[Set[str]] = None
+) -> List[str]:
+    """Ids of the active countries countries_kb shows on ``page``."""
+    hidden = hidden or set()
+    return [
+        str(ct["id"]) for ct in countries[page * per_page:(page + 1) * per_page]
+        if str(ct.get("active", 1)) == "1" and str(ct["id"]) not in hidden
     ]
-    for label, code in ops:
-        b.button(text=label, callback_data=f"op:{code}")
-    b.button(text=t(lang, "بازگشت", "Back", "Назад"), callback_data="buy_temp")
-    b.adjust(3, 3, 1)
+
+
+def operators_kb(
+    lang: str,
+    stats: Optional[Dict[str, OperatorStat]] = None,
+    quotes: Optional[Dict[str, Dict[str, Any]]] = None,
+    prices: Optional[Dict[str, int]] = None,
+    hidden: Optional[Set[str]] = None,
+):
+    """Operator picker; with ``stats``, operators show their code-delivery rate and the best one a star.
+
+    With ``quotes`` (operator -> quote) and ``prices`` (operator -> final price), operators show price and
+    stock, and those without numbers get an inert button. ``hidden`` operators (known inactive) are left out.
+    """
+    b = InlineKeyboardBuilder()
+    hidden = hidden or set()
+    shown = {s.operator: s for s in ranked_operators(stats or {})}
+    best = best_operator(stats or {})
+    if best in hidden or (quotes and not in_stock(quotes.get(best or ""))):
+        best = None
+    ops = []
+    for code in OPERATORS:
+        if code in hidden:
+            continue
+        st = shown.get(code)
+        label = tr("buy.op_rate", lang, op=code, rate=round(st.rate * 100)) if st else code
+        if quotes:
+            q = quotes.get(code)
+            if not in_stock(q):
+                ops.append((tr("buy.op_empty", lang, op=label), f"op:x:{code}"))
+                continue
+            label = tr("buy.op_price", lang, op=label, price=(prices or {}).get(code, q["amount"]), count=q["count"])
+        ops.append(("⭐ " + label if code == best else label, f"op:{code}"))
+    ops.append((tr("buy.op_min", lang), "op:min"))
+    if best and settings.OPERATOR_ROUTING:
+        ops.append((tr("buy.op_any_best", lang, op=best), "op:any"))
+    else:
+        ops.append((tr("buy.op_any", lang), "op:any"))
+    for label, data in ops:
+        b.button(text=label, callback_data=data)
+    b.adjust(2 if quotes else 3)
+    b.row(InlineKeyboardButton(text=tr("common.back", lang), callback_data="buy_temp"))
     return b.as_markup()
 
 
 def confirm_kb(lang: str):
     b = InlineKeyboardBuilder()
-    b.button(text=t(lang, "تایید خرید ✅", "Confirm Purchase ✅", "Подтвердить покупку ✅"), callback_data="cf:buy")
-    b.button(text=t(lang, "بازگشت", "Back", "Назад"), callback_data="buy_temp")
+    b.button(text=tr("buy.confirm", lang), callback_data="cf:buy")
+    b.button(text=tr("common.back", lang), callback_data="buy_temp")
     b.adjust(1, 1)
     return b.as_markup()
 
 
 def status_kb(lang: str, provider_key: str, number_id: str):
     b = InlineKeyboardBuilder()
-    b.button(text=t(lang, "لغو", "Cancel", "Отмена"), callback_data=f"st:cancel:{number_id}")
-    b.button(text=t(lang, "کد مجدد", "Repeat", "Повтор"), callback_data=f"st:repeat:{number_id}")
-    b.button(text=t(lang, "بستن", "Close", "Закрыть"), callback_data=f"st:close:{number_id}")
-    b.button(text=t(lang, "به‌روزرسانی", "Refresh", "Обновить"), callback_data=f"st:refresh:{number_id}")
+    b.button(text=tr("status.cancel", lang), callback_data=f"st:cancel:{number_id}")
+    b.button(text=tr("status.repeat", lang), callback_data=f"st:repeat:{number_id}")
+    b.button(text=tr("status.close", lang), callback_data=f"st:close:{number_id}")
+    b.button(text=tr("status.refresh", lang), callback_data=f"st:refresh:{number_id}")
     b.adjust(3, 1)
     return b.as_markup()
 
 
+PERM_PER_PAGE = 8
+PERM_PRICING_SERVICE = "perm"  # pricing rules with service "perm" apply to permanent numbers
+
+
+def perm_price(n: PermNumber) -> int:
+    return pricing_engine.quote(n.price, PERM_PRICING_SERVICE, "", "")
+
+
+def perm_filters_kb(lang: str, counts: Dict[str, int]):
+    b = InlineKeyboardBuilder()
+    for tag in ("all", *PERM_TAGS):
+        b.button(text=f"{tr(f'perm.filter.{tag}', lang)} ({counts.get(tag, 0)})", callback_data=f"pm:l:{tag}:0:")
+    b.button(text=tr("perm.search", lang), callback_data="pm:search")
+    b.button(text=tr("common.back", lang), callback_data="home")
+    b.adjust(1, 2, 2, 1, 1)
+    return b.as_markup()
+
+
+def perm_search_kb(lang: str):
+    # back to the filters; buy_perm_handler clears PermSearch.waiting_digits
+    b = InlineKeyboardBuilder()
+    b.button(text=tr("common.back", lang), callback_data="buy_perm")
+    return b.as_markup()
+
+
+def perm_numbers_kb(numbers: List[PermNumber], page: int, tag: str, query: str, lang: str):
+    b = InlineKeyboardBuilder()
+    start = page * PERM_PER_PAGE
+    end = start + PERM_PER_PAGE
+    for n in numbers[start:end]:
+        b.button(text=f"{n.number} | {perm_price(n)}", callback_data=f"pm:n:{n.id}")
+
+    nav_row = []
+    if page > 0:
+        nav_row.append((tr("common.prev", lang), f"pm:l:{tag}:{page-1}:{query}"))
+    if end < len(numbers):
+        nav_row.append((tr("common.next", lang), f"pm:l:{tag}:{page+1}:{query}"))
+
+    for text, data in nav_row:
+        b.button(text=text, callback_data=data)
+
+    b.button(text=tr("common.back", lang), callback_data="buy_perm")
+    b.adjust(*([1] * len(numbers[start:end])), len(nav_row) or 1, 1)
+    return b.as_markup()
+
+
 # ---------------------- FSM ----------------------
 
 class BuyTemp(StatesGroup):
@@ -209,6 +385,17 @@ class WalletTopUp(StatesGroup):
     waiting_amount = State()
 
 
+class PermSearch(StatesGroup):
+    waiting_digits = State()
+
+
+# commands registered in build_dispatcher (the throttle never sheds them)
+BOT_COMMANDS = (
+    "/start", "/balance", "/pricing", "/pricing_set", "/pricing_del",
+    "/orders", "/report", "/topups", "/topups_approve", "/topups_reject",
+)
+
+
 def admin_ids() -> List[int]:
     ids: List[int] = []
     for part in (settings.ADMIN_IDS or "").split(","):
@@ -223,18 +410,14 @@ def admin_ids() -> List[int]:
 
 
 async def get_redis():
-    try:
-        from redis.asyncio import from_url
-        return from_url(settings.REDIS_DSN)
-    except Exception:
-        return None
+    return get_redis_client()
 
 
 async def set_user_lang(user_id: int, lang: str) -> None:
     r = await get_redis()
     if not r:
         return
-    if lang not in {"fa", "en", "ru"}:
+    if lang not in LANGS:
         lang = settings.LOCALE_DEFAULT
     await r.set(f"user:lang:{user_id}", lang)
 
@@ -248,12 +431,12 @@ async def get_lang(obj) -> str:
             v = await r.get(f"user:lang:{uid}")
             if v:
                 val = v.decode() if isinstance(v, (bytes, bytearray)) else str(v)
-                if val in {"fa", "en", "ru"}:
+                if val in LANGS:
                     return val
         except Exception:
             pass
     base = tg_lang or settings.LOCALE_DEFAULT
-    return base if base in {"fa", "en", "ru"} else settings.LOCALE_DEFAULT
+    return base if base in LANGS else settings.LOCALE_DEFAULT
 
 
 # ---------------------- Provider selection ----------------------
@@ -292,7 +475,7 @@ def providers_kb(lang: str):
     for k in keys:
         label = names.get(k, k)
         b.button(text=label, callback_data=f"pv:set:{k}")
-    b.button(text=t(lang, "بازگشت", "Back", "Назад"), callback_data="home")
+    b.button(text=tr("common.back", lang), callback_data="home")
     b.adjust(2, 2, 1)
     return b.as_markup()
 
@@ -309,7 +492,7 @@ async def wallet_add_tx(user_id: int, tx: Dict[str, Any]):
     r = await get_redis()
     if not r:
         return
-    await r.lpush(f"wallet:tx:{user_id}", json.dumps(tx, ensure_ascii=False))
+    await r.lpush(f"wallet:tx:{user_id}", codec.dumps(tx))
     await r.ltrim(f"wallet:tx:{user_id}", 0, 49)  # keep last 50
 
 
@@ -347,7 +530,7 @@ async def wallet_history(user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
     out: List[Dict[str, Any]] = []
     for it in items:
         try:
-            out.append(json.loads(it))
+            out.append(codec.loads(it))
         except Exception:
             continue
     return out
@@ -356,6 +539,11 @@ async def wallet_history(user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
 # ---------------------- Handlers ----------------------
 
 async def on_startup(bot: Bot):
+    # menus and price labels come from the last snapshot right away; live data replaces it in the background
+    load_snapshot()
+    startup.mark("snapshot")
+    catalogs.start(enabled_providers())
+    perm_numbers.start(enabled_providers())
     logging.getLogger(__name__).info("Bot started")
 
 
@@ -373,7 +561,7 @@ async def start_handler(message: Message, state: FSMContext):
     if not prov_key:
         await state.update_data(pending_after_provider="home")
         await message.answer(
-            t(lang, "ارائه‌دهنده را انتخاب کنید:", "Choose a provider:", "Выберите провайдера:"),
+            tr("buy.choose_provider", lang),
             reply_markup=providers_kb(lang),
         )
         return
@@ -382,6 +570,7 @@ async def start_handler(message: Message, state: FSMContext):
 
 async def home_handler(call: CallbackQuery, state: FSMContext):
     await state.clear()
+    quote_prefetch.cancel(call.from_user.id)
     lang = await get_lang(call)
     await call.answer()
     prov_key = await get_user_provider(call)
@@ -404,7 +593,7 @@ async def providers_handler(call: CallbackQuery, state: FSMContext):
     await call.answer()
     await state.update_data(pending_after_provider="home")
     await safe_edit_text(call.message, 
-        t(lang, "ارائه‌دهنده را انتخاب کنید:", "Choose a provider:", "Выберите провайдера:"),
+        tr("buy.choose_provider", lang),
         reply_markup=providers_kb(lang),
     )
 
@@ -418,14 +607,14 @@ async def set_provider_handler(call: CallbackQuery, state: FSMContext):
     pending = data.get("pending_after_provider")
     if pending == "buy_temp":
         # continue the buy flow: fetch services and show
-        prov = get_provider(key)
-        services = await prov.get_services()
-        services = services if isinstance(services, list) else []
+        services = await catalogs.services(key)
         await state.set_state(BuyTemp.choosing_service)
         await state.update_data(services=services, sv_page=0, lang=lang, provider_key=key)
         await safe_edit_text(call.message, 
-            t(lang, "یک سرویس انتخاب کنید:", "Choose a service:", "Выберите сервис:"),
-            reply_markup=services_kb(services, 0, 8, lang),
+            tr("buy.choose_service", lang),
+            reply_markup=services_kb(
+                services, 0, 8, lang, price_sheets.service_floor(key), (await _blocked(key)).services()
+            ),
         )
         return
     # default: back to home
@@ -435,9 +624,9 @@ async def set_provider_handler(call: CallbackQuery, state: FSMContext):
 
 async def wallet_kb(lang: str):
     b = InlineKeyboardBuilder()
-    b.button(text=t(lang, "افزایش موجودی", "Increase balance", "Пополнить баланс"), callback_data="w:topup")
-    b.button(text=t(lang, "تاریخچه", "History", "История"), callback_data="w:history")
-    b.button(text=t(lang, "بازگشت", "Back", "Назад"), callback_data="home")
+    b.button(text=tr("wallet.topup", lang), callback_data="w:topup")
+    b.button(text=tr("wallet.history", lang), callback_data="w:history")
+    b.button(text=tr("common.back", lang), callback_data="home")
     b.adjust(2, 1)
     return b.as_markup()
 
@@ -447,7 +636,7 @@ async def wallet_handler(call: CallbackQuery, state: FSMContext):
     await call.answer()
     uid = call.from_user.id
     bal = await wallet_get_balance(uid)
-    text = t(lang, "موجودی کیف پول شما: ", "Your wallet balance: ", "Баланс кошелька: ") + f"{bal} تومان"
+    text = tr("wallet.balance", lang, balance=bal)
     await safe_edit_text(call.message, text, reply_markup=await wallet_kb(lang))
 
 
@@ -459,9 +648,9 @@ async def balance_cmd(message: Message):
         bal = await prov.balance()
         balance = bal.get("BALANCE") or bal.get("balance")
         currency = bal.get("CURRENCY") or bal.get("currency") or "Toman"
-        await message.answer(t(lang, "موجودی شما: ", "Your balance: ", "Ваш баланс: ") + f"{balance} {currency}")
+        await message.answer(tr("panel.balance", lang, balance=balance, currency=currency))
     except Exception:
-        await message.answer(t(lang, "خطا در دریافت موجودی.", "Failed to fetch balance.", "Не удалось получить баланс."))
+        await message.answer(tr("panel.balance_error", lang))
 
 
 async def support_handler(call: CallbackQuery):
@@ -476,7 +665,7 @@ async def wallet_topup_start_handler(call: CallbackQuery, state: FSMContext):
     lang = await get_lang(call)
     await call.answer()
     await state.set_state(WalletTopUp.waiting_amount)
-    await safe_edit_text(call.message, t(lang, "مبلغ شارژ را به تومان ارسال کنید:", "Send top-up amount (Toman):", "Отправьте сумму пополнения (Томан):"))
+    await safe_edit_text(call.message, tr("topup.ask_amount", lang))
 
 
 async def topup_amount_input_handler(message: Message, state: FSMContext, bot: Bot):
@@ -485,11 +674,11 @@ async def topup_amount_input_handler(message: Message, state: FSMContext, bot: B
     try:
         amount = int(text)
     except ValueError:
-        await message.answer(t(lang, "مبلغ نامعتبر است. یک عدد ارسال کنید.", "Invalid amount. Send a number.", "Неверная сумма. Отправьте число."))
+        await message.answer(tr("topup.invalid_amount", lang))
         return
 
     if amount <= 0:
-        await message.answer(t(lang, "مبلغ باید بزرگتر از صفر باشد.", "Amount must be greater than zero.", "Сумма должна быть больше нуля."))
+        await message.answer(tr("topup.amount_positive", lang))
         return
 
     uid = message.from_user.id
@@ -497,29 +686,23 @@ async def topup_amount_input_handler(message: Message, state: FSMContext, bot: B
 
     r = await get_redis()
     if r:
-        payload = {"user_id": uid, "amount": amount, "status": "pending"}
-        await r.set(f"wallet:topup:{req_id}", json.dumps(payload, ensure_ascii=False), ex=86400)
+        await create_topup(r, req_id, {"user_id": uid, "amount": amount, "status": "pending"})
 
     # notify admins
     admins = admin_ids()
     kb = InlineKeyboardBuilder()
-    kb.button(text=t(lang, "تایید ✅", "Approve ✅", "Одобрить ✅"), callback_data=f"w:approve:{req_id}")
-    kb.button(text=t(lang, "رد ❌", "Reject ❌", "Отклонить ❌"), callback_data=f"w:reject:{req_id}")
+    kb.button(text=tr("topup.approve", lang), callback_data=f"w:approve:{req_id}")
+    kb.button(text=tr("topup.reject", lang), callback_data=f"w:reject:{req_id}")
     kb.adjust(2)
 
-    note = (
-        t(lang, "درخواست شارژ جدید", "New top-up request", "Новый запрос на пополнение")
-        + f"\nID: {req_id}\nUser: {uid}\nAmount: {amount}"
-    )
+    note = tr("topup.admin_note", lang, id=req_id, user=uid, amount=amount)
 
+    markup = kb.as_markup()
     for admin_id in admins:
-        try:
-            await bot.send_message(admin_id, note, reply_markup=kb.as_markup())
-        except Exception:
-            continue
+        await notify(bot, admin_id, note, Priority.ADMIN, reply_markup=markup)
 
     await state.clear()
-    await message.answer(t(lang, "درخواست شما ثبت شد و در انتظار تایید است.", "Your request was submitted and awaits approval.", "Ваш запрос отправлен и ожидает одобрения."))
+    await message.answer(tr("topup.submitted", lang))
 
 
 async def wallet_history_handler(call: CallbackQuery):
@@ -528,7 +711,7 @@ async def wallet_history_handler(call: CallbackQuery):
     uid = call.from_user.id
     items = await wallet_history(uid, 10)
     if not items:
-        await safe_edit_text(call.message, t(lang, "تاریخچه‌ای موجود نیست.", "No history.", "История отсутствует."), reply_markup=await wallet_kb(lang))
+        await safe_edit_text(call.message, tr("wallet.history_empty", lang), reply_markup=await wallet_kb(lang))
         return
 
     lines = []
@@ -536,80 +719,262 @@ async def wallet_history_handler(call: CallbackQuery):
         typ = it.get("type")
         amount = it.get("amount")
         if typ == "credit":
-            lines.append(t(lang, "+ شارژ ", "+ Credit ", "+ Пополнение ") + f"{amount}")
+            lines.append(tr("wallet.credit", lang, amount=amount))
         elif typ == "debit":
-            lines.append(t(lang, "- برداشت ", "- Debit ", "- Списание ") + f"{amount}")
+            lines.append(tr("wallet.debit", lang, amount=amount))
         else:
-            lines.append(json.dumps(it, ensure_ascii=False))
+            lines.append(codec.dumps_str(it))
     text = "\n".join(lines)
     await safe_edit_text(call.message, text, reply_markup=await wallet_kb(lang))
 
 
-async def wallet_topup_approve_handler(call: CallbackQuery, bot: Bot):
+async def settle_topup(bot: Bot, req_id: str, approve: bool, lang: str) -> Optional[str]:
+    """Approve or reject a pending request; None if done, else the i18n key explaining why not."""
+    r = await get_redis()
+    if not r:
+        return "common.redis_error"
+    payload, changed = await set_topup_status(r, req_id, "approved" if approve else "rejected")
+    if payload is None:
+        return "topup.not_found"
+    if not changed:
+        return "topup.already_processed"
+    uid = int(payload["user_id"])  # type: ignore
+    if approve:
+        try:
+            await wallet_credit(uid, int(payload["amount"]), meta=f"topup:{req_id}")  # type: ignore
+        except Exception as e:
+            # back to pending so it can be approved again: "approved" without the credit would lose the money
+            logging.getLogger(__name__).exception("Top-up %s credit failed: %s", req_id, e)
+            await set_topup_status(r, req_id, "pending", expected="approved")
+            return "topup.credit_failed"
+    await notify(bot, uid, tr("topup.approved_user" if approve else "topup.rejected_user", lang))
+    return None
+
+
+async def _topup_decision(call: CallbackQuery, bot: Bot, approve: bool) -> None:
     lang = await get_lang(call)
     await call.answer()
     if call.from_user.id not in admin_ids():
-        await call.message.answer(t(lang, "دسترسی ندارید.", "No permission.", "Нет доступа."))
+        await call.message.answer(tr("common.no_permission", lang))
         return
     _, _, req_id = call.data.split(":", 2)
+    error = await settle_topup(bot, req_id, approve, lang)
+    if error:
+        await call.message.answer(tr(error, lang))
+        return
+    await safe_edit_text(call.message, tr("topup.approved" if approve else "topup.rejected", lang))
+
+
+async def wallet_topup_approve_handler(call: CallbackQuery, bot: Bot):
+    await _topup_decision(call, bot, True)
+
+
+async def wallet_topup_reject_handler(call: CallbackQuery, bot: Bot):
+    await _topup_decision(call, bot, False)
+
+
+# --------- Admin overview (services/admin_index.py) ---------
+
+ADMIN_PAGE = 20
+
+
+def _page_arg(parts: List[str]) -> int:
+    for p in parts:
+        if p.isdigit():
+            return max(1, int(p))
+    return 1
+
+
+async def admin_orders_cmd(message: Message):
+    # /orders [provider=KEY] [status=active|code|repeat] [page]
+    lang = await get_lang(message)
+    if message.from_user.id not in admin_ids():
+        await message.answer(tr("common.no_permission", lang))
+        return
+    parts = (message.text or "").split()[1:]
+    filters = dict(p.split("=", 1) for p in parts if "=" in p)
+    provider, status = filters.get("provider"), filters.get("status")
+    if set(filters) - {"provider", "status"} or (status and status not in ORDER_STATUSES):
+        await message.answer(f"/orders [provider=KEY] [status={'|'.join(ORDER_STATUSES)}] [page]")
+        return
     r = await get_redis()
     if not r:
-        await call.message.answer(t(lang, "خطا در Redis.", "Redis error.", "Ошибка Redis."))
-        return
-    data = await r.get(f"wallet:topup:{req_id}")
-    if not data:
-        await call.message.answer(t(lang, "درخواست یافت نشد یا منقضی شده.", "Request not found or expired.", "Запрос не найден или истёк."))
+        await message.answer(tr("common.redis_error", lang))
         return
-    payload = json.loads(data)
-    if payload.get("status") != "pending":
-        await call.message.answer(t(lang, "این درخواست قبلاً پردازش شده است.", "Request already processed.", "Запрос уже обработан."))
+    page = _page_arg(parts)
+    total, orders = await list_orders(r, provider, status, (page - 1) * ADMIN_PAGE, ADMIN_PAGE)
+    if not orders:
+        await message.answer(tr("admin.orders_none", lang))
         return
+    lines = [tr("admin.orders_header", lang, total=total, page=page)]
+    for o in orders:
+        lines.append(tr(
+            "admin.order_line", lang, uid=o["uid"], provider=o.get("provider"), id=o.get("id"),
+            number=o.get("number"), status=o.get("status", "active"),
+        ))
+    await message.answer("\n".join(lines))
 
-    uid = int(payload["user_id"])  # type: ignore
-    amount = int(payload["amount"])  # type: ignore
 
-    await wallet_credit(uid, amount, meta=f"topup:{req_id}")
-    payload["status"] = "approved"
-    await r.set(f"wallet:topup:{req_id}", json.dumps(payload, ensure_ascii=False), ex=3600)
+async def admin_topups_cmd(message: Message):
+    # /topups [pending|approved|rejected] [page]
+    lang = await get_lang(message)
+    if message.from_user.id not in admin_ids():
+        await message.answer(tr("common.no_permission", lang))
+        return
+    parts = (message.text or "").split()[1:]
+    status = next((p for p in parts if not p.isdigit()), "pending")
+    if status not in TOPUP_STATUSES:
+        await message.answer(f"/topups [{'|'.join(TOPUP_STATUSES)}] [page]")
+        return
+    r = await get_redis()
+    if not r:
+        await message.answer(tr("common.redis_error", lang))
+        return
+    page = _page_arg(parts)
+    total, items = await list_topups(r, status, (page - 1) * ADMIN_PAGE, ADMIN_PAGE)
+    if not items:
+        await message.answer(tr("admin.topups_none", lang))
+        return
+    lines = [tr("admin.topups_header", lang, total=total, page=page)]
+    for req_id, payload in items:
+        lines.append(tr("admin.topup_line", lang, id=req_id, user=payload.get("user_id"), amount=payload.get("amount")))
+    await message.answer("\n".join(lines))
 
-    try:
-        await bot.send_message(uid, t(lang, "شارژ شما با موفقیت انجام شد.", "Your top-up was approved.", "Ваше пополнение одобрено."))
-    except Exception:
-        pass
 
-    await safe_edit_text(call.message, t(lang, "درخواست تایید شد.", "Request approved.", "Запрос одобрен."))
+async def admin_report_cmd(message: Message):
+    # /report [m|h|d] [buckets] [provider|service|country|operator]
+    lang = await get_lang(message)
+    if message.from_user.id not in admin_ids():
+        await message.answer(tr("common.no_permission", lang))
+        return
+    parts = (message.text or "").split()[1:]
+    gran = next((p for p in parts if p in GRANULARITY), "d")
+    dim = next((p for p in parts if p in DIMENSIONS), None)
+    buckets = min(_page_arg(parts) if any(p.isdigit() for p in parts) else 7, 400)
+    if len(parts) > sum(1 for p in parts if p in GRANULARITY or p in DIMENSIONS or p.isdigit()):
+        await message.answer(f"/report [{'|'.join(GRANULARITY)}] [buckets] [{'|'.join(DIMENSIONS)}]")
+        return
+    r = await get_redis()
+    if not r:
+        await message.answer(tr("common.redis_error", lang))
+        return
+    rows = await report(r, gran, buckets, dim)
+    if not rows or not any(row.orders for row in rows):
+        await message.answer(tr("admin.report_empty", lang))
+        return
+    lines = [tr("admin.report_header", lang, buckets=buckets, gran=gran, dim=dim or "all")]
+    for row in rows:
+        lines.append(tr(
+            "admin.report_line", lang, name=row.value, orders=row.orders, filled=row.filled,
+            rate=round(row.fill_rate * 100), revenue=row.revenue, cost=row.cost, margin=row.margin, buyers=row.buyers,
+        ))
+    await message.answer("\n".join(lines))
 
 
-async def wallet_topup_reject_handler(call: CallbackQuery, bot: Bot):
-    lang = await get_lang(call)
-    await call.answer()
-    if call.from_user.id not in admin_ids():
-        await call.message.answer(t(lang, "دسترسی ندارید.", "No permission.", "Нет доступа."))
+async def admin_topups_settle_cmd(message: Message, bot: Bot):
+    # /topups_approve <id ...|all>, /topups_reject <id ...|all>
+    lang = await get_lang(message)
+    if message.from_user.id not in admin_ids():
+        await message.answer(tr("common.no_permission", lang))
+        return
+    parts = (message.text or "").split()
+    approve = parts[0].startswith("/topups_approve")
+    if len(parts) < 2:
+        await message.answer(f"{parts[0]} <id ...|all>")
         return
-    _, _, req_id = call.data.split(":", 2)
     r = await get_redis()
     if not r:
-        await call.message.answer(t(lang, "خطا در Redis.", "Redis error.", "Ошибка Redis."))
+        await message.answer(tr("common.redis_error", lang))
         return
-    data = await r.get(f"wallet:topup:{req_id}")
-    if not data:
-        await call.message.answer(t(lang, "درخواست یافت نشد یا منقضی شده.", "Request not found or expired.", "Запрос не найден или истёк."))
+    ids = await pending_topup_ids(r) if parts[1] == "all" else parts[1:]
+    done = 0
+    for req_id in ids:
+        try:
+            error = await settle_topup(bot, req_id, approve, lang)
+        except Exception as e:  # one failing request must not stop the batch; it counts as skipped
+            logging.getLogger(__name__).exception("Settling top-up %s failed: %s", req_id, e)
+            continue
+        if error is None:
+            done += 1
+    await message.answer(tr("admin.topups_settled", lang, done=done, skipped=len(ids) - done))
+
+
+# --------- Pricing rules (admin) ---------
+
+_PRICING_ARGS = {
+    "service": ("service_id", str),
+    "country": ("country_id", str),
+    "operator": ("operator", str),
+    "margin": ("margin_percent", float),
+    "min": ("min_margin", int),
+    "round": ("round_to", int),
+}
+
+
+async def pricing_list_cmd(message: Message):
+    lang = await get_lang(message)
+    if message.from_user.id not in admin_ids():
+        await message.answer(tr("common.no_permission", lang))
         return
-    payload = json.loads(data)
-    if payload.get("status") != "pending":
-        await call.message.answer(t(lang, "این درخواست قبلاً پردازش شده است.", "Request already processed.", "Запрос уже обработан."))
+    rules = pricing_engine.index.rules()
+    if not rules:
+        await message.answer(tr("pricing.none", lang))
         return
+    lines = [
+        f"{rule_key(r)} | margin={r.margin_percent} min={r.min_margin} round={r.round_to}"
+        for r in rules
+    ]
+    await message.answer("\n".join(lines))
 
-    payload["status"] = "rejected"
-    await r.set(f"wallet:topup:{req_id}", json.dumps(payload, ensure_ascii=False), ex=3600)
 
-    uid = int(payload["user_id"])  # type: ignore
+async def pricing_set_cmd(message: Message):
+    # /pricing_set <scope> [service=ID] [country=ID] [operator=OP] [margin=20] [min=500] [round=100]
+    lang = await get_lang(message)
+    if message.from_user.id not in admin_ids():
+        await message.answer(tr("common.no_permission", lang))
+        return
+    parts = (message.text or "").split()[1:]
+    usage = "/pricing_set <global|service|country|operator|combo> [service=] [country=] [operator=] [margin=] [min=] [round=]"
+    if not parts:
+        await message.answer(usage)
+        return
+    kwargs: Dict[str, Any] = {}
     try:
-        await bot.send_message(uid, t(lang, "درخواست شارژ شما رد شد.", "Your top-up request was rejected.", "Ваш запрос на пополнение отклонён."))
-    except Exception:
-        pass
+        for arg in parts[1:]:
+            name, value = arg.split("=", 1)
+            field, cast = _PRICING_ARGS[name]
+            kwargs[field] = cast(value)
+        rule = PricingRule(scope=parts[0], **kwargs)
+    except (KeyError, ValueError):
+        await message.answer(usage)
+        return
+    try:
+        key = rule_key(rule)
+    except ValueError as e:
+        await message.answer(f"{e}\n{usage}")
+        return
+    r = await get_redis()
+    if not r:
+        await message.answer(tr("common.redis_error", lang))
+        return
+    await pricing_engine.save_rule(r, rule)
+    await message.answer(tr("pricing.saved", lang, key=key))
 
-    await safe_edit_text(call.message, t(lang, "درخواست رد شد.", "Request rejected.", "Запрос отклонён."))
+
+async def pricing_del_cmd(message: Message):
+    lang = await get_lang(message)
+    if message.from_user.id not in admin_ids():
+        await message.answer(tr("common.no_permission", lang))
+        return
+    parts = (message.text or "").split()
+    r = await get_redis()
+    if len(parts) < 2 or not r:
+        await message.answer("/pricing_del <rule key>")
+        return
+    ok = await pricing_engine.delete_rule(r, parts[1])
+    await message.answer(
+        tr("pricing.deleted", lang) if ok else tr("pricing.not_found", lang)
+    )
 
 
 # --------- Temporary Number Flow ---------
@@ -617,6 +982,7 @@ async def wallet_topup_reject_handler(call: CallbackQuery, bot: Bot):
 async def buy_temp_handler(call: CallbackQuery, state: FSMContext):
     lang = await get_lang(call)
     await call.answer()
+    quote_prefetch.cancel(call.from_user.id)
     # Fetch services via selected provider
     prov_keys = enabled_providers()
     uid = call.from_user.id
@@ -630,19 +996,16 @@ async def buy_temp_handler(call: CallbackQuery, state: FSMContext):
         if not selected_key:
             await state.update_data(pending_after_provider="buy_temp")
             await safe_edit_text(call.message, 
-                t(lang, "ارائه‌دهنده را انتخاب کنید:", "Choose a provider:", "Выберите провайдера:"),
+                tr("buy.choose_provider", lang),
                 reply_markup=providers_kb(lang),
             )
             return
     if not selected_key:
         selected_key = prov_keys[0] if prov_keys else _default_provider_key()
-    prov = get_provider(selected_key)
-    services = await prov.get_services()
-    if not isinstance(services, list):
-        services = []
+    services = await catalogs.services(selected_key)
     if not services:
         await safe_edit_text(call.message, 
-            t(lang, "سرویسی یافت نشد. تنظیمات یا موجودی را بررسی کنید.", "No services available. Check configuration or balance.", "Сервисы недоступны. Проверьте настройки или баланс."),
+            tr("buy.no_services", lang),
             reply_markup=main_kb(lang, selected_key),
         )
         await state.clear()
@@ -650,8 +1013,10 @@ async def buy_temp_handler(call: CallbackQuery, state: FSMContext):
     await state.set_state(BuyTemp.choosing_service)
     await state.update_data(services=services, sv_page=0, lang=lang, provider_key=selected_key)
     await safe_edit_text(call.message, 
-        t(lang, "یک سرویس را انتخاب کنید:", "Choose a service:", "Выберите сервис:"),
-        reply_markup=services_kb(services, 0, 8, lang),
+        tr("buy.choose_service", lang),
+        reply_markup=services_kb(
+            services, 0, 8, lang, price_sheets.service_floor(selected_key), (await _blocked(selected_key)).services()
+        ),
     )
 
 
@@ -662,7 +1027,10 @@ async def services_page_handler(call: CallbackQuery, state: FSMContext):
     lang = data.get("lang", settings.LOCALE_DEFAULT)
     page = int(call.data.split(":")[2])
     await state.update_data(sv_page=page)
-    await call.message.edit_reply_markup(reply_markup=services_kb(services, page, 8, lang))
+    prov_key = data.get("provider_key") or ""
+    floors = price_sheets.service_floor(prov_key)
+    hidden = (await _blocked(prov_key)).services()
+    await call.message.edit_reply_markup(reply_markup=services_kb(services, page, 8, lang, floors, hidden))
 
 
 async def service_select_handler(call: CallbackQuery, state: FSMContext):
@@ -676,17 +1044,17 @@ async def service_select_handler(call: CallbackQuery, state: FSMContext):
 
     # Fetch countries from selected provider
     prov_key = data.get("provider_key") or await get_user_provider(call)
-    prov = get_provider(prov_key)
-    countries = await prov.get_countries()
-    if not isinstance(countries, list):
-        countries = []
+    countries = await catalogs.countries(prov_key)
     await state.set_state(BuyTemp.choosing_country)
     await state.update_data(countries=countries, ct_page=0)
 
+    hidden = (await _blocked(prov_key)).countries(sid)
     await safe_edit_text(call.message, 
-        t(lang, "کشور را انتخاب کنید:", "Choose a country:", "Выберите страну:"),
-        reply_markup=countries_kb(countries, 0, 8, lang),
+        tr("buy.choose_country", lang),
+        reply_markup=countries_kb(countries, 0, 8, lang, price_sheets.country_floor(prov_key, sid), hidden),
     )
+    visible = visible_country_ids(countries, 0, 8, hidden)
+    quote_prefetch.schedule(await get_redis(), call.from_user.id, prov_key, sid, visible)
 
 
 async def countries_page_handler(call: CallbackQuery, state: FSMContext):
@@ -696,7 +1064,13 @@ async def countries_page_handler(call: CallbackQuery, state: FSMContext):
     lang = data.get("lang", settings.LOCALE_DEFAULT)
     page = int(call.data.split(":")[2])
     await state.update_data(ct_page=page)
-    await call.message.edit_reply_markup(reply_markup=countries_kb(countries, page, 8, lang))
+    prov_key = data.get("provider_key") or ""
+    floors = price_sheets.country_floor(prov_key, data.get("service_id"))
+    hidden = (await _blocked(prov_key)).countries(data.get("service_id"))
+    await call.message.edit_reply_markup(reply_markup=countries_kb(countries, page, 8, lang, floors, hidden))
+    if prov_key:
+        visible = visible_country_ids(countries, page, 8, hidden)
+        quote_prefetch.schedule(await get_redis(), call.from_user.id, prov_key, data.get("service_id"), visible)
 
 
 async def country_select_handler(call: CallbackQuery, state: FSMContext):
@@ -704,38 +1078,90 @@ async def country_select_handler(call: CallbackQuery, state: FSMContext):
     _, _, cid, page = call.data.split(":")
     data = await state.get_data()
     lang = data.get("lang", settings.LOCALE_DEFAULT)
+    quote_prefetch.cancel(call.from_user.id)
 
     await state.update_data(country_id=cid)
     await state.set_state(BuyTemp.choosing_operator)
 
+    prov_key = data.get("provider_key") or await get_user_provider(call)
+    sid = data.get("service_id")
+    stats, quotes = await asyncio.gather(_operator_stats(prov_key, sid, cid), operator_quotes.get(prov_key, sid, cid))
+    prices = {op: pricing_engine.quote(q["amount"], sid, cid, op) for op, q in quotes.items() if in_stock(q)}
+    hidden = (await _blocked(prov_key)).operators(sid, cid)
     await safe_edit_text(call.message, 
-        t(lang, "اپراتور را انتخاب کنید:", "Choose an operator:", "Выберите оператора:"),
-        reply_markup=operators_kb(lang),
+        tr("buy.choose_operator", lang),
+        reply_markup=operators_kb(lang, stats, quotes, prices, hidden),
     )
 
 
+async def _operator_stats(prov_key: str, sid: Any, cid: Any) -> Dict[str, OperatorStat]:
+    r = await get_redis()
+    if not r:
+        return {}
+    try:
+        return await operator_stats.stats(r, prov_key, sid, cid)
+    except Exception as e:
+        logging.getLogger(__name__).warning("Operator stats unavailable: %s", e)
+        return {}
+
+
+async def _blocked(prov_key: str) -> Blocked:
+    """Services/countries/operators of ``prov_key`` recently answered as not active."""
+    return await negative_cache.blocked(await get_redis(), prov_key)
+
+
+async def _record_negative(prov_key: str, e: Exception, sid: Any, cid: Any, op: Any = "") -> bool:
+    return await negative_cache.record(await get_redis(), prov_key, getattr(e, "code", None), sid, cid, op)
+
+
 async def operator_select_handler(call: CallbackQuery, state: FSMContext):
-    await call.answer()
-    _, op = call.data.split(":")
+    _, op = call.data.split(":", 1)
     data = await state.get_data()
     lang = data.get("lang", settings.LOCALE_DEFAULT)
+    if op.startswith("x:"):  # operator without numbers
+        await call.answer(tr("buy.op_empty_alert", lang), show_alert=True)
+        return
+    await call.answer()
     sid = data.get("service_id")
     cid = data.get("country_id")
 
-    # Query getinfo for quote
-    async with NumberlandClient() as cl:
-        info = await cl.get_info(service=sid, country=cid, operator=op)
-
-    # Normalize info
-    item: Optional[Dict[str, Any]] = None
-    if isinstance(info, dict) and info.get("amount"):
-        item = info
-    elif isinstance(info, list) and info:
-        item = info[0]
-
-    if not item:
+    # Quote from the user's provider (normalized: amount, count, repeat, time). The operator rows fetched
+    # for the menu answer it without a call; providers without them are asked per operator.
+    prov_key = data.get("provider_key") or await get_user_provider(call)
+    quotes = await operator_quotes.get(prov_key, sid, cid)
+    blocked = await _blocked(prov_key)
+    if blocked.operators(sid, cid):
+        quotes = {o: q for o, q in quotes.items() if not blocked.operator(sid, cid, o)}
+    if op in ("any", "min") and quotes:
+        best = None
+        if op == "any" and settings.OPERATOR_ROUTING:
+            best = best_operator(await _operator_stats(prov_key, sid, cid))
+        op = best if in_stock(quotes.get(best or "")) else cheapest(quotes) or op
+    item = None
+    if quotes:
+        item = quotes.get(op) if in_stock(quotes.get(op)) else None
+    elif not blocked.operator(sid, cid, op):
+        prov = get_provider(prov_key)
+        try:
+            if op == "any" and settings.OPERATOR_ROUTING:
+                # "any": the operator most likely to deliver a code, if it has numbers
+                best = best_operator(await _operator_stats(prov_key, sid, cid))
+                if best and not blocked.operator(sid, cid, best):
+                    item = await prov.quote(service=sid, country=cid, operator=best)
+                    if item and int(item.get("amount", 0)):
+                        op = best
+                    else:
+                        item = None
+            if item is None:
+                item = await prov.quote(service=sid, country=cid, operator=op)
+        except Exception as e:
+            # "not active" answers are remembered and read as no numbers; anything else is a real error
+            if not await _record_negative(prov_key, e, sid, cid, op):
+                raise
+
+    if not item or not int(item.get("amount", 0)):
         await safe_edit_text(call.message, 
-            t(lang, "شماره‌ای یافت نشد.", "No numbers available.", "Нет доступных номеров."),
+            tr("buy.no_numbers", lang),
             reply_markup=main_kb(lang),
         )
         await state.clear()
@@ -746,9 +1172,10 @@ async def operator_select_handler(call: CallbackQuery, state: FSMContext):
     repeat = str(item.get("repeat", "0"))
     time_str = item.get("time", "00:20:00")
 
-    final_price = calculate_price(amount)
+    final_price = pricing_engine.quote(amount, sid, cid, op)
 
     await state.update_data(operator=op, quote={
+        "nonce": purchase_guard.new_nonce(),
         "amount": amount,
         "final_price": final_price,
         "count": count,
@@ -756,14 +1183,14 @@ async def operator_select_handler(call: CallbackQuery, state: FSMContext):
         "time": time_str,
     })
 
-    msg = (
-        t(lang, "اطلاعات شماره:", "Number info:", "Информация о номере:")
-        + f"\n\n"
-        + t(lang, "- موجودی: ", "- Available: ", "- Доступно: ") + f"{count}\n"
-        + t(lang, "- قیمت پایه: ", "- Base amount: ", "- Базовая цена: ") + f"{amount} تومان\n"
-        + t(lang, "- قیمت نهایی: ", "- Final price: ", "- Итоговая цена: ") + f"{final_price} تومان\n"
-        + t(lang, "- قابلیت کد مجدد: ", "- Repeat capable: ", "- Повтор возможен: ") + (t(lang, "بله", "Yes", "Да") if repeat == "1" else t(lang, "خیر", "No", "Нет")) + "\n"
-        + t(lang, "- بازه زمانی: ", "- Time window: ", "- Временное окно: ") + f"{time_str}"
+    msg = tr(
+        "buy.quote",
+        lang,
+        count=count,
+        amount=amount,
+        price=final_price,
+        repeat=tr("common.yes" if repeat == "1" else "common.no", lang),
+        time=time_str,
     )
 
     await state.set_state(BuyTemp.confirm_purchase)
@@ -774,15 +1201,89 @@ async def confirm_buy_handler(call: CallbackQuery, state: FSMContext, bot: Bot):
     await call.answer()
     data = await state.get_data()
     lang = await get_lang(call)
+    if not data.get("quote"):
+        return  # stale confirm button: the quote was used up (failed purchase) or abandoned
+    uid = call.from_user.id
+    prov_key = data.get("provider_key") or await get_user_provider(call)
+    r = await get_redis()
+    if not r:
+        await _confirm_buy(call, state, bot, data, lang, prov_key)
+        return
+    # double taps and redelivered updates confirm the same quote: one purchase, shown to all of them
+    key = purchase_guard.idempotency_key(uid, prov_key, data)
+    while True:
+        done = await purchase_guard.result(r, key)
+        if done is not None:
+            await _show_purchase(call, lang, done)
+            return
+        token = await purchase_guard.acquire(r, uid)
+        if token is None:
+            await purchase_guard.wait(r, uid, key)
+            continue
+        try:
+            if await purchase_guard.result(r, key) is None:  # not finished between the check and the lock
+                done = await _confirm_buy(call, state, bot, data, lang, prov_key)
+                if done is not None:
+                    await purchase_guard.store(r, key, done)
+                return
+        finally:
+            await purchase_guard.release(r, uid, token)
+
+
+async def _show_purchase(call: CallbackQuery, lang: str, done: Dict[str, Any]) -> None:
+    """Render a purchase outcome (as returned by _confirm_buy) on the confirm message."""
+    if "error" in done:
+        await safe_edit_text(call.message, tr("buy.error", lang, error=done["error"]), reply_markup=main_kb(lang))
+        return
+    order_msg = tr(
+        "buy.done",
+        lang,
+        id=done["id"],
+        number=done["number"],
+        amount=done["amount"],
+        time=done["time"],
+        repeat=tr("common.yes" if done["repeat"] == "1" else "common.no", lang),
+    )
+    await safe_edit_text(call.message, order_msg, reply_markup=status_kb_provider(lang, done["provider"], done["id"]))
+
+
+async def _confirm_buy(
+    call: CallbackQuery, state: FSMContext, bot: Bot, data: Dict[str, Any], lang: str, prov_key: str
+) -> Optional[Dict[str, Any]]:
+    """Debit, buy and start tracking the confirmed quote.
+
+    Returns the outcome once the provider was asked for a number (the order, or {"error"} if getnum
+    failed), None if it never got that far.
+    """
     sid = data.get("service_id")
     cid = data.get("country_id")
     op = data.get("operator")
 
-    # For MVP we skip wallet check; directly attempt purchase
+    uid = call.from_user.id
+    quote = data.get("quote", {})
+    final_price = int(quote.get("final_price", 0)) if quote else 0
+    blocked = await _blocked(prov_key)
+    if blocked.operator(sid, cid, op):
+        # answered as not active moments ago: don't spend a getnum on it
+        scope = "service" if blocked.service(sid) else "country" if blocked.country(sid, cid) else "operator"
+        await safe_edit_text(
+            call.message, tr("buy.error", lang, error=tr(f"api.{scope}_inactive", lang)), reply_markup=main_kb(lang)
+        )
+        await state.clear()
+        return None
+    charged = 0
+    if settings.WALLET_CHARGE_ORDERS and final_price > 0:
+        if not await wallet_debit(uid, final_price, meta="order"):
+            bal = await wallet_get_balance(uid)
+            await safe_edit_text(
+                call.message, tr("wallet.insufficient", lang, price=final_price, balance=bal), reply_markup=main_kb(lang)
+            )
+            await state.clear()
+            return None
+        charged = final_price
+
     try:
-        quote = data.get("quote", {})
         base_amount = int(quote.get("amount", 0)) if quote else 0
-        prov_key = data.get("provider_key") or await get_user_provider(call)
         prov = get_provider(prov_key)
         res = await prov.buy_temp(
             service=sid,
@@ -791,13 +1292,15 @@ async def confirm_buy_handler(call: CallbackQuery, state: FSMContext, bot: Bot):
             price=base_amount if base_amount > 0 else None,
         )
     except Exception as e:
-            localized = localize_api_error(lang, getattr(e, "code", None), getattr(e, "description", ""))
-            await safe_edit_text(call.message, 
-                t(lang, "خطا در خرید: ", "Purchase error: ", "Ошибка покупки: ") + localized,
-                reply_markup=main_kb(lang),
-            )
+            if charged:
+                await wallet_credit(uid, charged, meta="refund: purchase failed")
+            # the cached operator rows may be what sent the user here
+            operator_quotes.invalidate(prov_key, sid, cid)
+            await _record_negative(prov_key, e, sid, cid, op)
+            failed = {"error": localize_api_error(lang, getattr(e, "code", None), getattr(e, "description", ""))}
+            await _show_purchase(call, lang, failed)
             await state.clear()
-            return
+            return failed
 
     rid = str(res.get("ID"))
     number = str(res.get("NUMBER"))
@@ -813,49 +1316,29 @@ async def confirm_buy_handler(call: CallbackQuery, state: FSMContext, bot: Bot):
         prefix = "+" + areacode if areacode else "+"
         full_number = f"{prefix}{number}"
 
-    order_msg = (
-        t(lang, "شماره خریداری شد:", "Number purchased:", "Номер куплен:")
-        + f"\n\n"
-        + t(lang, "- آیدی: ", "- ID: ", "- ID: ") + rid + "\n"
-        + t(lang, "- شماره: ", "- Number: ", "- Номер: ") + full_number + "\n"
-        + t(lang, "- قیمت: ", "- Price: ", "- Цена: ") + f"{amt} تومان\n"
-        + t(lang, "- بازه زمانی: ", "- Time: ", "- Время: ") + time_str + "\n"
-        + t(lang, "- کد مجدد: ", "- Repeat: ", "- Повтор: ") + (t(lang, "بله", "Yes", "Да") if repeat == "1" else t(lang, "خیر", "No", "Нет"))
-    )
+    done = {"provider": prov_key, "id": rid, "number": full_number, "amount": amt, "time": time_str, "repeat": repeat}
 
     await state.update_data(order_id=rid)
     await state.set_state(BuyTemp.active_order)
 
-    # persist order to Redis history and active set
-    uid = call.from_user.id
     now_ts = int(time.time())
-    ttl_sec = parse_time_to_seconds(time_str)
-    expire_ts = now_ts + ttl_sec
-    r = await get_redis()
-    if r:
-        entry = {
-            "id": rid,
-            "number": full_number,
-            "amount": amt,
-            "time": time_str,
-            "repeat": repeat,
-            "ts": now_ts,
-            "expire_ts": expire_ts,
-            "status": "active",
-            "provider": prov_key,
-        }
-        await r.lpush(f"orders:{uid}", json.dumps(entry, ensure_ascii=False))
-        await r.ltrim(f"orders:{uid}", 0, 49)
-        await r.hset(
-            f"active:{uid}", mapping={f"{prov_key}:{rid}": json.dumps(entry, ensure_ascii=False)}
-        )
-        await r.expire(f"active:{uid}", ttl_sec + 3600)
+    chat_id = call.message.chat.id
+    if charged:
+        r = await get_redis()
+        if r:
+            # settled by the wallet consumer: refunded if the order ends without a code
+            await r.set(f"wallet:charge:{prov_key}:{rid}", charged, ex=7 * 86400)
+    # history, active index and analytics are written by the order event consumers
+    await publish(
+        OrderEventKind.PURCHASED, uid, prov_key, rid,
+        number=full_number, amount=amt, price=final_price, charged=charged, time=time_str, repeat=repeat,
+        expire_ts=now_ts + parse_time_to_seconds(time_str), service=sid, country=cid, operator=op,
+        chat_id=chat_id, lang=lang,
+    )
 
-    await safe_edit_text(call.message, order_msg, reply_markup=status_kb_provider(lang, prov_key, rid))
+    await _show_purchase(call, lang, done)
 
     # Start polling task
-    chat_id = call.message.chat.id
-    message_id = call.message.message_id
 
     async def poll_status(order_id: str, lang: str, uid: int, prov_key: str):
         prov_local = get_provider(prov_key)
@@ -870,47 +1353,60 @@ async def confirm_buy_handler(call: CallbackQuery, state: FSMContext, bot: Bot):
                 elapsed += interval
                 continue
 
-                result = int(st.get("RESULT", 0))
-                code = st.get("CODE", "") or ""
-                desc = st.get("DESCRIPTION", "") or ""
-
-                if result == NumberStatus.CODE_RECEIVED:
-                    await _update_active_order(uid, order_id, "code", {"code": code}, prov_key)
-                    txt = (
-                        t(lang, "کد دریافت شد:", "Code received:", "Код получен:")
-                        + f"\n\n<code>{code}</code>\n\n"
-                        + t(lang, "وضعیت: ", "Status: ", "Статус: ") + desc
-                    )
-                    try:
-                        await bot.send_message(chat_id, txt, parse_mode=ParseMode.HTML)
-                    except Exception:
-                        pass
-                    return
-                elif result in (NumberStatus.CANCELED, NumberStatus.BANNED, NumberStatus.COMPLETED):
-                    await _remove_active_order(uid, order_id, prov_key)
-                    txt = (
-                        t(lang, "وضعیت نهایی: ", "Final status: ", "Итоговый статус: ")
-                        + f"{desc}"
-                    )
-                    try:
-                        await bot.send_message(chat_id, txt)
-                    except Exception:
-                        pass
-                    return
+            kind = EVENT_FOR_STATUS.get(int(st.get("RESULT", 0)))
+            if kind is OrderEventKind.CODE or kind in TERMINAL:
+                await publish(
+                    kind, uid, prov_key, order_id, code=st.get("CODE", "") or "",
+                    desc=st.get("DESCRIPTION", "") or "", chat_id=chat_id, lang=lang, notify=True,
+                )
+                return
 
-                await asyncio.sleep(interval)
-                elapsed += interval
+            await asyncio.sleep(interval)
+            elapsed += interval
+        # past expire_ts the order is the expiry sweeper's (services/order_expiry.py)
 
     # cancel previous task if exists
     rid_key = f"{prov_key}:{rid}"
     prev = POLL_TASKS.get(rid_key)
     if prev and not prev.done():
         prev.cancel()
-    POLL_TASKS[rid_key] = asyncio.create_task(poll_status(rid, lang, uid, prov_key))
+    task = asyncio.create_task(poll_status(rid, lang, uid, prov_key))
+    POLL_TASKS[rid_key] = task
+    task.add_done_callback(lambda t, k=rid_key: POLL_TASKS.pop(k, None) if POLL_TASKS.get(k) is t else None)
+    return done
 
 
 # --------- Status control ---------
 
+async def _persist_order(r, uid: int, prov_key: str, entry: Dict[str, Any], ttl_sec: int) -> None:
+    # The order field is the "already persisted" marker: a redelivered "purchased" event must not add a
+    # second history entry. It is written in the same MULTI as the history, expiry and index entries, so a
+    # failed write leaves none of them and the retried event persists the order whole.
+    order_key = f"{prov_key}:{entry['id']}"
+    active = f"active:{uid}"
+    member = expiry_member(uid, order_key)
+    async with r.pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                await pipe.watch(active)
+                if await pipe.hexists(active, order_key):
+                    await pipe.unwatch()
+                    return
+                pipe.multi()
+                pipe.hset(active, order_key, codec.dumps(entry))
+                pipe.lpush(f"orders:{uid}", codec.dumps(entry))
+                pipe.ltrim(f"orders:{uid}", 0, 49)
+                # the hash TTL is only a backstop (the sweeper removes each order when due): never shorten it
+                pipe.expire(active, ttl_sec + 3600, nx=True)
+                pipe.expire(active, ttl_sec + 3600, gt=True)
+                pipe.zadd(EXPIRY_KEY, {member: int(entry.get("expire_ts") or time.time() + ttl_sec)})
+                index_order(pipe, member, prov_key, entry.get("status", "active"), entry.get("ts") or time.time())
+                await pipe.execute()
+                return
+            except WatchError:
+                continue
+
+
 async def _update_active_order(
     uid: int, order_id: str, status: str, extra: Optional[Dict[str, Any]] = None, provider_key: Optional[str] = None
 ):
@@ -922,14 +1418,18 @@ async def _update_active_order(
     if not raw:
         return
     try:
-        obj = json.loads(raw)
+        obj = codec.loads(raw)
     except Exception:
         obj = {}
+    old_status = obj.get("status")
     obj["status"] = status
     if extra:
         obj.update(extra)
-    await r.hset(f"active:{uid}", field, json.dumps(obj, ensure_ascii=False))
-    # keep existing TTL
+    pipe = r.pipeline(transaction=True)
+    pipe.hset(f"active:{uid}", field, codec.dumps(obj))  # keeps the existing TTL
+    if provider_key:
+        move_order_status(pipe, expiry_member(uid, field), old_status, status, obj.get("ts") or time.time())
+    await pipe.execute()
 
 
 async def _remove_active_order(uid: int, order_id: str, provider_key: Optional[str] = None):
@@ -937,10 +1437,119 @@ async def _remove_active_order(uid: int, order_id: str, provider_key: Optional[s
     if not r:
         return
     field = f"{provider_key}:{order_id}" if provider_key else order_id
-    await r.hdel(f"active:{uid}", field)
+    pipe = r.pipeline(transaction=True)
+    pipe.hdel(f"active:{uid}", field)
+    if provider_key:
+        member = expiry_member(uid, field)
+        pipe.zrem(EXPIRY_KEY, member)
+        unindex_order(pipe, member, provider_key)
+    await pipe.execute()
+
+
+# --------- Order event consumers ---------
+# One handler per consumer group of services/order_events.py. Delivery is
+# at-least-once, so each of them tolerates seeing an event twice.
+
+async def on_order_event_active(ev: OrderEvent) -> None:
+    r = await get_redis()
+    if not r:
+        return
+    if ev.kind is OrderEventKind.PURCHASED:
+        d = ev.data
+        entry = {
+            "id": ev.order_id,
+            "number": d.get("number"),
+            "amount": d.get("amount"),
+            "time": d.get("time"),
+            "repeat": d.get("repeat"),
+            "ts": ev.ts,
+            "expire_ts": d.get("expire_ts"),
+            "status": "active",
+            "provider": ev.provider,
+            "lang": d.get("lang"),
+        }
+        await _persist_order(r, ev.uid, ev.provider, entry, parse_time_to_seconds(str(d.get("time"))))
+    elif ev.kind is OrderEventKind.CODE:
+        await _update_active_order(ev.uid, ev.order_id, "code", {"code": ev.data.get("code", "")}, ev.provider)
+    elif ev.kind is OrderEventKind.REPEAT:
+        await _update_active_order(ev.uid, ev.order_id, "repeat", None, ev.provider)
+    elif ev.kind in TERMINAL:
+        await _remove_active_order(ev.uid, ev.order_id, ev.provider)
+
+
+def order_notifier(bot: Bot):
+    async def on_order_event_notify(ev: OrderEvent) -> None:
+        # only poller outcomes: the status buttons answer the user themselves
+        if not ev.data.get("notify"):
+            return
+        lang = ev.data.get("lang") or settings.LOCALE_DEFAULT
+        chat_id = int(ev.data.get("chat_id") or ev.uid)
+        desc = ev.data.get("desc", "")
+        desc_key = STATUS_DESC_KEYS.get(desc.lower())
+        status = tr(desc_key, lang) if desc_key else desc
+        if ev.kind is OrderEventKind.CODE:
+            txt = tr("status.code_with_status", lang, code=ev.data.get("code", ""), status=status)
+            await notify(bot, chat_id, txt, Priority.CODE, parse_mode=ParseMode.HTML)
+        elif ev.kind is OrderEventKind.EXPIRED:
+            await notify(bot, chat_id, tr("status.expired", lang, id=ev.order_id), Priority.CODE)
+        elif ev.kind in TERMINAL:
+            await notify(bot, chat_id, tr("status.final", lang, status=status), Priority.CODE)
+
+    return on_order_event_notify
+
+
+async def on_order_event_wallet(ev: OrderEvent) -> None:
+    if ev.kind not in TERMINAL:
+        return
+    r = await get_redis()
+    if not r:
+        return
+    key = f"wallet:charge:{ev.provider}:{ev.order_id}"
+    # GETDEL makes the refund happen once even if the event is delivered again
+    charged = await r.getdel(key)
+    if not charged or ev.kind not in UNFILLED:
+        return
+    try:
+        await wallet_credit(ev.uid, int(charged), meta=f"refund: {ev.kind.value} {ev.key}")
+    except Exception:
+        await r.set(key, charged, ex=7 * 86400)
+        raise
+
+
+async def on_order_event_analytics(ev: OrderEvent) -> None:
+    r = await get_redis()
+    if not r:
+        return
+    # record_* count each order once, whatever the delivery count or whoever reported the transition
+    if ev.kind is OrderEventKind.PURCHASED:
+        d = ev.data
+        dims = dimension_values(ev.provider, d.get("service"), d.get("country"), d.get("operator"))
+        try:
+            cost = int(round(float(d.get("amount") or 0)))
+        except ValueError:
+            cost = 0
+        await record_purchase(r, ev.key, ev.uid, ev.ts, dims, int(d.get("price") or 0), cost)
+    elif ev.kind in (OrderEventKind.CODE, OrderEventKind.COMPLETED):
+        order = await record_settlement(r, ev.key, filled=True)
+        if order and ev.kind is OrderEventKind.CODE:
+            await record_outcome(
+                r, *purchase_target(order), delivered=True, time_to_code=ev.ts - int(order["ts"]), ts=ev.ts
+            )
+    elif ev.kind in UNFILLED:
+        order = await record_settlement(r, ev.key, filled=False)
+        # a user canceling from the status buttons says nothing about the operator
+        if order and (ev.kind is not OrderEventKind.CANCELED or ev.data.get("notify")):
+            await record_outcome(r, *purchase_target(order), delivered=False, ts=ev.ts)
+
 
+def register_order_consumers(bot: Bot) -> None:
+    order_events.subscribe("active", on_order_event_active)
+    order_events.subscribe("notify", order_notifier(bot))
+    order_events.subscribe("wallet", on_order_event_wallet)
+    order_events.subscribe("analytics", on_order_event_analytics)
 
-async def status_action_handler(call: CallbackQuery, state: FSMContext):
+
+async def status_action_handler(call: CallbackQuery, state: FSMContext, degraded: bool = False):
     await call.answer()
     data = await state.get_data()
     lang = await get_lang(call)
@@ -954,6 +1563,11 @@ async def status_action_handler(call: CallbackQuery, state: FSMContext):
         rid = parts[2]
         prov_key = data.get("provider_key") or await get_user_provider(call)
 
+    if action == "refresh" and degraded:
+        # throttled (middlewares/throttle.py): the stored order state the poller keeps, no status() call
+        await _cached_status(call, lang, prov_key, rid)
+        return
+
     try:
         prov = get_provider(prov_key)
         if action == "cancel":
@@ -967,7 +1581,7 @@ async def status_action_handler(call: CallbackQuery, state: FSMContext):
         else:
             return
     except Exception as e:
-            await call.message.answer(t(lang, "خطا: ", "Error: ", "Ошибка: ") + str(e))
+            await call.message.answer(tr("common.error", lang, error=e))
             return
 
     result = int(res.get("RESULT", 0))
@@ -975,27 +1589,33 @@ async def status_action_handler(call: CallbackQuery, state: FSMContext):
     desc = res.get("DESCRIPTION", "") or ""
 
     # Localize common descriptions
-    desc_map = {
-        "wait code": t(lang, "در انتظار دریافت کد", "wait code", "ожидайте код"),
-        "number canceled": t(lang, "شماره کنسل شده", "number canceled", "номер отменён"),
-        "number banned": t(lang, "شماره مسدود شده", "number banned", "номер заблокирован"),
-        "wait code again": t(lang, "در انتظار دریافت کد مجدد", "wait code again", "ожидание повторного кода"),
-        "completed": t(lang, "تکمیل درخواست", "completed", "завершено"),
-        "code received": t(lang, "کد دریافت شد", "code received", "код получен"),
-    }
-    desc_lower = desc.lower()
-    localized_desc = desc_map.get(desc_lower, desc)
+    desc_key = STATUS_DESC_KEYS.get(desc.lower())
+    localized_desc = tr(desc_key, lang) if desc_key else desc
 
-    uid = call.from_user.id
+    # the user gets the answer right here; the event only drives the index, wallet and analytics
+    kind = EVENT_FOR_STATUS.get(result)
+    if kind is not None:
+        await publish(kind, call.from_user.id, prov_key, rid, code=code, desc=desc, chat_id=call.message.chat.id, lang=lang)
     if result == NumberStatus.CODE_RECEIVED:
-        await _update_active_order(uid, rid, "code", {"code": code}, prov_key)
-        txt = t(lang, "کد دریاف�� شد:", "Code received:", "Код получен:") + f"\n\n<code>{code}</code>"
+        txt = tr("status.code", lang, code=code)
         await call.message.answer(txt, parse_mode=ParseMode.HTML)
-    elif result in (NumberStatus.CANCELED, NumberStatus.BANNED, NumberStatus.COMPLETED):
-        await _remove_active_order(uid, rid, prov_key)
-        await call.message.answer(t(lang, "وضعیت نهایی: ", "Final status: ", "Итоговый статус: ") + localized_desc)
+    elif kind in TERMINAL:
+        await call.message.answer(tr("status.final", lang, status=localized_desc))
+    else:
+        await call.message.answer(tr("status.current", lang, status=localized_desc))
+
+
+async def _cached_status(call: CallbackQuery, lang: str, prov_key: str, rid: str) -> None:
+    r = await get_redis()
+    raw = await r.hget(f"active:{call.from_user.id}", f"{prov_key}:{rid}") if r else None
+    entry = codec.loads(raw) if raw else None
+    if not entry:
+        await call.message.answer(tr("active.none", lang))
+    elif entry.get("status") == "code" and entry.get("code"):
+        await call.message.answer(tr("status.code", lang, code=entry["code"]), parse_mode=ParseMode.HTML)
     else:
-        await call.message.answer(t(lang, "وضعیت: ", "Status: ", "Статус: ") + localized_desc)
+        desc = "desc.wait_code_again" if entry.get("status") == "repeat" else "desc.wait_code"
+        await call.message.answer(tr("status.current", lang, status=tr(desc, lang)))
 
 
 # --------- My Orders ---------
@@ -1010,22 +1630,17 @@ async def my_orders_handler(call: CallbackQuery):
         raw = await r.lrange(f"orders:{uid}", 0, 9)
         for it in raw or []:
             try:
-                items.append(json.loads(it))
+                items.append(codec.loads(it))
             except Exception:
                 continue
 
     if not items:
-        await safe_edit_text(call.message, t(lang, "سفارشی یافت نشد.", "No purchases yet.", "Покупки отсутствуют."), reply_markup=main_kb(lang))
+        await safe_edit_text(call.message, tr("orders.none", lang), reply_markup=main_kb(lang))
         return
 
     lines = []
     for e in items:
-        line = (
-            t(lang, "آیدی:", "ID:", "ID:") + f" {e.get('id')} | "
-            + t(lang, "شماره:", "Number:", "Номер:") + f" {e.get('number')} | "
-            + t(lang, "قیمت:", "Price:", "Цена:") + f" {e.get('amount')}"
-        )
-        lines.append(line)
+        lines.append(tr("orders.line", lang, id=e.get("id"), number=e.get("number"), amount=e.get("amount")))
     msg = "\n".join(lines)
     await safe_edit_text(call.message, msg, reply_markup=main_kb(lang))
 
@@ -1036,69 +1651,204 @@ async def active_orders_handler(call: CallbackQuery):
     uid = call.from_user.id
     r = await get_redis()
     if not r:
-        await safe_edit_text(call.message, t(lang, "خطا در خواندن داده‌ها.", "Data read error.", "Ошиб��а чтения данных."), reply_markup=main_kb(lang))
+        await safe_edit_text(call.message, tr("common.read_error", lang), reply_markup=main_kb(lang))
         return
     data = await r.hgetall(f"active:{uid}")
-    if not data:
-        await safe_edit_text(call.message, t(lang, "سفارش فعالی یافت نشد.", "No active orders.", "Активных покупок нет."), reply_markup=main_kb(lang))
-        return
     lines = []
     now_ts = int(time.time())
     for key, val in data.items():
         try:
-            obj = json.loads(val)
+            obj = codec.loads(val)
         except Exception:
             continue
-        remain = max(0, obj.get("expire_ts", now_ts) - now_ts)
+        expire_ts = obj.get("expire_ts") or now_ts
+        if expire_ts < now_ts:  # due; the expiry sweeper is about to close it
+            continue
+        remain = expire_ts - now_ts
         mins = remain // 60
         secs = remain % 60
         status = obj.get("status", "active")
-        line = (
-            t(lang, "آیدی:", "ID:", "ID:") + f" {obj.get('id')} | "
-            + t(lang, "شماره:", "Number:", "Номер:") + f" {obj.get('number')} | "
-            + t(lang, "وضعیت:", "Status:", "Статус:") + f" {status} | "
-            + t(lang, "مانده:", "Remaining:", "Осталось:") + f" {mins:02d}:{secs:02d}"
-        )
+        line = tr("active.line", lang, id=obj.get("id"), number=obj.get("number"), status=status, mins=mins, secs=secs)
         if status == "code" and obj.get("code"):
-            line += t(lang, " | کد:", " | Code:", " | Код:") + f" {obj.get('code')}"
+            line += tr("active.code", lang, code=obj.get("code"))
         lines.append(line)
+    if not lines:
+        await safe_edit_text(call.message, tr("active.none", lang), reply_markup=main_kb(lang))
+        return
     msg = "\n".join(lines)
     await safe_edit_text(call.message, msg, reply_markup=main_kb(lang))
 
 
-# --------- Permanent numbers (stub) ---------
+# --------- Permanent numbers ---------
+# Everything below is served from the indexed list in services/perm_numbers.py;
+# the filter and search query travel in the callback data
+# (pm:l:<tag>:<page>:<digits>), so paging needs no FSM state.
+
+async def _perm_catalog(call: CallbackQuery, lang: str):
+    prov_key = await get_user_provider(call)
+    try:
+        cat = await perm_numbers.catalog(prov_key)
+    except Exception as e:
+        logging.getLogger(__name__).warning("Permanent numbers for %s unavailable: %s", prov_key, e)
+        await safe_edit_text(call.message, tr("perm.error", lang), reply_markup=main_kb(lang, prov_key))
+        return None
+    if not cat.numbers:
+        await safe_edit_text(call.message, tr("perm.none", lang), reply_markup=main_kb(lang, prov_key))
+        return None
+    return cat
 
-async def buy_perm_handler(call: CallbackQuery):
+
+async def buy_perm_handler(call: CallbackQuery, state: FSMContext):
     lang = await get_lang(call)
     await call.answer()
-    await safe_edit_text(call.message, tr("buy_perm.stub", lang), reply_markup=main_kb(lang))
+    await state.clear()
+    cat = await _perm_catalog(call, lang)
+    if cat is None:
+        return
+    counts = {tag: len(pos) for tag, pos in cat.by_tag.items()}
+    counts["all"] = len(cat.numbers)
+    await safe_edit_text(
+        call.message, tr("perm.choose", lang, count=len(cat.numbers)), reply_markup=perm_filters_kb(lang, counts)
+    )
 
 
-# ---------------------- App bootstrap ----------------------
+def _perm_results_text(lang: str, tag: str, query: str, count: int) -> str:
+    label = tr(f"perm.filter.{tag}", lang)
+    if query:
+        return tr("perm.results_query", lang, filter=label, query=query, count=count)
+    return tr("perm.results", lang, filter=label, count=count)
 
-async def app():
-    setup_logging()
 
-    bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+async def perm_list_handler(call: CallbackQuery):
+    lang = await get_lang(call)
+    await call.answer()
+    _, _, tag, page_s, query = call.data.split(":", 4)
+    cat = await _perm_catalog(call, lang)
+    if cat is None:
+        return
+    numbers = cat.select(None if tag == "all" else tag, query)
+    page = max(0, min(int(page_s), (len(numbers) - 1) // PERM_PER_PAGE)) if numbers else 0
+    await safe_edit_text(
+        call.message,
+        _perm_results_text(lang, tag, query, len(numbers)),
+        reply_markup=perm_numbers_kb(numbers, page, tag, query, lang),
+    )
 
-    storage = None
-    try:
-        from redis.asyncio import from_url
 
-        storage = RedisStorage(from_url(settings.REDIS_DSN))
+async def perm_search_start_handler(call: CallbackQuery, state: FSMContext):
+    lang = await get_lang(call)
+    await call.answer()
+    await state.set_state(PermSearch.waiting_digits)
+    await safe_edit_text(call.message, tr("perm.search_prompt", lang), reply_markup=perm_search_kb(lang))
+
+
+async def perm_search_input_handler(message: Message, state: FSMContext):
+    lang = await get_lang(message)
+    query = "".join(ch for ch in (message.text or "") if ch.isdigit())
+    if len(query) < 2 or len(query) > 15:
+        await message.answer(tr("perm.search_invalid", lang), reply_markup=perm_search_kb(lang))
+        return
+    await state.clear()
+    prov_key = await get_user_provider(message)
+    try:
+        cat = await perm_numbers.catalog(prov_key)
     except Exception:
+        await message.answer(tr("perm.error", lang), reply_markup=main_kb(lang, prov_key))
+        return
+    numbers = cat.select(None, query)
+    await message.answer(
+        _perm_results_text(lang, "all", query, len(numbers)),
+        reply_markup=perm_numbers_kb(numbers, 0, "all", query, lang),
+    )
+
+
+async def perm_number_handler(call: CallbackQuery):
+    lang = await get_lang(call)
+    await call.answer()
+    cat = await _perm_catalog(call, lang)
+    if cat is None:
+        return
+    n = cat.get(call.data.split(":", 2)[2])
+    b = InlineKeyboardBuilder()
+    b.button(text=tr("menu.support", lang), callback_data="support")
+    b.button(text=tr("common.back", lang), callback_data="buy_perm")
+    b.adjust(1, 1)
+    if n is None:
+        await safe_edit_text(call.message, tr("perm.gone", lang), reply_markup=b.as_markup())
+        return
+    kind = next((tr(f"perm.filter.{t}", lang) for t in n.tags if t in ("round", "half")), "-")
+    await safe_edit_text(
+        call.message,
+        tr("perm.detail", lang, number=n.number, kind=kind, price=perm_price(n)),
+        reply_markup=b.as_markup(),
+    )
+
+
+# ---------------------- App bootstrap ----------------------
+
+def register_runtime_gauges() -> None:
+    # all replicas' active orders (orders:idx:all, read by the expiry sweeper each pass); pollers of this replica
+    GAUGES.set_function(lambda: order_expiry.active_orders, "active_orders")
+    GAUGES.set_function(lambda: len(POLL_TASKS), "poller_tasks")
+    GAUGES.set_function(lambda: (get_outbox().depth if get_outbox() else 0), "outbox_depth")
+    for key in enabled_providers():
+        GAUGES.set_function(
+            lambda key=key: len(price_sheets.get(key).rows) if price_sheets.get(key) else 0,
+            f"price_sheet_rows:{key}",
+        )
+
+
+def create_bot(session: Optional[BaseSession] = None) -> Bot:
+    return Bot(
+        token=settings.BOT_TOKEN,
+        session=session or AiohttpSession(json_loads=codec.loads, json_dumps=codec.dumps_str),
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+
+
+def build_dispatcher(bot: Bot) -> Dispatcher:
+    """Dispatcher with storage, middlewares and every handler registered (no I/O)."""
+    redis = get_redis_client()
+    if redis is not None:
+        storage = RedisStorage(redis, json_loads=codec.loads, json_dumps=codec.dumps)
+    else:
         from aiogram.fsm.storage.memory import MemoryStorage
 
         storage = MemoryStorage()
 
     dp = Dispatcher(storage=storage)
 
-    # middlewares (placeholder)
+    # middlewares
+    dp.update.outer_middleware(startup.first_update_middleware)
     set_locale_middleware(dp)
+    throttle = ThrottleMiddleware(
+        commands=BOT_COMMANDS,
+        prompt_states=(WalletTopUp.waiting_amount.state, PermSearch.waiting_digits.state),
+    )
+    dp.message.outer_middleware(throttle)
+    dp.callback_query.outer_middleware(throttle)
+    dp.message.middleware(HandlerMetricsMiddleware("message"))
+    dp.callback_query.middleware(HandlerMetricsMiddleware("callback_query"))
+    if settings.TRACE_ENABLED:
+        setup_tracing(
+            dp,
+            bot,
+            Tracer(settings.TRACE_SLOW_MS, settings.TRACE_SAMPLE_RATE, settings.TRACE_MAX_SPANS),
+        )
+    register_runtime_gauges()
+    register_order_consumers(bot)
 
     # handlers
     dp.message.register(start_handler, F.text == "/start")
     dp.message.register(balance_cmd, F.text == "/balance")
+    dp.message.register(pricing_list_cmd, F.text == "/pricing")
+    dp.message.register(pricing_set_cmd, F.text.startswith("/pricing_set"))
+    dp.message.register(pricing_del_cmd, F.text.startswith("/pricing_del"))
+    dp.message.register(admin_orders_cmd, F.text.startswith("/orders"))
+    dp.message.register(admin_report_cmd, F.text.startswith("/report"))
+    dp.message.register(admin_topups_settle_cmd, F.text.startswith("/topups_approve"))
+    dp.message.register(admin_topups_settle_cmd, F.text.startswith("/topups_reject"))
+    dp.message.register(admin_topups_cmd, F.text.startswith("/topups"))
     dp.message.register(topup_amount_input_handler, WalletTopUp.waiting_amount)
 
     dp.callback_query.register(home_handler, F.data == "home")
@@ -1132,18 +1882,77 @@ async def app():
     # Status control
     dp.callback_query.register(status_action_handler, F.data.startswith("st:"))
 
-    # Permanent numbers (stub)
+    # Permanent numbers
+    dp.message.register(perm_search_input_handler, PermSearch.waiting_digits)
     dp.callback_query.register(buy_perm_handler, F.data == "buy_perm")
+    dp.callback_query.register(perm_list_handler, F.data.startswith("pm:l:"))
+    dp.callback_query.register(perm_search_start_handler, F.data == "pm:search")
+    dp.callback_query.register(perm_number_handler, F.data.startswith("pm:n:"))
+    return dp
+
+
+async def app():
+    setup_logging()
+    startup.mark("settings")
+
+    bot = create_bot()
+    dp = build_dispatcher(bot)
+    redis = get_redis_client()
+    startup.mark("dispatcher")
 
     await on_startup(bot)
+    start_outbox(bot)
+    order_events.start()
+    metrics_runner = None
+    if settings.METRICS_ENABLED and settings.BOT_MODE.lower() != "webhook":
+        metrics_runner = await start_metrics_server(settings.METRICS_HOST, settings.METRICS_PORT)
+    if redis:
+        pricing_engine.start(redis)
+        price_sheets.start(redis, enabled_providers())
+        order_expiry.start(redis)
 
     mode = settings.BOT_MODE.lower()
-    if mode == "polling":
-        await dp.start_polling(bot)
-    else:
-        await dp.start_polling(bot)
+    startup.mark("ready")
+    try:
+        if mode == "webhook":
+            from .webhook import run_webhook
+
+            await run_webhook(dp, bot)
+        else:
+            await dp.start_polling(bot)
+    finally:
+        await catalogs.stop()
+        await perm_numbers.stop()
+        if settings.SNAPSHOT_PATH:
+            try:
+                save_snapshot()
+            except OSError as e:
+                logging.getLogger(__name__).warning("Snapshot write failed: %s", e)
+        await price_sheets.stop()
+        await pricing_engine.stop()
+        await order_expiry.stop()
+        await quote_prefetch.stop()
+        await order_events.stop()
+        await stop_outbox()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await close_redis_client()
+        if settings.HTTP_CASSETTE_MODE:
+            from .services.cassettes import close_writers
+
+            close_writers()
+
+
+def install_event_loop() -> None:
+    # uvloop is not available on Windows; the default loop is fine there
+    try:
+        import uvloop
+    except ImportError:
+        return
+    uvloop.install()
 
 
 if __name__ == "__main__":
+    install_event_loop()
     asyncio.run(app())
 
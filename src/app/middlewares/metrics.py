@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from ..utils.metrics import HANDLER_ERRORS, HANDLER_LATENCY
+from ..utils.tracing import span
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Inner middleware: records latency/errors per resolved handler (and its trace span)."""
+
+    def __init__(self, event: str) -> None:
+        self.event = event
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        h = data.get("handler")
+        name = getattr(getattr(h, "callback", None), "__name__", "unknown")
+        start = time.perf_counter()
+        try:
+            with span("handler", name=name):
+                return await handler(event, data)
+        except Exception as e:
+            HANDLER_ERRORS.labels(self.event, name, type(e).__name__).inc()
+            raise
+        finally:
+            HANDLER_LATENCY.labels(self.event, name).observe(time.perf_counter() - start)
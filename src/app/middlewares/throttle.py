@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from ..config import settings
+from ..i18n import LANGS, tr
+from ..services.outbox import Priority, get_outbox
+from ..utils.metrics import GAUGES, UPDATES_THROTTLED
+from ..utils.ratelimit import TokenBucket
+
+# Per-user rate limits and a per-replica cap on updates in flight.
+#
+# Every update from a user takes a token from that user's bucket
+# (THROTTLE_USER_RATE/s, THROTTLE_USER_BURST banked); at most
+# THROTTLE_MAX_CONCURRENCY updates are handled at once. What happens when a
+# limit is hit depends on the update's class:
+#
+#   critical   the purchase funnel (sv:s, ct:s, op:, cf:buy), order actions (st:cancel/close/repeat/ban)
+#              and top-up decisions, the bot's commands (/start, admin commands) and messages answering a
+#              prompt state (a top-up amount, search digits): admitted above the concurrency cap; over
+#              their rate they reserve a token up to THROTTLE_CRITICAL_WAIT ahead and wait for it, and
+#              are shed only when even that is taken (the user has queued that much already)
+#   refresh    st:refresh, a live provider status() call: degraded to the order's stored state (which the
+#              poller keeps current) via the handler's ``degraded`` argument
+#   browse     everything else (menus, pages, lists, free text): shed
+#
+# A shed callback is answered with a short "slow down" notice (it must be
+# answered). A shed message gets at most one such notice per user every
+# NOTICE_SECONDS, sent through the outbox on its lowest lane so a flood of
+# text does not turn into a flood of replies.
+#
+# so a user hammering page or refresh buttons spends their own budget and
+# cached answers, not the provider quota or the capacity others need.
+
+CRITICAL_PREFIXES = ("sv:s:", "ct:s:", "op:", "cf:", "w:approve:", "w:reject:")
+CRITICAL_ACTIONS = ("cancel", "close", "repeat", "ban")
+NOTICE_SECONDS = 30.0
+
+
+def command(text: Optional[str]) -> str:
+    """The command of a message text ("/pricing_set a=1" -> "/pricing_set"), "" if it is not one."""
+    if not text or not text.startswith("/"):
+        return ""
+    return text.split(maxsplit=1)[0].split("@", 1)[0]
+
+
+def classify(
+    event: TelegramObject,
+    state: Optional[str] = None,
+    commands: Iterable[str] = (),
+    prompt_states: Iterable[str] = (),
+) -> str:
+    """Class of an update; ``state`` is the user's FSM state (raw_state) when it arrived,
+    ``commands`` the bot's commands and ``prompt_states`` the states that wait for typed input."""
+    if isinstance(event, Message):
+        if (state and state in prompt_states) or command(event.text) in commands:
+            return "critical"
+        return "browse"
+    if not isinstance(event, CallbackQuery):
+        return "browse"
+    data = event.data or ""
+    if data.startswith(CRITICAL_PREFIXES):
+        return "critical"
+    if data.startswith("st:"):
+        action = data.split(":")[1]
+        if action == "refresh":
+            return "refresh"
+        if action in CRITICAL_ACTIONS:
+            return "critical"
+    return "browse"
+
+
+def _user_id(event: TelegramObject) -> Optional[int]:
+    user = getattr(event, "from_user", None)
+    return user.id if user is not None else None
+
+
+class ThrottleMiddleware(BaseMiddleware):
+    """Outer middleware for messages and callback queries (one instance shared by both)."""
+
+    def __init__(self, commands: Iterable[str] = (), prompt_states: Iterable[str] = ()) -> None:
+        self.commands = frozenset(commands)
+        self.prompt_states = frozenset(prompt_states)
+        self._users: Dict[int, TokenBucket] = {}
+        self._noticed: Dict[int, float] = {}
+        self._inflight = 0
+        GAUGES.set_function(lambda: self._inflight, "updates_inflight")
+
+    def _bucket(self, uid: int) -> TokenBucket:
+        b = self._users.get(uid)
+        if b is None:
+            if len(self._users) > 10000:
+                self._users = {k: v for k, v in self._users.items() if not v.idle}
+            b = self._users[uid] = TokenBucket(settings.THROTTLE_USER_RATE, capacity=settings.THROTTLE_USER_BURST)
+        return b
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        uid = _user_id(event)
+        if uid is None or settings.THROTTLE_USER_RATE <= 0:
+            return await handler(event, data)
+        cls = classify(event, data.get("raw_state"), self.commands, self.prompt_states)
+        event_type = "callback_query" if isinstance(event, CallbackQuery) else "message"
+        if cls == "critical":
+            # the token is taken even when it is not due yet, so a burst of critical updates queues
+            # behind the user's rate instead of all running after one short sleep
+            wait = self._bucket(uid).reserve(settings.THROTTLE_CRITICAL_WAIT)
+            if wait == float("inf"):
+                UPDATES_THROTTLED.labels(event_type, cls, "shed").inc()
+                await self._shed(event, data)
+                return None
+            if wait > 0:
+                UPDATES_THROTTLED.labels(event_type, cls, "delayed").inc()
+                await asyncio.sleep(wait)
+        elif self._bucket(uid).try_acquire() > 0 or 0 < settings.THROTTLE_MAX_CONCURRENCY <= self._inflight:
+            if cls == "refresh":
+                UPDATES_THROTTLED.labels(event_type, cls, "degraded").inc()
+                data["degraded"] = True
+            else:
+                UPDATES_THROTTLED.labels(event_type, cls, "shed").inc()
+                await self._shed(event, data)
+                return None
+        self._inflight += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self._inflight -= 1
+
+    async def _shed(self, event: TelegramObject, data: Dict[str, Any]) -> None:
+        # The notice uses the Telegram client language: no Redis read while overloaded.
+        lang = event.from_user.language_code or ""
+        text = tr("throttle.slow_down", lang if lang in LANGS else settings.LOCALE_DEFAULT)
+        if isinstance(event, CallbackQuery):
+            try:
+                await event.answer(text)
+            except Exception:
+                pass
+            return
+        outbox = get_outbox()
+        if not isinstance(event, Message) or outbox is None:
+            return
+        now = time.monotonic()
+        if self._noticed.get(event.from_user.id, 0.0) > now:
+            return
+        if len(self._noticed) > 10000:
+            self._noticed = {k: v for k, v in self._noticed.items() if v > now}
+        self._noticed[event.from_user.id] = now + NOTICE_SECONDS
+        outbox.send(event.chat.id, text, priority=Priority.BULK)
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from ..utils.tracing import Tracer, span
+
+
+def _update_attrs(update: Update) -> Dict[str, Any]:
+    attrs: Dict[str, Any] = {"update_id": update.update_id, "type": update.event_type}
+    if update.callback_query is not None:
+        attrs["user_id"] = update.callback_query.from_user.id
+        attrs["data"] = update.callback_query.data
+    elif update.message is not None:
+        msg = update.message
+        if msg.from_user is not None:
+            attrs["user_id"] = msg.from_user.id
+        text = msg.text or ""
+        # commands are useful for triage; free text (amounts, search) is not logged
+        attrs["text"] = text.split(maxsplit=1)[0] if text.startswith("/") else f"<{len(text)} chars>"
+    return attrs
+
+
+class UpdateTracingMiddleware(BaseMiddleware):
+    """Outer update middleware: one trace per update, slow ones go to the slow-log."""
+
+    def __init__(self, tracer: Tracer) -> None:
+        self.tracer = tracer
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        attrs = _update_attrs(event) if isinstance(event, Update) else {}
+        trace, token = self.tracer.start("update", **attrs)
+        try:
+            result = await handler(event, data)
+        except BaseException as e:
+            self.tracer.finish(trace, token, e)
+            raise
+        self.tracer.finish(trace, token)
+        return result
+
+
+class TelegramTracingMiddleware(BaseRequestMiddleware):
+    """Bot session middleware: a span per Telegram Bot API call."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        with span("telegram", method=method.__api_method__):
+            return await make_request(bot, method)
+
+
+def setup_tracing(dp, bot: Bot, tracer: Tracer) -> None:
+    # Must wrap the FSM middleware, which reads the user's state from Redis
+    # before any handler runs; outer middlewares run in registration order.
+    fsm = getattr(dp, "fsm", None)
+    if fsm is not None and fsm in dp.update.outer_middleware:
+        dp.update.outer_middleware.unregister(fsm)
+        dp.update.outer_middleware(UpdateTracingMiddleware(tracer))
+        dp.update.outer_middleware(fsm)
+    else:
+        dp.update.outer_middleware(UpdateTracingMiddleware(tracer))
+    bot.session.middleware(TelegramTracingMiddleware())
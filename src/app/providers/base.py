@@ -46,6 +46,27 @@ class Provider(ABC):
     ) -> Dict[str, Any]:
         """Return a normalized quote dict with keys: amount, count, repeat, time."""
 
+    async def operator_quotes(self, *, service: Union[int, str], country: Union[int, str]) -> List[Dict[str, Any]]:
+        """Return the quotes of every operator of a service/country in one call, as rows with keys:
+        operator, amount, count, repeat, time.
+        Providers without operator granularity (or a bulk endpoint) return an empty list.
+        """
+        return []
+
+    async def tariffs(self) -> List[Dict[str, Any]]:
+        """Return the whole tariff table as rows with keys:
+        service, country, operator, amount, count.
+        Providers without a bulk endpoint return an empty list.
+        """
+        return []
+
+    async def perm_numbers(self) -> List[Dict[str, Any]]:
+        """Return the permanent (special) numbers on sale as rows with keys:
+        ID, NUMBER, PRICE, TYPE (0 not round, 1 half round, 2 fully round).
+        Providers without permanent numbers return an empty list.
+        """
+        return []
+
     # Temporary numbers lifecycle
     @abstractmethod
     async def buy_temp(
@@ -53,6 +53,62 @@ class NumberlandProvider(Provider):
             "time": str(item.get("time", "00:20:00")),
         }
 
+    async def operator_quotes(self, *, service: Union[int, str], country: Union[int, str]) -> List[Dict[str, Any]]:
+        # getinfo without an operator returns one row per operator of the service/country
+        async with NumberlandClient() as cl:
+            info = await cl.get_info(service=service, country=country)
+        if isinstance(info, dict):
+            info = [info] if info.get("amount") else []
+        if not isinstance(info, list):
+            return []
+        out: List[Dict[str, Any]] = []
+        for it in info:
+            if str(it.get("active", 1)) != "1":
+                continue
+            try:
+                out.append({
+                    "operator": str(it["operator"]),
+                    "amount": int(it.get("amount", 0)),
+                    "count": int(it.get("count", 0)),
+                    "repeat": str(it.get("repeat", "0")),
+                    "time": str(it.get("time", "00:20:00")),
+                })
+            except (KeyError, TypeError, ValueError):
+                continue
+        return out
+
+    async def tariffs(self) -> List[Dict[str, Any]]:
+        # getinfo without filters returns every service/country/operator row
+        async with NumberlandClient() as cl:
+            info = await cl.get_info()
+        if not isinstance(info, list):
+            return []
+        out: List[Dict[str, Any]] = []
+        for it in info:
+            if str(it.get("active", 1)) != "1":
+                continue
+            try:
+                out.append({
+                    "service": str(it["service"]),
+                    "country": str(it["country"]),
+                    "operator": str(it.get("operator", "any")),
+                    "amount": int(it.get("amount", 0)),
+                    "count": int(it.get("count", 0)),
+                })
+            except (KeyError, TypeError, ValueError):
+                continue
+        return out
+
+    async def perm_numbers(self) -> List[Dict[str, Any]]:
+        # spnumberstree groups the same rows by TYPE; the TYPE lives on the group
+        async with NumberlandClient() as cl:
+            data = await cl.spnumbers_tree()
+        out: List[Dict[str, Any]] = []
+        for group in data.get("TYPES") or []:
+            for it in group.get("NUMBERS") or []:
+                out.append({**it, "TYPE": it.get("TYPE", group.get("TYPE"))})
+        return out
+
     # --------------- Temporary lifecycle ---------------
     async def buy_temp(
         self,
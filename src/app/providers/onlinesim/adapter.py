@@ -1,12 +1,17 @@
 from __future__ import annotations
 
 import asyncio
+import time
 from typing import Any, Dict, List, Optional, Union
 
 import httpx
 from loguru import logger
 
 from ...config import settings
+from ...utils import codec
+from ...utils.metrics import PROVIDER_HTTP_LATENCY, PROVIDER_HTTP_RETRIES
+from ...services.cassettes import transport_for
+from ...utils.tracing import span
 from ..base import Provider, ProviderAPIError
 
 
@@ -19,9 +24,14 @@ class _HTTP:
         self.timeout = timeout
         self._client: Optional[httpx.AsyncClient] = None
 
+    def _new_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=self.timeout, headers={"User-Agent": "ViranumBot/1.0"}, transport=transport_for("onlinesim")
+        )
+
     async def __aenter__(self) -> "_HTTP":
         if self._client is None:
-            self._client = httpx.AsyncClient(timeout=self.timeout, headers={"User-Agent": "ViranumBot/1.0"})
+            self._client = self._new_client()
         return self
 
     async def __aexit__(self, exc_type, exc, tb) -> None:
@@ -31,25 +41,35 @@ class _HTTP:
 
     async def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         if self._client is None:
-            self._client = httpx.AsyncClient(timeout=self.timeout)
+            self._client = self._new_client()
         q = params.copy() if params else {}
         q["apikey"] = self.key
-        url = f"{BASE_URL}/{endpoint}"
+        url = f"{(settings.ONLINESIM_BASE_URL or BASE_URL).rstrip('/')}/{endpoint}"
+        http_hist = PROVIDER_HTTP_LATENCY.labels("onlinesim", endpoint)
         for attempt in range(3):
             try:
-                r = await self._client.get(url, params=q)
+                started = time.perf_counter()
+                try:
+                    with span("http", endpoint=endpoint, attempt=attempt) as s:
+                        r = await self._client.get(url, params=q)
+                        if s is not None:
+                            s.attrs["status"] = r.status_code
+                finally:
+                    http_hist.observe(time.perf_counter() - started)
                 if r.status_code >= 500 and attempt < 2:
+                    PROVIDER_HTTP_RETRIES.labels("onlinesim", endpoint, "http_5xx").inc()
                     await asyncio.sleep(0.4 * (2**attempt))
                     continue
                 r.raise_for_status()
                 try:
-                    return r.json()
+                    return codec.loads(r.content)
                 except Exception:
                     logger.error("Invalid JSON from OnlineSim: {} {}", r.status_code, r.text[:200])
                     raise ProviderAPIError(-1, "invalid json")
             except httpx.HTTPError as e:
                 if attempt == 2:
                     raise ProviderAPIError(-1, str(e))
+                PROVIDER_HTTP_RETRIES.labels("onlinesim", endpoint, "network").inc()
                 await asyncio.sleep(0.4 * (2**attempt))
 
 
@@ -219,6 +239,32 @@ class OnlineSimProvider(Provider):
         time_str = "00:20:00"
         return {"amount": amount, "count": count, "repeat": repeat, "time": time_str}
 
+    async def tariffs(self) -> List[Dict[str, Any]]:
+        if not settings.ONLINESIM_API_KEY:
+            raise ProviderAPIError(-1, "missing ONLINESIM_API_KEY")
+        async with _HTTP(settings.ONLINESIM_API_KEY) as http:
+            data = await http.get(
+                "getTariffs.php", {"locale_price": "1", "count": "200", "page": "1", "lang": "en"}
+            )
+        if not _ok(data):
+            raise ProviderAPIError(int(data.get("errorCode", -1) or -1), data.get("error_msg", "tariffs error"))
+        tariffs = data.get("tariffs") or data.get("tarifs") or data.get("data") or {}
+        out: List[Dict[str, Any]] = []
+        for cid, svs in tariffs.items():
+            if not isinstance(svs, dict):
+                continue
+            for s_code, ent in svs.items():
+                if not isinstance(ent, dict):
+                    continue
+                try:
+                    amount = int(float(ent.get("cost", ent.get("price", 0))))
+                    count = int(ent.get("count", ent.get("numbers", 0)))
+                except (TypeError, ValueError):
+                    continue
+                # no operator granularity on OnlineSim
+                out.append({"service": str(s_code), "country": str(cid), "operator": "any", "amount": amount, "count": count})
+        return out
+
     async def buy_temp(
         self,
         *,
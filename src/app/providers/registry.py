@@ -1,11 +1,37 @@
 from __future__ import annotations
 
-from typing import Dict, List
+import functools
+import importlib
+import inspect
+import time
+from typing import Any, Callable, Dict, List, Union
 
 from ..config import settings
+from ..utils.metrics import PROVIDER_ERRORS, PROVIDER_LATENCY
+from ..utils.tracing import span
 from .base import Provider
-from .numberland.adapter import NumberlandProvider
-from .onlinesim.adapter import OnlineSimProvider
+
+
+# key -> factory(key=..., display_name=...); see register_provider. Built-in
+# adapters are given as "module:attr" and imported the first time they are used,
+# so an instance only loads the HTTP stacks of the providers it has enabled.
+ProviderFactory = Callable[..., Provider]
+_FACTORIES: Dict[str, Union[str, ProviderFactory]] = {
+    "numberland": ".numberland.adapter:NumberlandProvider",
+    "onlinesim": ".onlinesim.adapter:OnlineSimProvider",
+    "sandbox": ".sandbox.adapter:SandboxProvider",
+}
+_INSTANCES: Dict[str, Provider] = {}
+
+
+def register_provider(key: str, factory: ProviderFactory) -> None:
+    """Make ``key`` resolvable by get_provider (new backends, sandbox/fake providers).
+
+    The factory is called as ``factory(key=key, display_name=name)``.
+    """
+    key = key.strip().lower()
+    _FACTORIES[key] = factory
+    _INSTANCES.pop(key, None)
 
 
 def _parse_display_map(raw: str) -> Dict[str, str]:
@@ -36,14 +62,57 @@ def provider_display_name_map() -> Dict[str, str]:
     return _parse_display_map(settings.PROVIDERS_DISPLAY or "onlinesim:OnlineSim")
 
 
+class InstrumentedProvider:
+    """Transparent proxy recording latency/errors of every async provider method."""
+
+    def __init__(self, inner: Provider) -> None:
+        self._inner = inner
+        self.key = inner.key
+        self.display_name = inner.display_name
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._inner, name)
+        if name.startswith("_") or not inspect.iscoroutinefunction(attr):
+            return attr
+        hist = PROVIDER_LATENCY.labels(self.key, name)
+
+        @functools.wraps(attr)
+        async def timed(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                with span("provider", provider=self.key, method=name):
+                    return await attr(*args, **kwargs)
+            except Exception as e:
+                PROVIDER_ERRORS.labels(self.key, name, type(e).__name__).inc()
+                raise
+            finally:
+                hist.observe(time.perf_counter() - start)
+
+        setattr(self, name, timed)  # cache: next lookups skip __getattr__
+        return timed
+
+
 def get_provider(key: str) -> Provider:
+    """Shared instrumented provider for ``key``, created on first use (adapters are stateless)."""
     key = (key or "").strip().lower()
-    display = provider_display_name_map().get(key, key)
+    prov = _INSTANCES.get(key)
+    if prov is None:
+        prov = _INSTANCES[key] = InstrumentedProvider(_create_provider(key))  # type: ignore[assignment]
+    return prov
 
-    if key == "numberland":
-        return NumberlandProvider(key=key, display_name=display)
-    if key == "onlinesim":
-        return OnlineSimProvider(key=key, display_name=display)
 
-    # Future: add 5sim, sms-activate, etc.
-    raise ValueError(f"Unknown provider key: {key}")
+def _factory(key: str) -> ProviderFactory:
+    factory = _FACTORIES.get(key)
+    if factory is None:
+        # Future: add 5sim, sms-activate, etc.
+        raise ValueError(f"Unknown provider key: {key}")
+    if isinstance(factory, str):
+        module, _, attr = factory.partition(":")
+        factory = _FACTORIES[key] = getattr(importlib.import_module(module, __package__), attr)
+    return factory
+
+
+def _create_provider(key: str) -> Provider:
+    key = (key or "").strip().lower()
+    display = provider_display_name_map().get(key, key)
+    return _factory(key)(key=key, display_name=display)
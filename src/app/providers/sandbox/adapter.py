@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Optional, Union
+
+from ...sandbox.market import (
+    STATUS_TEXT,
+    SandboxAPIError,
+    SandboxMarket,
+    SandboxTransportError,
+    get_market,
+)
+from ..base import Provider, ProviderAPIError
+
+
+class SandboxProvider(Provider):
+    """Offline provider backed by the in-process SandboxMarket (see SANDBOX_* settings).
+
+    Latency and faults are applied per call like a remote panel: transport faults
+    surface as ProviderAPIError(-1, ...) the way the HTTP adapters report them
+    after their retries, API faults keep their Numberland RESULT code.
+    """
+
+    def __init__(self, *, key: str, display_name: str, market: Optional[SandboxMarket] = None) -> None:
+        self.key = key
+        self.display_name = display_name
+        self._market = market
+
+    @property
+    def market(self) -> SandboxMarket:
+        return self._market or get_market()
+
+    async def _call(self, *, api: bool = False) -> SandboxMarket:
+        m = self.market
+        await asyncio.sleep(m.latency())
+        try:
+            m.raise_fault()
+            if api:
+                m.raise_fault(api=True)
+        except SandboxTransportError as e:
+            raise ProviderAPIError(-1, f"sandbox {e.kind}")
+        except SandboxAPIError as e:
+            raise ProviderAPIError(e.code, e.description)
+        return m
+
+    # ---------------- Catalog ----------------
+    async def balance(self) -> Dict[str, Any]:
+        m = await self._call()
+        return {"BALANCE": str(m.balance), "CURRENCY": "Toman"}
+
+    async def get_services(self) -> List[Dict[str, Any]]:
+        m = await self._call()
+        return [dict(s) for s in m.services]
+
+    async def get_countries(self) -> List[Dict[str, Any]]:
+        m = await self._call()
+        return [dict(c) for c in m.countries]
+
+    async def quote(
+        self, *, service: Union[int, str], country: Union[int, str], operator: Union[int, str]
+    ) -> Dict[str, Any]:
+        m = await self._call()
+        rows = m.info(str(service), str(country), str(operator))
+        if not rows:
+            return {"amount": 0, "count": 0, "repeat": "0", "time": "00:20:00"}
+        t = rows[0]
+        return {"amount": t.amount, "count": t.count, "repeat": t.repeat, "time": t.time}
+
+    async def operator_quotes(self, *, service: Union[int, str], country: Union[int, str]) -> List[Dict[str, Any]]:
+        m = await self._call()
+        return [
+            {"operator": t.operator, "amount": t.amount, "count": t.count, "repeat": t.repeat, "time": t.time}
+            for t in m.info(str(service), str(country))
+        ]
+
+    async def tariffs(self) -> List[Dict[str, Any]]:
+        m = await self._call()
+        return [
+            {"service": t.service, "country": t.country, "operator": t.operator, "amount": t.amount, "count": t.count}
+            for t in m.tariffs.values()
+        ]
+
+    async def perm_numbers(self) -> List[Dict[str, Any]]:
+        m = await self._call()
+        return [dict(n) for n in m.perm_numbers]
+
+    # ---------------- Lifecycle ----------------
+    async def buy_temp(
+        self,
+        *,
+        service: Union[int, str],
+        country: Union[int, str],
+        operator: Union[int, str],
+        price: Optional[Union[int, str]] = None,
+    ) -> Dict[str, Any]:
+        m = await self._call(api=True)
+        try:
+            o = m.buy(str(service), str(country), str(operator))
+        except SandboxAPIError as e:
+            raise ProviderAPIError(e.code, e.description)
+        return {
+            "RESULT": 1,
+            "ID": o.id,
+            "NUMBER": o.number,
+            "AREACODE": o.tariff.country,
+            "AMOUNT": o.amount,
+            "REPEAT": o.tariff.repeat,
+            "TIME": o.tariff.time,
+        }
+
+    async def _status_of(self, action, id: Union[int, str]) -> Dict[str, Any]:
+        await self._call()
+        try:
+            o = action(str(id))
+        except SandboxAPIError as e:
+            return {"RESULT": e.code, "CODE": "", "DESCRIPTION": e.description}
+        return {"RESULT": int(o.status), "CODE": o.code, "DESCRIPTION": STATUS_TEXT[o.status]}
+
+    async def status(self, *, id: Union[int, str]) -> Dict[str, Any]:
+        return await self._status_of(self.market.get, id)
+
+    async def cancel(self, *, id: Union[int, str]) -> Dict[str, Any]:
+        return await self._status_of(self.market.cancel, id)
+
+    async def ban(self, *, id: Union[int, str]) -> Dict[str, Any]:
+        return await self._status_of(lambda oid: self.market.cancel(oid, banned=True), id)
+
+    async def repeat(self, *, id: Union[int, str]) -> Dict[str, Any]:
+        return await self._status_of(self.market.repeat, id)
+
+    async def close(self, *, id: Union[int, str]) -> Dict[str, Any]:
+        return await self._status_of(self.market.close, id)
@@ -0,0 +1,56 @@
+"""Run the local Numberland / OnlineSim stand-ins.
+
+    python -m src.app.sandbox --port 8089 --latency lognormal:80:400 --errors=-205:0.02,5xx:0.05
+
+then start the bot with NUMBERLAND_BASE_URL=http://127.0.0.1:8089/v2.php and/or
+ONLINESIM_BASE_URL=http://127.0.0.1:8089/api (any non-empty API key works).
+Options default to the SANDBOX_* settings.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from ..config import settings
+from .market import Distribution, SandboxConfig, SandboxMarket, parse_rates
+from .servers import serve
+
+
+def main() -> None:
+    base = SandboxConfig.from_settings()
+    ap = argparse.ArgumentParser(prog="python -m src.app.sandbox", description="Local provider API stand-ins")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=settings.SANDBOX_PORT)
+    ap.add_argument("--seed", type=int, default=base.seed)
+    ap.add_argument("--latency", default=settings.SANDBOX_LATENCY, help="fixed:MS | uniform:MIN:MAX | lognormal:MEDIAN:P99")
+    ap.add_argument("--errors", default=settings.SANDBOX_ERROR_RATES, help="e.g. -205:0.01,-210:0.01,5xx:0.02,bad_json:0.01")
+    ap.add_argument("--stock", type=int, default=base.stock, help="mean stock per tariff row")
+    ap.add_argument("--code-delay", default=settings.SANDBOX_CODE_DELAY, help="distribution of code arrival (ms)")
+    ap.add_argument("--code-rate", type=float, default=base.code_rate, help="share of orders that ever get a code")
+    args = ap.parse_args()
+
+    config = SandboxConfig(
+        seed=args.seed,
+        latency=Distribution.parse(args.latency),
+        error_rates=parse_rates(args.errors),
+        stock=args.stock,
+        balance=base.balance,
+        code_delay=Distribution.parse(args.code_delay),
+        code_rate=args.code_rate,
+    )
+
+    async def run() -> None:
+        runner = await serve(SandboxMarket(config), args.host, args.port)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
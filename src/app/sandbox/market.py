@@ -0,0 +1,377 @@
+from __future__ import annotations
+
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..utils.enums import NumberStatus
+
+# Offline model of a virtual-number panel: catalog, tariff table with stock,
+# balance, orders with code arrival, plus latency and fault injection. The
+# sandbox provider uses it in-process; sandbox/servers.py exposes it over the
+# Numberland v2.php and OnlineSim HTTP protocols.
+
+SERVICE_NAMES = [
+    ("تلگرام", "Telegram"), ("واتساپ", "WhatsApp"), ("اینستاگرام", "Instagram"), ("گوگل", "Google"),
+    ("فیسبوک", "Facebook"), ("توییتر", "Twitter"), ("دیسکورد", "Discord"), ("تیک‌تاک", "TikTok"),
+    ("اپل", "Apple"), ("مایکروسافت", "Microsoft"), ("آمازون", "Amazon"), ("ChatGPT", "ChatGPT"),
+]
+COUNTRY_NAMES = [
+    ("7", "روسیه", "Russia", "🇷🇺"), ("1", "آمریکا", "USA", "🇺🇸"), ("44", "انگلیس", "United Kingdom", "🇬🇧"),
+    ("49", "آلمان", "Germany", "🇩🇪"), ("90", "ترکیه", "Turkey", "🇹🇷"), ("98", "ایران", "Iran", "🇮🇷"),
+    ("380", "اوکراین", "Ukraine", "🇺🇦"), ("62", "اندونزی", "Indonesia", "🇮🇩"), ("91", "هند", "India", "🇮🇳"),
+    ("55", "برزیل", "Brazil", "🇧🇷"),
+]
+OPERATORS = ("1", "2", "3", "4")
+# permanent number price range (Toman) per TYPE: not round, half round, fully round
+PERM_PRICES = ((150_000, 300_000), (300_000, 600_000), (600_000, 1_200_000))
+
+# fault kinds understood by SANDBOX_ERROR_RATES; negative ones are Numberland RESULT codes
+TRANSPORT_FAULTS = ("5xx", "bad_json", "timeout")
+API_FAULTS = {-205: "no balance", -210: "service is not active", -211: "operator is not active", -900: "other technical error"}
+
+
+class SandboxAPIError(Exception):
+    def __init__(self, code: int, description: str) -> None:
+        super().__init__(f"API error {code}: {description}")
+        self.code = code
+        self.description = description
+
+
+class SandboxTransportError(Exception):
+    """Injected transport-level fault: kind is one of TRANSPORT_FAULTS."""
+
+    def __init__(self, kind: str) -> None:
+        super().__init__(f"injected {kind}")
+        self.kind = kind
+
+
+@dataclass
+class Distribution:
+    """Millisecond distribution parsed from "fixed:50", "uniform:20:200" or "lognormal:80:400"
+    (lognormal takes median and p99)."""
+
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Distribution":
+        parts = (spec or "fixed:0").split(":")
+        kind = parts[0].strip().lower()
+        nums = [float(x) for x in parts[1:]]
+        if kind == "fixed" and len(nums) == 1:
+            return cls("fixed", nums[0])
+        if kind in ("uniform", "lognormal") and len(nums) == 2:
+            return cls(kind, nums[0], nums[1])
+        raise ValueError(f"Bad distribution spec: {spec!r}")
+
+    def sample_ms(self, rnd: random.Random) -> float:
+        if self.kind == "uniform":
+            return rnd.uniform(self.a, self.b)
+        if self.kind == "lognormal":
+            if self.a <= 0:
+                return 0.0
+            # p99 = median * exp(2.326 * sigma)
+            sigma = math.log(max(self.b, self.a) / self.a) / 2.326
+            return rnd.lognormvariate(math.log(self.a), sigma)
+        return self.a
+
+    def sample(self, rnd: random.Random) -> float:
+        return self.sample_ms(rnd) / 1000.0
+
+
+def parse_rates(spec: str) -> Dict[str, float]:
+    """"-205:0.01,5xx:0.02,bad_json:0.005" -> {"-205": 0.01, ...}"""
+    out: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        kind, _, rate = part.rpartition(":")
+        if kind not in TRANSPORT_FAULTS and not (kind.lstrip("-").isdigit() and int(kind) in API_FAULTS):
+            raise ValueError(f"Unknown fault kind: {kind!r}")
+        out[kind] = float(rate)
+    return out
+
+
+@dataclass
+class SandboxConfig:
+    seed: int = 1
+    latency: Distribution = field(default_factory=Distribution)
+    error_rates: Dict[str, float] = field(default_factory=dict)
+    stock: int = 200
+    balance: int = 10_000_000
+    code_delay: Distribution = field(default_factory=lambda: Distribution("uniform", 5000, 30000))
+    code_rate: float = 0.9
+    services: int = 40
+    countries: int = 10
+    perm_numbers: int = 2000
+
+    @classmethod
+    def from_settings(cls) -> "SandboxConfig":
+        return cls(
+            seed=settings.SANDBOX_SEED,
+            latency=Distribution.parse(settings.SANDBOX_LATENCY),
+            error_rates=parse_rates(settings.SANDBOX_ERROR_RATES),
+            stock=settings.SANDBOX_STOCK,
+            balance=settings.SANDBOX_BALANCE,
+            code_delay=Distribution.parse(settings.SANDBOX_CODE_DELAY),
+            code_rate=settings.SANDBOX_CODE_RATE,
+        )
+
+
+@dataclass
+class Tariff:
+    service: str
+    country: str
+    operator: str
+    amount: int
+    count: int
+    repeat: str = "1"
+    time: str = "00:20:00"
+    active: int = 1
+
+
+@dataclass
+class Order:
+    id: str
+    tariff: Tariff
+    number: str
+    amount: int
+    created_at: float
+    expires_at: float
+    code_at: Optional[float]
+    status: int = NumberStatus.WAIT_CODE
+    code: str = ""
+
+
+class SandboxMarket:
+    def __init__(self, config: Optional[SandboxConfig] = None, clock: Callable[[], float] = time.time) -> None:
+        self.config = config or SandboxConfig()
+        self.clock = clock
+        self.rnd = random.Random(self.config.seed)
+        self.balance = self.config.balance
+        self._next_id = 70_000
+        self.orders: Dict[str, Order] = {}
+        self.services = self._build_services()
+        self.countries = self._build_countries()
+        self.tariffs: Dict[Tuple[str, str, str], Tariff] = self._build_tariffs()
+        self.perm_numbers = self._build_perm_numbers()
+
+    # ---------------- catalog ----------------
+    def _build_services(self) -> List[Dict[str, Any]]:
+        out = []
+        for i in range(1, self.config.services + 1):
+            fa, en = SERVICE_NAMES[i - 1] if i <= len(SERVICE_NAMES) else (f"سرویس {i}", f"Service {i}")
+            out.append({"id": str(i), "name": fa, "name_en": en, "active": 1})
+        return out
+
+    def _build_countries(self) -> List[Dict[str, Any]]:
+        out = []
+        for i in range(self.config.countries):
+            if i < len(COUNTRY_NAMES):
+                cid, fa, en, emoji = COUNTRY_NAMES[i]
+            else:
+                cid, fa, en, emoji = str(1000 + i), f"کشور {i}", f"Country {i}", "🏳️"
+            out.append({"id": cid, "name": fa, "name_en": en, "areacode": cid, "emoji": emoji, "active": 1})
+        return out
+
+    def _build_tariffs(self) -> Dict[Tuple[str, str, str], Tariff]:
+        rnd = self.rnd
+        out: Dict[Tuple[str, str, str], Tariff] = {}
+        for sv in self.services:
+            base = rnd.choice([900, 1500, 2200, 4000, 8000])
+            for ct in self.countries:
+                for op in OPERATORS:
+                    amount = int(base * rnd.uniform(0.6, 2.5)) // 10 * 10
+                    count = max(0, int(rnd.expovariate(1 / self.config.stock))) if self.config.stock else 0
+                    out[(sv["id"], ct["id"], op)] = Tariff(
+                        sv["id"], ct["id"], op, amount, count, repeat="1" if rnd.random() < 0.8 else "0"
+                    )
+        return out
+
+    def _build_perm_numbers(self) -> List[Dict[str, Any]]:
+        # own generator so the size of this list never shifts the tariff table
+        rnd = random.Random(self.config.seed + 1)
+        out = []
+        for i in range(self.config.perm_numbers):
+            national = "".join(str(rnd.randint(0, 9)) for _ in range(10))
+            kind = rnd.random()
+            if kind < 0.10:  # long run: 0000, 77777
+                pattern = str(rnd.randint(0, 9)) * rnd.randint(4, 6)
+            elif kind < 0.25:  # repeated block: 3535, 123123
+                pattern = "".join(str(rnd.randint(0, 9)) for _ in range(rnd.choice((2, 3)))) * 2
+            elif kind < 0.35:  # sequence: 1234, 9876
+                start = rnd.randint(0, 6)
+                pattern = "".join(str(start + k) for k in range(4))
+                pattern = pattern if rnd.random() < 0.5 else pattern[::-1]
+            else:
+                pattern = ""
+            at = rnd.randint(3, 10 - len(pattern))
+            national = national[:at] + pattern + national[at + len(pattern):]
+            type_ = 2 if kind < 0.10 else 1 if kind < 0.35 else 0
+            low, high = PERM_PRICES[type_]
+            ct = self.countries[i % len(self.countries)]["id"] if self.countries else "1"
+            out.append({
+                "ID": str(13_000 + i),
+                "NUMBER": f"+{ct} ({national[:3]}) {national[3:6]}-{national[6:]}",
+                "PRICE": str(rnd.randint(low, high) // 10_000 * 10_000),
+                "TYPE": str(type_),
+                "COMMENT": ("not round", "half round", "fully round")[type_],
+            })
+        return out
+
+    def info(self, service: Optional[str] = None, country: Optional[str] = None,
+             operator: Optional[str] = None) -> List[Tariff]:
+        rows = [
+            t for t in self.tariffs.values()
+            if (service is None or t.service == str(service)) and (country is None or t.country == str(country))
+        ]
+        if operator in (None, "", "any", "min"):
+            if operator in ("any", "min") and service is not None and country is not None:
+                pick = self._pick(rows, str(operator))
+                return [pick] if pick else []
+            return rows
+        return [t for t in rows if t.operator == str(operator)]
+
+    @staticmethod
+    def _pick(rows: List[Tariff], operator: str) -> Optional[Tariff]:
+        ordered = sorted(rows, key=lambda t: t.amount)
+        if operator == "min":
+            return ordered[0] if ordered and ordered[0].count > 0 else None
+        return next((t for t in ordered if t.count > 0), None)
+
+    # ---------------- faults / latency ----------------
+    def latency(self) -> float:
+        return self.config.latency.sample(self.rnd)
+
+    def fault(self, *, api: bool = False) -> Optional[str]:
+        """Roll the configured rates for transport faults, or for RESULT-code faults when ``api``
+        (only purchase calls roll those)."""
+        for kind, rate in self.config.error_rates.items():
+            if (kind in TRANSPORT_FAULTS) == api:
+                continue
+            if rate > 0 and self.rnd.random() < rate:
+                return kind
+        return None
+
+    def raise_fault(self, *, api: bool = False) -> None:
+        kind = self.fault(api=api)
+        if kind is None:
+            return
+        if kind in TRANSPORT_FAULTS:
+            raise SandboxTransportError(kind)
+        code = int(kind)
+        raise SandboxAPIError(code, API_FAULTS[code])
+
+    # ---------------- orders ----------------
+    def buy(self, service: str, country: str, operator: str, price: Optional[int] = None) -> Order:
+        if operator in ("any", "min"):
+            rows = [t for t in self.tariffs.values() if t.service == str(service) and t.country == str(country)]
+            tariff = self._pick(rows, operator)
+        else:
+            tariff = self.tariffs.get((str(service), str(country), str(operator)))
+            if tariff is not None and tariff.count <= 0:
+                tariff = None
+        if tariff is None:
+            if not any(t.service == str(service) for t in self.tariffs.values()):
+                raise SandboxAPIError(-210, API_FAULTS[-210])
+            raise SandboxAPIError(-204, "this number is not active")
+        if self.balance < tariff.amount:
+            raise SandboxAPIError(-205, API_FAULTS[-205])
+        tariff.count -= 1
+        self.balance -= tariff.amount
+        self._next_id += 1
+        now = self.clock()
+        oid = str(self._next_id)
+        order = Order(
+            id=oid,
+            tariff=tariff,
+            number=f"{tariff.country}9{self.rnd.randint(10**8, 10**9 - 1)}",
+            amount=tariff.amount,
+            created_at=now,
+            expires_at=now + 20 * 60,
+            code_at=self._code_at(now),
+        )
+        self.orders[oid] = order
+        return order
+
+    def _code_at(self, now: float) -> Optional[float]:
+        if self.rnd.random() >= self.config.code_rate:
+            return None
+        return now + self.config.code_delay.sample(self.rnd)
+
+    def get(self, order_id: str) -> Order:
+        order = self.orders.get(str(order_id))
+        if order is None:
+            raise SandboxAPIError(-304, "number id not found")
+        return self._advance(order)
+
+    def _advance(self, order: Order) -> Order:
+        now = self.clock()
+        if order.status in (NumberStatus.WAIT_CODE, NumberStatus.WAIT_CODE_AGAIN):
+            if order.code_at is not None and now >= order.code_at:
+                order.status = NumberStatus.CODE_RECEIVED
+                order.code = str(self.rnd.randint(10000, 99999))
+            elif now >= order.expires_at:
+                if order.status == NumberStatus.WAIT_CODE:
+                    self._refund(order, NumberStatus.CANCELED)
+                else:
+                    order.status = NumberStatus.COMPLETED
+        return order
+
+    def _refund(self, order: Order, status: int) -> None:
+        order.status = status
+        self.balance += order.amount
+        order.tariff.count += 1
+
+    def cancel(self, order_id: str, banned: bool = False) -> Order:
+        order = self.get(order_id)
+        if order.status != NumberStatus.WAIT_CODE:
+            raise SandboxAPIError(-204, "this number is not active")
+        self._refund(order, NumberStatus.BANNED if banned else NumberStatus.CANCELED)
+        return order
+
+    def repeat(self, order_id: str) -> Order:
+        order = self.get(order_id)
+        if order.status != NumberStatus.CODE_RECEIVED or order.tariff.repeat != "1":
+            raise SandboxAPIError(-204, "this number is not active")
+        order.status = NumberStatus.WAIT_CODE_AGAIN
+        order.code_at = self._code_at(self.clock())
+        return order
+
+    def close(self, order_id: str) -> Order:
+        order = self.get(order_id)
+        if order.status not in (NumberStatus.CODE_RECEIVED, NumberStatus.WAIT_CODE_AGAIN):
+            raise SandboxAPIError(-204, "this number is not active")
+        order.status = NumberStatus.COMPLETED
+        return order
+
+
+STATUS_TEXT = {
+    NumberStatus.WAIT_CODE: "wait code",
+    NumberStatus.CODE_RECEIVED: "code received",
+    NumberStatus.CANCELED: "number canceled",
+    NumberStatus.BANNED: "number banned",
+    NumberStatus.WAIT_CODE_AGAIN: "wait code again",
+    NumberStatus.COMPLETED: "completed",
+}
+
+_market: Optional[SandboxMarket] = None
+
+
+def get_market() -> SandboxMarket:
+    """Process-wide market built from SANDBOX_* settings."""
+    global _market
+    if _market is None:
+        _market = SandboxMarket(SandboxConfig.from_settings())
+    return _market
+
+
+def set_market(market: Optional[SandboxMarket]) -> None:
+    global _market
+    _market = market
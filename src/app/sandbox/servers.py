@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+from loguru import logger
+
+from ..utils import codec
+from ..utils.enums import NumberStatus
+from .market import STATUS_TEXT, Order, SandboxAPIError, SandboxMarket, SandboxTransportError
+
+# Local HTTP stand-ins for the Numberland v2.php and OnlineSim APIs, both served
+# by one aiohttp app on top of a SandboxMarket. Point NUMBERLAND_BASE_URL at
+# http://HOST:PORT/v2.php and ONLINESIM_BASE_URL at http://HOST:PORT/api.
+
+MARKET_KEY = web.AppKey("sandbox_market", SandboxMarket)
+
+# injected "timeout": hold the request longer than the clients' 15s timeout
+TIMEOUT_HOLD_SECONDS = 30.0
+
+
+def _json(data: Any, status: int = 200) -> web.Response:
+    return web.Response(body=codec.dumps(data), status=status, content_type="application/json")
+
+
+async def _transport(market: SandboxMarket) -> Optional[web.Response]:
+    """Simulated latency, then an error response if a transport fault (5xx, bad JSON, timeout) is rolled."""
+    await asyncio.sleep(market.latency())
+    try:
+        market.raise_fault()
+    except SandboxTransportError as e:
+        if e.kind == "5xx":
+            return web.Response(status=503, text="Service Unavailable")
+        if e.kind == "bad_json":
+            return web.Response(status=200, text='{"RESULT":"1","BAL', content_type="application/json")
+        await asyncio.sleep(TIMEOUT_HOLD_SECONDS)
+        return web.Response(status=504, text="Gateway Timeout")
+    return None
+
+
+# ---------------------- Numberland v2.php ----------------------
+
+def _nl_tariff(t) -> Dict[str, Any]:
+    return {
+        "service": t.service, "country": t.country, "operator": t.operator, "count": str(t.count),
+        "amount": str(t.amount), "repeat": t.repeat, "time": t.time, "active": t.active, "description": "",
+    }
+
+
+def _nl_status(order: Order) -> Dict[str, Any]:
+    return {"RESULT": int(order.status), "CODE": order.code or "0", "DESCRIPTION": STATUS_TEXT[order.status]}
+
+
+def _nl_perm_tree(market: SandboxMarket) -> List[Dict[str, Any]]:
+    groups: Dict[str, Dict[str, Any]] = {}
+    for n in market.perm_numbers:
+        g = groups.setdefault(n["TYPE"], {"TYPE": int(n["TYPE"]), "DESCRIPTION": n["COMMENT"], "NUMBERS": []})
+        g["NUMBERS"].append({"ID": n["ID"], "NUMBER": n["NUMBER"], "PRICE": n["PRICE"]})
+    return [groups[k] for k in sorted(groups)]
+
+
+async def numberland(request: web.Request) -> web.Response:
+    market = request.app[MARKET_KEY]
+    q = request.query
+    method = q.get("method", "")
+    if not q.get("apikey"):
+        return _json({"RESULT": -901, "DESCRIPTION": "apikey not found"})
+    early = await _transport(market)
+    if early is not None:
+        return early
+    try:
+        if method == "balance":
+            return _json({"RESULT": "1", "BALANCE": str(market.balance), "CURRENCY": "Toman"})
+        if method == "getservice":
+            return _json(market.services)
+        if method == "getcountry":
+            return _json(market.countries)
+        if method == "getinfo":
+            rows = market.info(q.get("service"), q.get("country"), q.get("operator"))
+            return _json([_nl_tariff(t) for t in rows])
+        if method == "spnumberslist":
+            return _json({"RESULT": 1, "DESCRIPTION": market.perm_numbers})
+        if method == "spnumberstree":
+            return _json({"RESULT": 1, "TYPES": _nl_perm_tree(market)})
+        if method == "getnum":
+            if not (q.get("service") and q.get("country") and q.get("operator")):
+                raise SandboxAPIError(-202, "parameters not found")
+            market.raise_fault(api=True)
+            o = market.buy(q["service"], q["country"], q["operator"])
+            return _json({
+                "RESULT": "1", "ID": o.id, "NUMBER": o.number, "AREACODE": o.tariff.country,
+                "AMOUNT": str(o.amount), "REPEAT": o.tariff.repeat, "TIME": o.tariff.time,
+            })
+        oid = q.get("id", "")
+        if method == "checkstatus":
+            return _json(_nl_status(market.get(oid)))
+        if method in ("cancelnumber", "bannumber"):
+            return _json(_nl_status(market.cancel(oid, banned=method == "bannumber")))
+        if method == "repeat":
+            return _json(_nl_status(market.repeat(oid)))
+        if method == "closenumber":
+            return _json(_nl_status(market.close(oid)))
+        return _json({"RESULT": -902, "DESCRIPTION": "method invalid"})
+    except SandboxAPIError as e:
+        return _json({"RESULT": e.code, "DESCRIPTION": e.description})
+
+
+# ---------------------- OnlineSim /api/*.php ----------------------
+
+_OS_STATE = {
+    NumberStatus.WAIT_CODE: "TZ_NUM_WAIT",
+    NumberStatus.CODE_RECEIVED: "TZ_NUM_ANSWER",
+    NumberStatus.WAIT_CODE_AGAIN: "TZ_NUM_WAIT_AGAIN",
+    NumberStatus.CANCELED: "TZ_CANCELED",
+    NumberStatus.BANNED: "TZ_BANNED",
+    NumberStatus.COMPLETED: "TZ_OVER_OK",
+}
+
+
+def _os_error(e: SandboxAPIError) -> web.Response:
+    return _json({"response": "ERROR", "errorCode": e.code, "error_msg": e.description})
+
+
+async def onlinesim(request: web.Request) -> web.Response:
+    market = request.app[MARKET_KEY]
+    endpoint = request.match_info["endpoint"]
+    q = request.query
+    if not q.get("apikey"):
+        return _json({"response": "ERROR_WRONG_KEY", "error_msg": "wrong key", "errorCode": -901})
+    early = await _transport(market)
+    if early is not None:
+        return early
+    try:
+        if endpoint == "getBalance.php":
+            return _json({"response": 1, "balance": str(market.balance), "zbalance": 0})
+        if endpoint == "getTariffs.php":
+            tariffs: Dict[str, Dict[str, Any]] = {}
+            for t in market.info(None, q.get("country")):
+                if q.get("filter_service") and t.service != q["filter_service"]:
+                    continue
+                svs = tariffs.setdefault(t.country, {})
+                ent = svs.get(t.service)
+                # no operator granularity: cheapest price, summed stock
+                if ent is None:
+                    svs[t.service] = {"cost": t.amount, "count": t.count}
+                else:
+                    ent["cost"] = min(ent["cost"], t.amount)
+                    ent["count"] += t.count
+            return _json({"response": 1, "tariffs": tariffs})
+        if endpoint == "getNum.php":
+            market.raise_fault(api=True)
+            o = market.buy(q.get("service", ""), q.get("country", ""), "any")
+            return _json({"response": 1, "tzid": int(o.id), "number": "+" + o.number})
+        if endpoint == "getState.php":
+            o = market.get(q.get("tzid", ""))
+            item: Dict[str, Any] = {"tzid": int(o.id), "number": "+" + o.number, "status": _OS_STATE[o.status]}
+            if o.code:
+                item["code"] = o.code
+            return _json([item])
+        if endpoint == "setOperation.php":
+            oid, op = q.get("tzid", ""), q.get("op", "")
+            if op == "8":
+                market.cancel(oid)
+            elif op == "3":
+                market.repeat(oid)
+            elif op == "6":
+                market.close(oid)
+            else:
+                raise SandboxAPIError(-202, "parameters not found")
+            return _json({"response": 1})
+        return _json({"response": "ERROR_WRONG_METHOD", "error_msg": "unknown endpoint", "errorCode": -902}, status=404)
+    except SandboxAPIError as e:
+        return _os_error(e)
+
+
+async def state(request: web.Request) -> web.Response:
+    """Debug view: balance, order counts by status."""
+    market = request.app[MARKET_KEY]
+    by_status: Dict[str, int] = {}
+    for o in market.orders.values():
+        name = STATUS_TEXT[o.status]
+        by_status[name] = by_status.get(name, 0) + 1
+    return _json({
+        "balance": market.balance,
+        "orders": by_status,
+        "config": asdict(market.config),
+    })
+
+
+def build_app(market: SandboxMarket) -> web.Application:
+    app = web.Application()
+    app[MARKET_KEY] = market
+    app.router.add_get("/v2.php", numberland)
+    app.router.add_get("/api/{endpoint}", onlinesim)
+    app.router.add_get("/_sandbox", state)
+    return app
+
+
+async def serve(market: SandboxMarket, host: str, port: int) -> web.AppRunner:
+    runner = web.AppRunner(build_app(market), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    logger.info("Sandbox provider APIs on http://{}:{} (/v2.php, /api/*)", host, port)
+    return runner
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis.exceptions import WatchError
+
+from ..utils import codec
+
+# Secondary indexes for admin queries. Orders live in per-user hashes
+# (active:{uid}) and top-up requests under wallet:topup:{id}, so "every active
+# order" or "every pending top-up" would otherwise be a SCAN of the keyspace.
+# Each write to those records queues its index updates in the same MULTI:
+#
+#   orders:idx:all                 every active order, by purchase time
+#   orders:idx:provider:{key}      ... of one provider
+#   orders:idx:status:{status}     ... in one status (active, code, repeat)
+#   topups:idx:{status}            top-up request ids by time (pending, approved, rejected)
+#
+# Order members are "{uid}:{provider}:{id}" (as in the expiry ZSET). Records
+# can still disappear without their index entry (TTL backstop), so readers drop
+# members whose record is gone, and top-up indexes are trimmed to the record
+# TTL on every write.
+
+ORDER_STATUSES = ("active", "code", "repeat")
+TOPUP_STATUSES = ("pending", "approved", "rejected")
+TOPUP_TTL = {"pending": 86400, "approved": 3600, "rejected": 3600}
+
+ORDERS_ALL = "orders:idx:all"
+
+
+def orders_by_provider(provider: str) -> str:
+    return f"orders:idx:provider:{provider}"
+
+
+def orders_by_status(status: str) -> str:
+    return f"orders:idx:status:{status}"
+
+
+def topups_by_status(status: str) -> str:
+    return f"topups:idx:{status}"
+
+
+def topup_key(req_id: str) -> str:
+    return f"wallet:topup:{req_id}"
+
+
+def _str(raw: Any) -> str:
+    return raw.decode() if isinstance(raw, bytes) else str(raw)
+
+
+# ---------------- orders ----------------
+
+def index_order(pipe, member: str, provider: str, status: str, ts: float) -> None:
+    pipe.zadd(ORDERS_ALL, {member: ts})
+    pipe.zadd(orders_by_provider(provider), {member: ts})
+    pipe.zadd(orders_by_status(status), {member: ts})
+
+
+def move_order_status(pipe, member: str, old: Optional[str], new: str, ts: float) -> None:
+    if old == new:
+        return
+    if old:
+        pipe.zrem(orders_by_status(old), member)
+    pipe.zadd(orders_by_status(new), {member: ts})
+
+
+def unindex_order(pipe, member: str, provider: str) -> None:
+    pipe.zrem(ORDERS_ALL, member)
+    pipe.zrem(orders_by_provider(provider), member)
+    for status in ORDER_STATUSES:
+        pipe.zrem(orders_by_status(status), member)
+
+
+async def list_orders(
+    redis, provider: Optional[str] = None, status: Optional[str] = None, offset: int = 0, limit: int = 20
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """Newest active orders (optionally one provider and/or status): (total, page of records)."""
+    keys = [k for k in (provider and orders_by_provider(provider), status and orders_by_status(status)) if k]
+    if len(keys) == 2:
+        key = f"orders:idx:tmp:{provider}:{status}"
+        pipe = redis.pipeline(transaction=False)
+        pipe.zinterstore(key, keys, aggregate="MAX")
+        pipe.expire(key, 30)
+        await pipe.execute()
+    else:
+        key = keys[0] if keys else ORDERS_ALL
+    pipe = redis.pipeline(transaction=False)
+    pipe.zcard(key)
+    pipe.zrevrange(key, offset, offset + limit - 1)
+    total, members = await pipe.execute()
+    if not members:
+        return total, []
+    pipe = redis.pipeline(transaction=False)
+    parsed = []
+    for m in members:
+        uid, prov, order_id = _str(m).split(":", 2)
+        parsed.append((_str(m), uid, prov))
+        pipe.hget(f"active:{uid}", f"{prov}:{order_id}")
+    raws = await pipe.execute()
+    out: List[Dict[str, Any]] = []
+    stale = redis.pipeline(transaction=True)
+    n_stale = 0
+    for (member, uid, prov), raw in zip(parsed, raws):
+        if not raw:
+            unindex_order(stale, member, prov)
+            n_stale += 1
+            continue
+        try:
+            entry = codec.loads(raw)
+        except ValueError:
+            continue
+        entry["uid"] = int(uid)
+        out.append(entry)
+    if n_stale:
+        await stale.execute()
+    return total - n_stale, out
+
+
+# ---------------- top-ups ----------------
+
+def index_topup(pipe, req_id: str, status: str, ts: float) -> None:
+    key = topups_by_status(status)
+    pipe.zadd(key, {req_id: ts})
+    pipe.zremrangebyscore(key, "-inf", ts - TOPUP_TTL[status])
+
+
+async def create_topup(redis, req_id: str, payload: Dict[str, Any]) -> None:
+    now = time.time()
+    pipe = redis.pipeline(transaction=True)
+    pipe.set(topup_key(req_id), codec.dumps(payload), ex=TOPUP_TTL["pending"])
+    index_topup(pipe, req_id, "pending", now)
+    await pipe.execute()
+
+
+async def set_topup_status(
+    redis, req_id: str, status: str, expected: str = "pending"
+) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """Move a request from ``expected`` to ``status``: (payload or None if unknown, whether this call changed it).
+
+    The record is WATCHed, so of two admins approving the same request at once only one gets True.
+    """
+    key = topup_key(req_id)
+    async with redis.pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                await pipe.watch(key)
+                raw = await pipe.get(key)
+                if not raw:
+                    await pipe.unwatch()
+                    return None, False
+                payload = codec.loads(raw)
+                if payload.get("status") != expected:
+                    await pipe.unwatch()
+                    return payload, False
+                payload["status"] = status
+                pipe.multi()
+                pipe.set(key, codec.dumps(payload), ex=TOPUP_TTL[status])
+                pipe.zrem(topups_by_status(expected), req_id)
+                index_topup(pipe, req_id, status, time.time())
+                await pipe.execute()
+                return payload, True
+            except WatchError:
+                continue
+
+
+async def list_topups(
+    redis, status: str = "pending", offset: int = 0, limit: int = 20
+) -> Tuple[int, List[Tuple[str, Dict[str, Any]]]]:
+    """Newest top-up requests in ``status``: (total, page of (request id, payload))."""
+    key = topups_by_status(status)
+    pipe = redis.pipeline(transaction=False)
+    pipe.zremrangebyscore(key, "-inf", time.time() - TOPUP_TTL[status])
+    pipe.zcard(key)
+    pipe.zrevrange(key, offset, offset + limit - 1)
+    _, total, ids = await pipe.execute()
+    if not ids:
+        return total, []
+    ids = [_str(i) for i in ids]
+    raws = await redis.mget([topup_key(i) for i in ids])
+    out = []
+    for req_id, raw in zip(ids, raws):
+        if raw:
+            out.append((req_id, codec.loads(raw)))
+    return total, out
+
+
+async def pending_topup_ids(redis, batch: int = 100) -> List[str]:
+    """Every pending request id, oldest first, read in pages of ``batch``."""
+    key = topups_by_status("pending")
+    out: List[str] = []
+    offset = 0
+    while True:
+        page = await redis.zrange(key, offset, offset + batch - 1)
+        out.extend(_str(i) for i in page)
+        if len(page) < batch:
+            return out
+        offset += batch
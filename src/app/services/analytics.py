@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from redis.exceptions import WatchError
+
+# Sales rollups, written incrementally by the "analytics" order event consumer.
+#
+# Every purchase and settlement updates one hash per (granularity, bucket,
+# dimension value) plus a HyperLogLog of buyers next to it:
+#
+#   stats:{g}:{bucket}:{dim}:{value}          orders, filled, unfilled, revenue, cost
+#   stats:{g}:{bucket}:{dim}:{value}:buyers   HLL of user ids
+#   stats:{g}:{bucket}:{dim}                  ZSET value -> orders (what sells most in the bucket)
+#
+# g is m/h/d (minute, hour, day buckets, each kept for its own retention), dim
+# is all (value "*"), provider, service, country or operator; service, country
+# and operator values are prefixed with the provider since their ids are
+# provider-specific. Revenue and cost (margin is their difference) are booked
+# when an order is filled (code received or completed), against the bucket it
+# was bought in, so filled / orders is the fill rate of that bucket. A report
+# over N buckets reads N hashes and one PFCOUNT per row, never the order history.
+#
+# The per-order facts hash doubles as the "already counted" marker: it is
+# WATCHed, and the marker (ts, then settled) is written in the same MULTI as
+# the counters, so an event is counted exactly once even if the consumer
+# retries it after a failed write.
+
+GRANULARITY: Dict[str, Tuple[int, int]] = {  # name -> (bucket seconds, retention seconds)
+    "m": (60, 2 * 86400),
+    "h": (3600, 40 * 86400),
+    "d": (86400, 400 * 86400),
+}
+DIMENSIONS = ("provider", "service", "country", "operator")
+FIELDS = ("orders", "filled", "unfilled", "revenue", "cost")
+ORDER_TTL = 3 * 86400  # purchase facts kept until the order is settled
+
+
+def bucket(gran: str, ts: float) -> int:
+    size = GRANULARITY[gran][0]
+    return int(ts) - int(ts) % size
+
+
+def rollup_key(gran: str, b: int, dim: str, value: str) -> str:
+    return f"stats:{gran}:{b}:{dim}:{value}"
+
+
+def board_key(gran: str, b: int, dim: str) -> str:
+    return f"stats:{gran}:{b}:{dim}"
+
+
+def _order_key(order_key: str) -> str:
+    return f"stats:order:{order_key}"
+
+
+def _str(raw: Any) -> str:
+    return raw.decode() if isinstance(raw, bytes) else str(raw)
+
+
+def dimension_values(provider: str, service: Any, country: Any, operator: Any) -> Dict[str, str]:
+    return {
+        "provider": provider,
+        "service": f"{provider}/{service}",
+        "country": f"{provider}/{country}",
+        "operator": f"{provider}/{country}/{operator}",
+    }
+
+
+def purchase_target(order: Dict[str, str]) -> Tuple[str, str, str, str]:
+    """(provider, service, country, operator) back from the dimension values of recorded purchase facts."""
+    provider, service = order["d:service"].split("/", 1)
+    country, operator = order["d:operator"].split("/", 1)[1].rsplit("/", 1)
+    return provider, service, country, operator
+
+
+# keys of the current bucket of each granularity whose TTL this process already
+# set: a rollup key needs one EXPIRE, not one per purchase
+_ttl_set: Dict[str, Tuple[int, Set[str]]] = {}
+
+
+def _needs_ttl(gran: str, b: int, key: str) -> bool:
+    cur = _ttl_set.get(gran)
+    return cur is None or cur[0] != b or key not in cur[1]
+
+
+def _ttl_done(gran: str, b: int, key: str) -> None:
+    """Mark ``key`` as having its TTL, once the EXPIRE was actually executed."""
+    cur = _ttl_set.get(gran)
+    if cur is None or cur[0] < b:
+        cur = _ttl_set[gran] = (b, set())
+    if cur[0] == b:
+        cur[1].add(key)
+
+
+def _targets(ts: float, dims: Dict[str, str]):
+    for gran, (_, ttl) in GRANULARITY.items():
+        b = bucket(gran, ts)
+        yield gran, b, ttl, "all", "*"
+        for dim, value in dims.items():
+            yield gran, b, ttl, dim, value
+
+
+async def record_purchase(
+    redis, order_key: str, uid: int, ts: float, dims: Dict[str, str], price: int, cost: int
+) -> bool:
+    """Count a purchase once (False if ``order_key`` was already recorded)."""
+    facts = _order_key(order_key)
+    async with redis.pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                await pipe.watch(facts)
+                if await pipe.hexists(facts, "ts"):
+                    await pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.hset(facts, mapping={
+                    "ts": int(ts), "price": price, "cost": cost, **{f"d:{k}": v for k, v in dims.items()},
+                })
+                pipe.expire(facts, ORDER_TTL)
+                expiring = []
+                for gran, b, ttl, dim, value in _targets(ts, dims):
+                    key = rollup_key(gran, b, dim, value)
+                    pipe.hincrby(key, "orders", 1)
+                    pipe.pfadd(f"{key}:buyers", uid)
+                    if dim != "all":
+                        pipe.zincrby(board_key(gran, b, dim), 1, value)
+                    if _needs_ttl(gran, b, key):
+                        pipe.expire(key, ttl)
+                        pipe.expire(f"{key}:buyers", ttl)
+                        if dim != "all":
+                            pipe.expire(board_key(gran, b, dim), ttl)
+                        expiring.append((gran, b, key))
+                await pipe.execute()
+            except WatchError:
+                continue
+            for gran, b, key in expiring:
+                _ttl_done(gran, b, key)
+            return True
+
+
+async def record_settlement(redis, order_key: str, filled: bool) -> Optional[Dict[str, str]]:
+    """Book the outcome of a recorded purchase once.
+
+    Returns the purchase facts (ts, price, cost, d:<dimension>) the first time,
+    None if the order is unknown or was already settled.
+    """
+    facts = _order_key(order_key)
+    async with redis.pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                await pipe.watch(facts)
+                raw = await pipe.hgetall(facts)
+                order = {_str(k): _str(v) for k, v in raw.items()}
+                if not order or "settled" in order:
+                    await pipe.unwatch()
+                    return None
+                ts = int(order["ts"])
+                dims = {k[2:]: v for k, v in order.items() if k.startswith("d:")}
+                price, cost = int(order.get("price", 0)), int(order.get("cost", 0))
+                pipe.multi()
+                pipe.hset(facts, "settled", 1 if filled else 0)
+                for gran, b, _, dim, value in _targets(ts, dims):
+                    key = rollup_key(gran, b, dim, value)
+                    if filled:
+                        pipe.hincrby(key, "filled", 1)
+                        pipe.hincrby(key, "revenue", price)
+                        pipe.hincrby(key, "cost", cost)
+                    else:
+                        pipe.hincrby(key, "unfilled", 1)
+                await pipe.execute()
+                return order
+            except WatchError:
+                continue
+
+
+@dataclass
+class ReportRow:
+    value: str
+    orders: int = 0
+    filled: int = 0
+    unfilled: int = 0
+    revenue: int = 0
+    cost: int = 0
+    buyers: int = 0
+
+    @property
+    def margin(self) -> int:
+        return self.revenue - self.cost
+
+    @property
+    def fill_rate(self) -> float:
+        return self.filled / self.orders if self.orders else 0.0
+
+
+async def report(
+    redis, gran: str = "d", buckets: int = 7, dim: Optional[str] = None, top: int = 10, now: Optional[float] = None
+) -> List[ReportRow]:
+    """Totals over the last ``buckets`` buckets of ``gran``: one row, or the ``top`` values of ``dim`` by orders."""
+    size = GRANULARITY[gran][0]
+    last = bucket(gran, time.time() if now is None else now)
+    bs = [last - i * size for i in range(buckets)]
+    if dim is None:
+        values = ["*"]
+        dim = "all"
+    else:
+        ranked = await redis.zunion([board_key(gran, b, dim) for b in bs], withscores=True)
+        ranked.sort(key=lambda kv: -kv[1])
+        values = [_str(v) for v, _ in ranked[:top]]
+        if not values:
+            return []
+    pipe = redis.pipeline(transaction=False)
+    for value in values:
+        keys = [rollup_key(gran, b, dim, value) for b in bs]
+        for key in keys:
+            pipe.hmget(key, FIELDS)
+        pipe.pfcount(*[f"{k}:buyers" for k in keys])
+    res = await pipe.execute()
+    rows = []
+    step = buckets + 1
+    for i, value in enumerate(values):
+        row = ReportRow(value)
+        for counts in res[i * step:i * step + buckets]:
+            for name, n in zip(FIELDS, counts):
+                if n is not None:
+                    setattr(row, name, getattr(row, name) + int(n))
+        row.buyers = int(res[i * step + buckets])
+        rows.append(row)
+    return rows
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import gzip
+import os
+import threading
+import time
+from collections import deque
+from typing import IO, Any, Deque, Dict, List, Optional, Tuple
+
+import httpx
+from loguru import logger
+
+from ..config import settings
+from ..utils import codec
+
+# Record/replay of provider HTTP traffic at the httpx transport level.
+#
+# HTTP_CASSETTE_MODE=record wraps the real transport and appends every
+# request/response pair to HTTP_CASSETTE_DIR/<provider>.jsonl (.jsonl.gz with
+# HTTP_CASSETTE_GZIP). API keys never reach the file and wall-clock data
+# (Date headers, cookies, absolute times) is dropped; only the elapsed time of
+# each exchange is kept. HTTP_CASSETTE_MODE=replay serves the recorded answers
+# back, sleeping elapsed / HTTP_CASSETTE_SPEED (0 = no delay).
+#
+# One line per exchange:
+#   {"m":"GET","path":"/v2.php","q":[["method","getinfo"]],"s":200,
+#    "ct":"application/json","ms":183.2,"body":"..."}   ("b64" for non-UTF-8 bodies)
+
+SECRET_PARAMS = frozenset({"apikey", "api_key", "key", "token"})
+# header kept besides the status line; the rest is either per-connection or wall-clock
+KEPT_HEADERS = ("content-type",)
+
+
+class CassetteMiss(httpx.TransportError):
+    """Replay found no recorded exchange for the request (handled like a network error)."""
+
+
+def _query(url: httpx.URL) -> List[List[str]]:
+    return sorted([k, v] for k, v in url.params.multi_items() if k.lower() not in SECRET_PARAMS)
+
+
+def _keys(method: str, path: str, query: List[List[str]]) -> Tuple[str, str]:
+    """(exact, loose) match keys; loose keeps only the endpoint selector (Numberland's ``method``)."""
+    exact = f"{method} {path}?" + "&".join(f"{k}={v}" for k, v in query)
+    loose = f"{method} {path}?" + "&".join(f"{k}={v}" for k, v in query if k == "method")
+    return exact, loose
+
+
+def cassette_path(provider: str, directory: Optional[str] = None, gz: Optional[bool] = None) -> str:
+    gz = settings.HTTP_CASSETTE_GZIP if gz is None else gz
+    return os.path.join(directory or settings.HTTP_CASSETTE_DIR, f"{provider}.jsonl" + (".gz" if gz else ""))
+
+
+def _open(path: str, mode: str) -> IO[bytes]:
+    return gzip.open(path, mode) if path.endswith(".gz") else open(path, mode)  # type: ignore[return-value]
+
+
+class Interaction:
+    __slots__ = ("method", "path", "query", "status", "content_type", "elapsed_ms", "content")
+
+    def __init__(self, method: str, path: str, query: List[List[str]], status: int,
+                 content_type: str, elapsed_ms: float, content: bytes) -> None:
+        self.method = method
+        self.path = path
+        self.query = query
+        self.status = status
+        self.content_type = content_type
+        self.elapsed_ms = elapsed_ms
+        self.content = content
+
+    def to_json(self) -> Dict[str, Any]:
+        d: Dict[str, Any] = {"m": self.method, "path": self.path, "q": self.query, "s": self.status,
+                             "ct": self.content_type, "ms": round(self.elapsed_ms, 1)}
+        try:
+            d["body"] = self.content.decode()
+        except UnicodeDecodeError:
+            d["b64"] = base64.b64encode(self.content).decode()
+        return d
+
+    @classmethod
+    def from_json(cls, d: Dict[str, Any]) -> "Interaction":
+        content = d["body"].encode() if "body" in d else base64.b64decode(d.get("b64", ""))
+        return cls(d["m"], d["path"], d.get("q") or [], int(d["s"]), d.get("ct", ""), float(d.get("ms", 0)), content)
+
+    def response(self, request: httpx.Request) -> httpx.Response:
+        headers = {"content-type": self.content_type} if self.content_type else {}
+        return httpx.Response(self.status, headers=headers, content=self.content, request=request)
+
+
+class CassetteWriter:
+    """Append-only cassette file shared by all clients of one provider."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._fh = _open(path, "ab")
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def write(self, item: Interaction) -> None:
+        line = codec.dumps(item.to_json()) + b"\n"
+        with self._lock:
+            self._fh.write(line)
+            self._fh.flush()
+            self.count += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._fh.close()
+
+
+class Cassette:
+    """Recorded exchanges indexed for replay. Each key cycles through its answers
+    in recording order, so a short cassette can drive a long benchmark."""
+
+    def __init__(self, items: List[Interaction]) -> None:
+        self.items = items
+        self._exact: Dict[str, Deque[Interaction]] = {}
+        self._loose: Dict[str, Deque[Interaction]] = {}
+        for it in items:
+            exact, loose = _keys(it.method, it.path, it.query)
+            self._exact.setdefault(exact, deque()).append(it)
+            self._loose.setdefault(loose, deque()).append(it)
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        items: List[Interaction] = []
+        with _open(path, "rb") as fh:
+            for line in fh:
+                if line.strip():
+                    items.append(Interaction.from_json(codec.loads(line)))
+        return cls(items)
+
+    def match(self, request: httpx.Request) -> Optional[Interaction]:
+        exact, loose = _keys(request.method, request.url.path, _query(request.url))
+        q = self._exact.get(exact) or self._loose.get(loose)
+        if not q:
+            return None
+        it = q[0]
+        q.rotate(-1)
+        return it
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, writer: CassetteWriter, inner: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        self.writer = writer
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        try:
+            content = await response.aread()
+        finally:
+            await response.aclose()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        ctype = response.headers.get("content-type", "")
+        self.writer.write(Interaction(request.method, request.url.path, _query(request.url),
+                                      response.status_code, ctype, elapsed_ms, content))
+        # aread() already decoded any content-encoding; hand back a plain response
+        headers = {k: v for k, v in response.headers.items() if k.lower() in KEPT_HEADERS}
+        return httpx.Response(response.status_code, headers=headers, content=content,
+                              request=request, extensions=response.extensions)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, cassette: Cassette, speed: float = 1.0) -> None:
+        self.cassette = cassette
+        self.speed = speed
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        it = self.cassette.match(request)
+        if it is None:
+            raise CassetteMiss(f"no recorded exchange for {request.method} {request.url.path}", request=request)
+        if self.speed > 0 and it.elapsed_ms > 0:
+            await asyncio.sleep(it.elapsed_ms / 1000 / self.speed)
+        return it.response(request)
+
+
+_WRITERS: Dict[str, CassetteWriter] = {}
+_CASSETTES: Dict[str, Cassette] = {}
+
+
+def transport_for(provider: str) -> Optional[httpx.AsyncBaseTransport]:
+    """Transport for a provider's httpx client according to HTTP_CASSETTE_MODE (None = real network)."""
+    mode = (settings.HTTP_CASSETTE_MODE or "").strip().lower()
+    if not mode:
+        return None
+    path = cassette_path(provider)
+    if mode == "record":
+        writer = _WRITERS.get(path)
+        if writer is None:
+            writer = _WRITERS[path] = CassetteWriter(path)
+            logger.info("Recording {} HTTP traffic to {}", provider, path)
+        return RecordingTransport(writer)
+    if mode == "replay":
+        cassette = _CASSETTES.get(path)
+        if cassette is None:
+            cassette = _CASSETTES[path] = Cassette.load(path)
+            logger.info("Replaying {} HTTP traffic from {} ({} exchanges)", provider, path, len(cassette.items))
+        return ReplayTransport(cassette, settings.HTTP_CASSETTE_SPEED)
+    raise ValueError(f"HTTP_CASSETTE_MODE must be record, replay or empty, got {mode!r}")
+
+
+def close_writers() -> None:
+    for writer in _WRITERS.values():
+        writer.close()
+    _WRITERS.clear()
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+import mmap
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from ..config import settings
+from ..utils import codec
+from ..utils.metrics import cache_hit
+from .perm_numbers import PermCatalog, PermNumberCache, perm_numbers
+from .price_sheet import PriceSheet, PriceSheetCache, price_sheets
+
+SNAPSHOT_VERSION = 1
+
+
+@dataclass
+class Catalog:
+    provider: str
+    fetched_at: int
+    services: List[Dict[str, Any]] = field(default_factory=list)
+    countries: List[Dict[str, Any]] = field(default_factory=list)
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class CatalogCache:
+    """Per-provider service and country lists served from memory.
+
+    Menus never wait on the provider once a catalog is known: stale entries are
+    returned as-is and refreshed in the background, and a failed refresh keeps
+    the previous lists. Only a provider with no catalog at all (cold, no
+    snapshot) is fetched inline.
+    """
+
+    def __init__(self) -> None:
+        self._catalogs: Dict[str, Catalog] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def get(self, provider: str) -> Optional[Catalog]:
+        return self._catalogs.get(provider)
+
+    def put(self, catalog: Catalog) -> None:
+        self._catalogs[catalog.provider] = catalog
+
+    def all(self) -> List[Catalog]:
+        return list(self._catalogs.values())
+
+    async def services(self, provider: str) -> List[Dict[str, Any]]:
+        return (await self._catalog(provider, "services")).services
+
+    async def countries(self, provider: str) -> List[Dict[str, Any]]:
+        return (await self._catalog(provider, "countries")).countries
+
+    async def _catalog(self, provider: str, kind: str) -> Catalog:
+        cat = self._catalogs.get(provider)
+        cache_hit("catalog", cat is not None and bool(getattr(cat, kind)))
+        if cat is None or not getattr(cat, kind):
+            return await self.refresh(provider)
+        if cat.age() > settings.CATALOG_REFRESH_SECONDS:
+            self._refresh_soon(provider)
+        return cat
+
+    def _refresh_soon(self, provider: str) -> None:
+        task = self._refreshing.get(provider)
+        if task is None or task.done():
+            self._refreshing[provider] = asyncio.create_task(self._refresh_quietly(provider))
+
+    async def _refresh_quietly(self, provider: str) -> None:
+        try:
+            await self.refresh(provider)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Catalog refresh for {} failed: {}", provider, e)
+
+    async def refresh(self, provider: str) -> Catalog:
+        """Download services and countries; keeps the previous list for any call that fails."""
+        from ..providers.registry import get_provider
+
+        prov = get_provider(provider)
+        services, countries = await asyncio.gather(prov.get_services(), prov.get_countries(), return_exceptions=True)
+        old = self._catalogs.get(provider)
+        if old is None and isinstance(services, BaseException):
+            raise services
+        if old is None and isinstance(countries, BaseException):
+            raise countries
+        cat = Catalog(
+            provider=provider,
+            fetched_at=int(time.time()),
+            services=services if isinstance(services, list) and services else (old.services if old else []),
+            countries=countries if isinstance(countries, list) and countries else (old.countries if old else []),
+        )
+        if old is not None and cat.services is old.services and cat.countries is old.countries:
+            # nothing new: keep the old timestamp so the entry stays marked stale
+            cat.fetched_at = old.fetched_at
+        self._catalogs[provider] = cat
+        return cat
+
+    def start(self, providers: List[str]) -> None:
+        """Prefetch every provider now, then refresh and snapshot every CATALOG_REFRESH_SECONDS."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(providers))
+
+    async def stop(self) -> None:
+        tasks = [t for t in [self._task, *self._refreshing.values()] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._refreshing.clear()
+
+    async def _loop(self, providers: List[str]) -> None:
+        while True:
+            for key in providers:
+                await self._refresh_quietly(key)
+            if settings.SNAPSHOT_PATH:
+                try:
+                    await asyncio.to_thread(write_snapshot, snapshot_doc(self), settings.SNAPSHOT_PATH)
+                except OSError as e:
+                    logger.warning("Snapshot write failed: {}", e)
+            await asyncio.sleep(settings.CATALOG_REFRESH_SECONDS)
+
+
+catalogs = CatalogCache()
+
+
+# ---------------------- snapshot file ----------------------
+# One compact JSON document with the catalogs, price sheets (tariff rows
+# included) and permanent number lists of every provider, rewritten atomically
+# after each refresh round and loaded at boot so the first users after a
+# restart get menus and "from X" labels without waiting for (or even reaching)
+# the providers.
+
+def snapshot_doc(
+    cache: CatalogCache = catalogs, sheets: PriceSheetCache = price_sheets, perms: PermNumberCache = perm_numbers
+) -> Dict[str, Any]:
+    return {
+        "v": SNAPSHOT_VERSION,
+        "saved_at": int(time.time()),
+        "catalogs": {
+            c.provider: {"fetched_at": c.fetched_at, "services": c.services, "countries": c.countries}
+            for c in cache.all()
+        },
+        "sheets": {
+            s.provider: {"built_at": s.built_at, "rows": s.rows} for s in sheets.all()
+        },
+        "perm": {
+            p.provider: {"fetched_at": p.fetched_at, "rows": [n.as_row() for n in p.numbers]} for p in perms.all()
+        },
+    }
+
+
+def write_snapshot(doc: Dict[str, Any], path: str) -> int:
+    data = codec.dumps(doc)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return len(data)
+
+
+def save_snapshot(path: Optional[str] = None) -> int:
+    return write_snapshot(snapshot_doc(), path or settings.SNAPSHOT_PATH)
+
+
+def _read(path: str) -> Optional[Dict[str, Any]]:
+    size = os.path.getsize(path)
+    if size == 0:
+        return None
+    with open(path, "rb") as f:
+        if size < settings.SNAPSHOT_MMAP_BYTES:
+            return codec.loads(f.read())
+        # large snapshots: parse straight from the page cache instead of copying into a bytes object
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            return codec.loads(view)
+
+
+def load_snapshot(
+    path: Optional[str] = None,
+    cache: CatalogCache = catalogs,
+    sheets: PriceSheetCache = price_sheets,
+    perms: PermNumberCache = perm_numbers,
+) -> bool:
+    """Seed the catalog, price sheet and permanent number caches from the snapshot file; False if there is none."""
+    path = path or settings.SNAPSHOT_PATH
+    if not path or not os.path.exists(path):
+        return False
+    started = time.perf_counter()
+    try:
+        doc = _read(path)
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable snapshot {}: {}", path, e)
+        return False
+    if not doc or doc.get("v") != SNAPSHOT_VERSION:
+        logger.warning("Ignoring snapshot {}: unknown format", path)
+        return False
+    for provider, c in (doc.get("catalogs") or {}).items():
+        cache.put(Catalog(provider, int(c.get("fetched_at", 0)), c.get("services") or [], c.get("countries") or []))
+    for provider, s in (doc.get("sheets") or {}).items():
+        rows = [tuple(r) for r in s.get("rows") or []]
+        sheets.put(PriceSheet(provider=provider, built_at=int(s.get("built_at", 0)), rows=rows))  # type: ignore[arg-type]
+    for provider, p in (doc.get("perm") or {}).items():
+        perms.put(PermCatalog.build(provider, p.get("rows") or [], int(p.get("fetched_at", 0))))
+    logger.info(
+        "Snapshot {} loaded in {:.1f} ms (age {}s): {} catalogs, {} price sheets, {} permanent number lists",
+        path,
+        (time.perf_counter() - started) * 1000,
+        int(time.time()) - int(doc.get("saved_at", 0)),
+        len(doc.get("catalogs") or {}),
+        len(doc.get("sheets") or {}),
+        len(doc.get("perm") or {}),
+    )
+    return True
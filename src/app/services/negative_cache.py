@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set, Tuple
+
+from loguru import logger
+
+from ..config import settings
+from ..utils.metrics import cache_hit
+
+# Short-lived memory of "not active" answers (NEGATIVE_RESULT_MAP -210 service,
+# -211 operator, -212 country) so the next user does not repeat a purchase or
+# quote that is known to fail, and the keyboards stop offering it.
+#
+# One ZSET per provider holds the blocked entries scored by their expiry:
+#
+#   neg:{provider}   "s:{service}" | "c:{service}:{country}" | "o:{service}:{country}:{operator}"
+#
+# (country and operator blocks are scoped to the service they were seen with).
+# Entries last NEGATIVE_CACHE_SECONDS (NEGATIVE_CACHE_OPERATOR_SECONDS for
+# operators, which come back sooner); each write trims the expired ones. The
+# live set of a provider is read with one ZRANGEBYSCORE and kept in memory for
+# LOCAL_SECONDS since every menu render consults it.
+
+SCOPES: Dict[int, str] = {-210: "service", -211: "operator", -212: "country"}
+LOCAL_SECONDS = 5.0
+
+
+def _key(provider: str) -> str:
+    return f"neg:{provider}"
+
+
+def _str(raw: Any) -> str:
+    return raw.decode() if isinstance(raw, bytes) else str(raw)
+
+
+@dataclass
+class Blocked:
+    """Live negative entries of one provider."""
+
+    members: Set[str] = field(default_factory=set)
+
+    def service(self, service: Any) -> bool:
+        return f"s:{service}" in self.members
+
+    def country(self, service: Any, country: Any) -> bool:
+        return self.service(service) or f"c:{service}:{country}" in self.members
+
+    def operator(self, service: Any, country: Any, operator: Any) -> bool:
+        return self.country(service, country) or f"o:{service}:{country}:{operator}" in self.members
+
+    def services(self) -> Set[str]:
+        return {m[2:] for m in self.members if m.startswith("s:")}
+
+    def countries(self, service: Any) -> Set[str]:
+        prefix = f"c:{service}:"
+        return {m[len(prefix):] for m in self.members if m.startswith(prefix)}
+
+    def operators(self, service: Any, country: Any) -> Set[str]:
+        prefix = f"o:{service}:{country}:"
+        return {m[len(prefix):] for m in self.members if m.startswith(prefix)}
+
+
+def _member(code: int, service: Any, country: Any, operator: Any) -> Optional[Tuple[str, float]]:
+    scope = SCOPES.get(code)
+    if scope == "service":
+        return f"s:{service}", settings.NEGATIVE_CACHE_SECONDS
+    if scope == "country":
+        return f"c:{service}:{country}", settings.NEGATIVE_CACHE_SECONDS
+    if scope == "operator" and str(operator) not in ("any", "min", ""):
+        return f"o:{service}:{country}:{operator}", settings.NEGATIVE_CACHE_OPERATOR_SECONDS
+    return None
+
+
+class NegativeCache:
+    def __init__(self) -> None:
+        self._local: Dict[str, Tuple[float, Blocked]] = {}
+
+    async def record(self, redis, provider: str, code: Any, service: Any, country: Any, operator: Any = "") -> bool:
+        """Remember a "not active" result (False if ``code`` is not one, or the cache is off)."""
+        try:
+            code = int(code)
+        except (TypeError, ValueError):
+            return False
+        entry = _member(code, service, country, operator)
+        if entry is None or entry[1] <= 0:
+            return False
+        member, ttl = entry
+        now = time.time()
+        hit = self._local.get(provider)
+        if hit is not None:
+            hit[1].members.add(member)
+        if redis:
+            try:
+                pipe = redis.pipeline(transaction=False)
+                pipe.zadd(_key(provider), {member: now + ttl})
+                pipe.zremrangebyscore(_key(provider), "-inf", now)
+                pipe.expire(_key(provider), int(max(settings.NEGATIVE_CACHE_SECONDS, ttl)) + 60)
+                await pipe.execute()
+            except Exception as e:
+                logger.warning("Negative cache write failed: {}", e)
+        logger.info("Negative cache: {} {} for {}s", provider, member, ttl)
+        return True
+
+    async def blocked(self, redis, provider: str) -> Blocked:
+        now = time.monotonic()
+        hit = self._local.get(provider)
+        cache_hit("negative_cache", hit is not None and hit[0] > now)
+        if hit is not None and hit[0] > now:
+            return hit[1]
+        out = Blocked()
+        if redis:
+            try:
+                raw = await redis.zrangebyscore(_key(provider), time.time(), "+inf")
+                out = Blocked({_str(m) for m in raw})
+            except Exception as e:
+                logger.warning("Negative cache read failed: {}", e)
+                if hit is not None:
+                    return hit[1]
+        self._local[provider] = (now + LOCAL_SECONDS, out)
+        return out
+
+
+negative_cache = NegativeCache()
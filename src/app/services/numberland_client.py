@@ -1,12 +1,17 @@
 from __future__ import annotations
 
 import asyncio
+import time
 from typing import Any, Dict, Optional, Union
 
 import httpx
 from loguru import logger
 
 from ..config import settings
+from ..utils import codec
+from ..utils.metrics import PROVIDER_HTTP_LATENCY, PROVIDER_HTTP_RETRIES
+from ..utils.tracing import span
+from .cassettes import transport_for
 
 
 BASE_URL = "https://api.numberland.ir/v2.php"
@@ -55,14 +60,14 @@ class NumberlandClient:
     def __init__(
         self,
         api_key: Optional[str] = None,
-        base_url: str = BASE_URL,
+        base_url: Optional[str] = None,
         timeout: float = 15.0,
         max_retries: int = 2,
         backoff_factor: float = 0.6,
         http2: bool = False,
     ) -> None:
         self.api_key = api_key or settings.NUMBERLAND_API_KEY
-        self.base_url = base_url
+        self.base_url = base_url or settings.NUMBERLAND_BASE_URL or BASE_URL
         self.timeout = timeout
         self.max_retries = max_retries
         self.backoff_factor = backoff_factor
@@ -82,6 +87,7 @@ class NumberlandClient:
                 timeout=self.timeout,
                 http2=self.http2,
                 headers={"User-Agent": "ViranumBot/1.0"},
+                transport=transport_for("numberland"),
             )
 
     async def aclose(self) -> None:
@@ -103,12 +109,21 @@ class NumberlandClient:
         assert self._client is not None
 
         last_exc: Optional[Exception] = None
+        http_hist = PROVIDER_HTTP_LATENCY.labels("numberland", method_name)
         for attempt in range(self.max_retries + 1):
             try:
-                r = await self._client.get(self.base_url, params=q)
+                started = time.perf_counter()
+                try:
+                    with span("http", endpoint=method_name, attempt=attempt) as s:
+                        r = await self._client.get(self.base_url, params=q)
+                        if s is not None:
+                            s.attrs["status"] = r.status_code
+                finally:
+                    http_hist.observe(time.perf_counter() - started)
                 if r.status_code >= 400:
                     # 5xx -> retry, 4xx -> fail fast
                     if 500 <= r.status_code < 600 and attempt < self.max_retries:
+                        PROVIDER_HTTP_RETRIES.labels("numberland", method_name, "http_5xx").inc()
                         delay = self.backoff_factor * (2**attempt)
                         logger.warning(
                             "HTTP {} for method {}, retrying in {}s (attempt {}/{})",
@@ -122,7 +137,7 @@ class NumberlandClient:
                         continue
                     raise NumberlandHTTPError(r.status_code, r.text)
 
-                data = r.json()
+                data = codec.loads(r.content)
                 # Some endpoints return list directly (e.g., getcountry, getservice)
                 if isinstance(data, list):
                     return data
@@ -151,6 +166,7 @@ class NumberlandClient:
             except httpx.RequestError as e:
                 last_exc = e
                 if attempt < self.max_retries:
+                    PROVIDER_HTTP_RETRIES.labels("numberland", method_name, "network").inc()
                     delay = self.backoff_factor * (2**attempt)
                     logger.warning(
                         "Network error for method {}: {}. Retrying in {}s (attempt {}/{})",
@@ -166,6 +182,7 @@ class NumberlandClient:
             except ValueError as e:  # JSON decode error
                 last_exc = e
                 if attempt < self.max_retries:
+                    PROVIDER_HTTP_RETRIES.labels("numberland", method_name, "bad_json").inc()
                     delay = self.backoff_factor * (2**attempt)
                     logger.warning(
                         "JSON decode error for method {}: {}. Retrying in {}s (attempt {}/{})",
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+from ..config import settings
+from ..utils.metrics import cache_hit
+from .negative_cache import negative_cache
+from .redis_client import get_redis_client
+
+# Quotes of every operator of one provider/service/country, fetched with a
+# single bulk provider call (Provider.operator_quotes; Numberland's getinfo
+# without an operator) when the user picks a country. The operator menu shows
+# price and stock from them and the quote step reads the picked operator's row
+# from the same entry, so choosing an operator needs no provider call, and
+# operators without numbers are never tried.
+#
+# Entries are kept in memory for OPERATOR_QUOTES_CACHE_SECONDS; concurrent
+# misses of the same key share one provider call. Providers without operator
+# granularity return no rows, and callers fall back to Provider.quote.
+
+Quote = Dict[str, Any]  # amount, count, repeat, time
+
+
+class OperatorQuotes:
+    def __init__(self) -> None:
+        self._cache: Dict[Tuple[str, str, str], Tuple[float, Dict[str, Quote]]] = {}
+        self._inflight: Dict[Tuple[str, str, str], asyncio.Future] = {}
+
+    async def get(self, provider: str, service: Any, country: Any) -> Dict[str, Quote]:
+        """Operator -> quote for this provider/service/country (empty if the provider has no bulk quotes)."""
+        ck = (provider, str(service), str(country))
+        now = time.monotonic()
+        hit = self._cache.get(ck)
+        cache_hit("operator_quotes", hit is not None and hit[0] > now)
+        if hit is not None and hit[0] > now:
+            return hit[1]
+        return await self._load(ck)
+
+    def fresh(self, provider: str, service: Any, country: Any) -> bool:
+        """Whether ``get`` would be answered without a new provider call (cached or already in flight)."""
+        ck = (provider, str(service), str(country))
+        hit = self._cache.get(ck)
+        return (hit is not None and hit[0] > time.monotonic()) or ck in self._inflight
+
+    async def warm(self, provider: str, service: Any, country: Any) -> bool:
+        """Fetch into the cache unless fresh (no hit/miss accounting); True if this call fetched."""
+        if self.fresh(provider, service, country):
+            return False
+        await self._load((provider, str(service), str(country)))
+        return True
+
+    async def _load(self, ck: Tuple[str, str, str]) -> Dict[str, Quote]:
+        fut = self._inflight.get(ck)
+        if fut is None:
+            fut = self._inflight[ck] = asyncio.ensure_future(self._fetch(ck))
+            fut.add_done_callback(lambda _: self._inflight.pop(ck, None))
+        # shielded: a caller giving up (or a cancelled prefetch) does not cancel the call others wait on
+        return await asyncio.shield(fut)
+
+    async def _fetch(self, ck: Tuple[str, str, str]) -> Dict[str, Quote]:
+        from ..providers.registry import get_provider
+
+        provider, service, country = ck
+        try:
+            rows = await get_provider(provider).operator_quotes(service=service, country=country)
+        except Exception as e:
+            logger.warning("Operator quotes {}:{}:{} unavailable: {}", provider, service, country, e)
+            await negative_cache.record(get_redis_client(), provider, getattr(e, "code", None), service, country)
+            return {}
+        quotes: Dict[str, Quote] = {}
+        for r in rows:
+            quotes[str(r["operator"])] = {
+                "amount": int(r.get("amount", 0)),
+                "count": int(r.get("count", 0)),
+                "repeat": str(r.get("repeat", "0")),
+                "time": str(r.get("time", "00:20:00")),
+            }
+        now = time.monotonic()
+        self._cache[ck] = (now + settings.OPERATOR_QUOTES_CACHE_SECONDS, quotes)
+        if len(self._cache) > 5000:
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+        return quotes
+
+    def invalidate(self, provider: str, service: Any, country: Any) -> None:
+        self._cache.pop((provider, str(service), str(country)), None)
+
+
+def in_stock(quote: Optional[Quote]) -> bool:
+    return bool(quote) and int(quote.get("amount", 0)) > 0 and int(quote.get("count", 0)) > 0
+
+
+def cheapest(quotes: Dict[str, Quote]) -> Optional[str]:
+    """Operator with the lowest price among those with numbers."""
+    stocked = [(q["amount"], op) for op, q in quotes.items() if in_stock(q)]
+    return min(stocked)[1] if stocked else None
+
+
+operator_quotes = OperatorQuotes()
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..utils.metrics import cache_hit
+
+# Code-delivery statistics per provider / service / country / operator, used to
+# recommend an operator and to route "any" purchases to it.
+#
+# Outcomes (code received, or no code: expired, banned, canceled by the
+# provider) are HINCRBYs into hourly buckets
+#
+#   opstats:{provider}:{service}:{country}:{hour}   {op}:n, {op}:ok, {op}:ttc (seconds to code, successes only)
+#
+# kept for OPERATOR_STATS_WINDOW_HOURS. Reading weights every bucket by
+# 0.5 ** (age / OPERATOR_STATS_HALF_LIFE_HOURS), which gives exponentially
+# decayed counters with only atomic increments on the write side (no
+# read-modify-write across replicas). The combined view of a service/country is
+# cached in memory for OPERATOR_STATS_CACHE_SECONDS since the operator menu
+# reads it on every country pick.
+#
+# Success rates are smoothed towards the service/country average
+# (PRIOR_WEIGHT pseudo-samples), and an operator needs
+# OPERATOR_STATS_MIN_SAMPLES decayed samples before it can be recommended.
+
+OPERATORS = ("1", "2", "3", "4")
+PRIOR_WEIGHT = 5.0
+HOUR = 3600
+
+
+def _key(provider: str, service: Any, country: Any, hour: int) -> str:
+    return f"opstats:{provider}:{service}:{country}:{hour}"
+
+
+def _str(raw: Any) -> str:
+    return raw.decode() if isinstance(raw, bytes) else str(raw)
+
+
+@dataclass
+class OperatorStat:
+    operator: str
+    samples: float = 0.0  # decayed number of outcomes
+    successes: float = 0.0
+    ttc_sum: float = 0.0  # decayed seconds to code over successes
+    rate: float = 0.0  # smoothed success rate
+
+    @property
+    def time_to_code(self) -> Optional[float]:
+        return self.ttc_sum / self.successes if self.successes else None
+
+
+async def record_outcome(
+    redis, provider: str, service: Any, country: Any, operator: Any, delivered: bool,
+    time_to_code: float = 0.0, ts: Optional[float] = None,
+) -> None:
+    ts = time.time() if ts is None else ts
+    key = _key(provider, service, country, int(ts) // HOUR)
+    pipe = redis.pipeline(transaction=False)
+    pipe.hincrby(key, f"{operator}:n", 1)
+    if delivered:
+        pipe.hincrby(key, f"{operator}:ok", 1)
+        pipe.hincrby(key, f"{operator}:ttc", max(0, int(time_to_code)))
+    pipe.expire(key, (settings.OPERATOR_STATS_WINDOW_HOURS + 1) * HOUR)
+    await pipe.execute()
+
+
+class OperatorStats:
+    def __init__(self) -> None:
+        self._cache: Dict[Tuple[str, str, str], Tuple[float, Dict[str, OperatorStat]]] = {}
+
+    async def stats(self, redis, provider: str, service: Any, country: Any) -> Dict[str, OperatorStat]:
+        """Decayed statistics of every operator seen for this provider/service/country."""
+        ck = (provider, str(service), str(country))
+        hit = self._cache.get(ck)
+        now = time.time()
+        cache_hit("operator_stats", hit is not None and hit[0] > now)
+        if hit is not None and hit[0] > now:
+            return hit[1]
+        hour = int(now) // HOUR
+        hours = range(hour, hour - settings.OPERATOR_STATS_WINDOW_HOURS, -1)
+        pipe = redis.pipeline(transaction=False)
+        for h in hours:
+            pipe.hgetall(_key(provider, service, country, h))
+        buckets = await pipe.execute()
+        half_life = max(settings.OPERATOR_STATS_HALF_LIFE_HOURS, 1e-6)
+        out: Dict[str, OperatorStat] = {}
+        for h, fields in zip(hours, buckets):
+            if not fields:
+                continue
+            weight = 0.5 ** ((hour - h) / half_life)
+            for field, value in fields.items():
+                op, kind = _str(field).rsplit(":", 1)
+                st = out.get(op) or out.setdefault(op, OperatorStat(op))
+                n = int(value) * weight
+                if kind == "n":
+                    st.samples += n
+                elif kind == "ok":
+                    st.successes += n
+                elif kind == "ttc":
+                    st.ttc_sum += n
+        total = sum(s.samples for s in out.values())
+        prior = sum(s.successes for s in out.values()) / total if total else 0.0
+        for st in out.values():
+            st.rate = (st.successes + PRIOR_WEIGHT * prior) / (st.samples + PRIOR_WEIGHT)
+        self._cache[ck] = (now + settings.OPERATOR_STATS_CACHE_SECONDS, out)
+        if len(self._cache) > 5000:
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+        return out
+
+
+def ranked(stats: Dict[str, OperatorStat]) -> List[OperatorStat]:
+    """Operators with enough samples, most likely to deliver first."""
+    eligible = [
+        s for op, s in stats.items() if op in OPERATORS and s.samples >= settings.OPERATOR_STATS_MIN_SAMPLES
+    ]
+    # rates are compared in 2-point steps; within a step the faster operator wins
+    return sorted(eligible, key=lambda s: (-round(s.rate * 50), s.time_to_code or float("inf")))
+
+
+def best_operator(stats: Dict[str, OperatorStat]) -> Optional[str]:
+    top = ranked(stats)
+    return top[0].operator if top else None
+
+
+operator_stats = OperatorStats()
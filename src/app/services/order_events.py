@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+from redis.exceptions import RedisError, ResponseError
+
+from ..config import settings
+from ..utils import codec
+from ..utils.enums import NumberStatus, OrderEventKind
+from ..utils.metrics import ORDER_EVENT_ERRORS, ORDER_EVENT_LATENCY
+from .redis_client import get_redis_client
+
+# Order lifecycle events on a Redis Stream.
+#
+# Every transition (purchased, code, repeat, canceled, banned, completed,
+# expired) is one XADD to ORDER_EVENTS_STREAM; the purchase path and the status
+# poller do nothing else. Side effects are consumer groups, each reading the
+# whole stream independently: "active" keeps the per-user order index,
+# "notify" messages users, "wallet" settles charges, "analytics" counts. A
+# replica runs the groups listed in ORDER_EVENT_GROUPS, so a group can be
+# moved to dedicated workers or scaled out (consumers in one group share the
+# load). Delivery is at-least-once: an entry is acked after its handler
+# returns; entries of a consumer that died are claimed by another after
+# ORDER_EVENTS_CLAIM_IDLE_MS (each claim pass walks the whole pending list),
+# and an entry failing ORDER_EVENTS_MAX_ATTEMPTS times is copied to the
+# dead-letter stream and acked. Attempts are the entry's delivery count in the
+# group's pending list, so they add up across restarts and replicas.
+#
+# Without Redis the handlers run inline in publish(), so a single-process bot
+# without Redis still notifies users.
+
+TERMINAL = frozenset(
+    {OrderEventKind.CANCELED, OrderEventKind.BANNED, OrderEventKind.COMPLETED, OrderEventKind.EXPIRED}
+)
+# terminal events that mean no code was delivered (the charge is refunded)
+UNFILLED = frozenset({OrderEventKind.CANCELED, OrderEventKind.BANNED, OrderEventKind.EXPIRED})
+EVENT_FOR_STATUS = {
+    NumberStatus.CODE_RECEIVED: OrderEventKind.CODE,
+    NumberStatus.WAIT_CODE_AGAIN: OrderEventKind.REPEAT,
+    NumberStatus.CANCELED: OrderEventKind.CANCELED,
+    NumberStatus.BANNED: OrderEventKind.BANNED,
+    NumberStatus.COMPLETED: OrderEventKind.COMPLETED,
+}
+
+Handler = Callable[["OrderEvent"], Awaitable[None]]
+
+
+@dataclass
+class OrderEvent:
+    kind: OrderEventKind
+    uid: int
+    provider: str
+    order_id: str
+    data: Dict[str, Any] = field(default_factory=dict)  # kind-specific: number, amount, code, chat_id, lang, ...
+    ts: int = field(default_factory=lambda: int(time.time()))
+    msg_id: str = ""  # stream entry id once read back
+
+    @property
+    def key(self) -> str:
+        """Key of the order in the per-user hashes (active:{uid})."""
+        return f"{self.provider}:{self.order_id}"
+
+    def encode(self) -> Dict[str, bytes]:
+        body = {"uid": self.uid, "provider": self.provider, "id": self.order_id, "ts": self.ts, "data": self.data}
+        return {"kind": self.kind.value.encode(), "e": codec.dumps(body)}
+
+    @classmethod
+    def decode(cls, msg_id: Any, fields: Dict[Any, Any]) -> "OrderEvent":
+        kind = fields.get(b"kind", fields.get("kind"))
+        body = codec.loads(fields.get(b"e", fields.get("e")))
+        return cls(
+            kind=OrderEventKind(kind.decode() if isinstance(kind, bytes) else kind),
+            uid=int(body["uid"]),
+            provider=str(body["provider"]),
+            order_id=str(body["id"]),
+            data=body.get("data") or {},
+            ts=int(body.get("ts", 0)),
+            msg_id=msg_id.decode() if isinstance(msg_id, bytes) else str(msg_id),
+        )
+
+
+def enabled_groups() -> List[str]:
+    return [g.strip() for g in (settings.ORDER_EVENT_GROUPS or "").split(",") if g.strip()]
+
+
+class OrderEventBus:
+    def __init__(self) -> None:
+        self._handlers: Dict[str, Handler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Dict[str, asyncio.Event] = {}  # group -> set by publish() in this process
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+
+    def subscribe(self, group: str, handler: Handler) -> None:
+        self._handlers[group] = handler
+
+    async def publish(self, event: OrderEvent) -> Optional[str]:
+        redis = get_redis_client()
+        if redis is not None:
+            try:
+                msg_id = await redis.xadd(
+                    settings.ORDER_EVENTS_STREAM,
+                    event.encode(),
+                    maxlen=settings.ORDER_EVENTS_MAXLEN,
+                    approximate=True,
+                )
+                for wakeup in self._wakeup.values():
+                    wakeup.set()
+                return msg_id.decode() if isinstance(msg_id, bytes) else msg_id
+            except RedisError as e:
+                logger.warning("Order event {} {} not published ({}); handling inline", event.kind.value, event.key, e)
+        await self._dispatch_inline(event)
+        return None
+
+    async def _dispatch_inline(self, event: OrderEvent) -> None:
+        for group in enabled_groups():
+            handler = self._handlers.get(group)
+            if handler is None:
+                continue
+            try:
+                await handler(event)
+            except Exception as e:
+                ORDER_EVENT_ERRORS.labels(group, event.kind.value).inc()
+                logger.warning("Order event handler {} failed for {}: {}", group, event.key, e)
+
+    # ---------------- consumers ----------------
+    def start(self) -> None:
+        redis = get_redis_client()
+        if redis is None or self._tasks:
+            return
+        for group in enabled_groups():
+            handler = self._handlers.get(group)
+            if handler is None:
+                logger.warning("ORDER_EVENT_GROUPS names {} but no handler is subscribed", group)
+                continue
+            self._tasks.append(asyncio.create_task(self._consume(redis, group, handler)))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _ensure_group(self, redis, group: str) -> None:
+        try:
+            # "0": a group created after events were published still sees what the stream retained
+            await redis.xgroup_create(settings.ORDER_EVENTS_STREAM, group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _consume(self, redis, group: str, handler: Handler) -> None:
+        stream = settings.ORDER_EVENTS_STREAM
+        # first drain this consumer's own pending entries (acks lost in a restart), then new ones
+        cursor = "0"
+        next_claim = 0.0
+        wakeup = self._wakeup.setdefault(group, asyncio.Event())
+        while True:
+            try:
+                await self._ensure_group(redis, group)
+                while True:
+                    if time.monotonic() >= next_claim:
+                        next_claim = time.monotonic() + settings.ORDER_EVENTS_CLAIM_IDLE_MS / 1000
+                        await self._claim_idle(redis, group, handler)
+                    wakeup.clear()
+                    asked = time.monotonic()
+                    resp = await redis.xreadgroup(
+                        group, self.consumer, {stream: cursor},
+                        count=settings.ORDER_EVENTS_BATCH, block=None if cursor != ">" else 1000,
+                    )
+                    entries = resp[0][1] if resp else []
+                    if not entries and cursor == ">" and time.monotonic() - asked < 0.5:
+                        # the server answered without blocking (fakeredis does): wait for a local
+                        # publish instead of spinning; other replicas' events are picked up within 1s
+                        try:
+                            await asyncio.wait_for(wakeup.wait(), 1.0)
+                        except asyncio.TimeoutError:
+                            pass
+                        continue
+                    if cursor != ">":
+                        if not entries:
+                            cursor = ">"
+                            continue
+                        last = entries[-1][0]
+                        cursor = last.decode() if isinstance(last, bytes) else last
+                    await self._handle(redis, group, handler, entries)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Order event consumer {} failed: {}; restarting", group, e)
+                cursor = "0"
+                await asyncio.sleep(1.0)
+
+    async def _claim_idle(self, redis, group: str, handler: Handler) -> None:
+        """Claim and handle every entry idle for ORDER_EVENTS_CLAIM_IDLE_MS, a batch at a time."""
+        start: Any = "0-0"
+        while True:
+            start, claimed, *_ = await redis.xautoclaim(
+                settings.ORDER_EVENTS_STREAM, group, self.consumer, settings.ORDER_EVENTS_CLAIM_IDLE_MS,
+                start_id=start, count=settings.ORDER_EVENTS_BATCH,
+            )
+            await self._handle(redis, group, handler, claimed)
+            if start in (b"0-0", "0-0"):
+                return
+
+    async def _attempts(self, redis, group: str, msg_id: Any) -> int:
+        """Times the group delivered ``msg_id`` (across consumers and restarts)."""
+        pending = await redis.xpending_range(settings.ORDER_EVENTS_STREAM, group, min=msg_id, max=msg_id, count=1)
+        return int(pending[0]["times_delivered"]) if pending else 1
+
+    async def _handle(self, redis, group: str, handler: Handler, entries: List[Any]) -> None:
+        done: List[Any] = []
+        for msg_id, fields in entries:
+            if not fields:  # trimmed away while pending
+                done.append(msg_id)
+                continue
+            try:
+                event = OrderEvent.decode(msg_id, fields)
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning("Dropping undecodable order event {}: {}", msg_id, e)
+                await self._dead_letter(redis, group, msg_id, fields, str(e))
+                done.append(msg_id)
+                continue
+            started = time.perf_counter()
+            try:
+                await handler(event)
+            except Exception as e:
+                ORDER_EVENT_ERRORS.labels(group, event.kind.value).inc()
+                attempts = await self._attempts(redis, group, msg_id)
+                if attempts < settings.ORDER_EVENTS_MAX_ATTEMPTS:
+                    logger.warning(
+                        "Order event {} {} failed in {} (attempt {}): {}", event.kind.value, event.key, group, attempts, e
+                    )
+                    continue  # stays pending; retried when claimed
+                logger.error("Order event {} {} dead-lettered by {}: {}", event.kind.value, event.key, group, e)
+                await self._dead_letter(redis, group, msg_id, fields, str(e))
+            finally:
+                ORDER_EVENT_LATENCY.labels(group, event.kind.value).observe(time.perf_counter() - started)
+            done.append(msg_id)
+        if done:
+            await redis.xack(settings.ORDER_EVENTS_STREAM, group, *done)
+
+    async def _dead_letter(self, redis, group: str, msg_id: Any, fields: Dict[Any, Any], error: str) -> None:
+        entry = dict(fields)
+        entry.update({"group": group, "src": msg_id, "error": error[:500]})
+        await redis.xadd(f"{settings.ORDER_EVENTS_STREAM}:dead", entry, maxlen=10_000, approximate=True)
+
+
+order_events = OrderEventBus()
+
+
+async def publish(kind: OrderEventKind, uid: int, provider: str, order_id: Any, **data: Any) -> Optional[str]:
+    event = OrderEvent(kind=kind, uid=uid, provider=provider, order_id=str(order_id), data=data)
+    return await order_events.publish(event)
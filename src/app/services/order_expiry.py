@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from ..config import settings
+from ..utils import codec
+from ..utils.enums import OrderEventKind
+from ..utils.metrics import ORDERS_EXPIRED
+from ..utils.ratelimit import TokenBucket
+from .admin_index import ORDERS_ALL, unindex_order
+from .order_events import publish
+
+# Per-order expiry index. Every active order is a member "{uid}:{provider}:{id}"
+# of one ZSET scored by its expire_ts, so finding the orders that are due is a
+# range read on the head of the set, never a scan of active:{uid} hashes.
+#
+# The sweeper reads due members in batches of ORDER_EXPIRY_BATCH and claims
+# them with ZREM (only the replica whose ZREM removed a member handles it, so
+# any number of replicas can sweep). Claimed orders still present in the
+# user's hash are closed with the provider (close when a code arrived, cancel
+# otherwise) concurrently, at most ORDER_EXPIRY_CONCURRENCY in flight and
+# ORDER_EXPIRY_PROVIDER_RATE calls/s per provider; the hash fields of the whole
+# batch are deleted (and unindexed) in one MULTI and an expired/completed event
+# is published for each, so the wallet refund and the user notice go through the
+# consumers.
+#
+# Each pass also reads the number of active orders (ZCARD of the admin index)
+# for the active_orders gauge, so the gauge costs no Redis call per scrape.
+
+EXPIRY_KEY = "orders:expiry"
+
+
+def member(uid: int, order_key: str) -> str:
+    """ZSET member for the order ``order_key`` ("provider:id") of ``uid``."""
+    return f"{uid}:{order_key}"
+
+
+def parse_member(raw: Any) -> Tuple[int, str, str]:
+    uid, provider, order_id = (raw.decode() if isinstance(raw, bytes) else raw).split(":", 2)
+    return int(uid), provider, order_id
+
+
+class ExpirySweeper:
+    def __init__(self) -> None:
+        self._task: Optional[asyncio.Task] = None
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.active_orders = 0  # as of the last pass
+
+    def start(self, redis) -> None:
+        if settings.ORDER_EXPIRY_SWEEP_SECONDS <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(redis))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self, redis) -> None:
+        while True:
+            try:
+                await self.sweep(redis)
+                self.active_orders = await redis.zcard(ORDERS_ALL)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Order expiry sweep failed: {}", e)
+            await asyncio.sleep(settings.ORDER_EXPIRY_SWEEP_SECONDS)
+
+    async def sweep(self, redis, now: Optional[float] = None) -> int:
+        """Close every order due by ``now``; returns how many this replica claimed."""
+        now = time.time() if now is None else now
+        batch = settings.ORDER_EXPIRY_BATCH
+        total = 0
+        while True:
+            due = await redis.zrangebyscore(EXPIRY_KEY, "-inf", now, start=0, num=batch)
+            if not due:
+                break
+            claimed = await self._claim(redis, due)
+            if claimed:
+                total += len(claimed)
+                await self._expire(redis, claimed)
+            if len(due) < batch:
+                break
+        return total
+
+    async def _claim(self, redis, due: List[Any]) -> List[Tuple[int, str, str]]:
+        pipe = redis.pipeline(transaction=False)
+        for m in due:
+            pipe.zrem(EXPIRY_KEY, m)
+        removed = await pipe.execute()
+        return [parse_member(m) for m, n in zip(due, removed) if n]
+
+    async def _expire(self, redis, claimed: List[Tuple[int, str, str]]) -> None:
+        pipe = redis.pipeline(transaction=False)
+        for uid, provider, order_id in claimed:
+            pipe.hget(f"active:{uid}", f"{provider}:{order_id}")
+        raws = await pipe.execute()
+        orders = []
+        for (uid, provider, order_id), raw in zip(claimed, raws):
+            if not raw:  # finished (or the hash expired) before it was due
+                continue
+            try:
+                entry = codec.loads(raw)
+            except ValueError:
+                entry = {}
+            orders.append((uid, provider, order_id, entry))
+        if not orders:
+            return
+
+        sem = asyncio.Semaphore(max(1, settings.ORDER_EXPIRY_CONCURRENCY))
+        await asyncio.gather(*(
+            self._close(sem, provider, order_id, entry.get("status") == "code")
+            for _, provider, order_id, entry in orders
+        ))
+        pipe = redis.pipeline(transaction=True)
+        for uid, provider, order_id, _ in orders:
+            pipe.hdel(f"active:{uid}", f"{provider}:{order_id}")
+            unindex_order(pipe, member(uid, f"{provider}:{order_id}"), provider)
+        await pipe.execute()
+        await asyncio.gather(*(
+            self._publish(uid, provider, order_id, entry) for uid, provider, order_id, entry in orders
+        ))
+        logger.info("Order expiry: {} order(s) closed", len(orders))
+
+    def _bucket(self, provider: str) -> TokenBucket:
+        b = self._buckets.get(provider)
+        if b is None:
+            rate = settings.ORDER_EXPIRY_PROVIDER_RATE
+            b = self._buckets[provider] = TokenBucket(rate, capacity=rate)
+        return b
+
+    async def _close(self, sem: asyncio.Semaphore, provider: str, order_id: str, filled: bool) -> None:
+        from ..providers.registry import get_provider
+
+        action = "close" if filled else "cancel"
+        async with sem:
+            await self._bucket(provider).acquire()
+            try:
+                prov = get_provider(provider)
+                await (prov.close(id=order_id) if filled else prov.cancel(id=order_id))
+                result = "ok"
+            except Exception as e:
+                # usually already finished on the provider side; the order is dropped here either way
+                logger.info("Expired order {}:{} {} failed: {}", provider, order_id, action, e)
+                result = "error"
+        ORDERS_EXPIRED.labels(provider, action, result).inc()
+
+    async def _publish(self, uid: int, provider: str, order_id: str, entry: Dict[str, Any]) -> None:
+        if entry.get("status") == "code":
+            await publish(OrderEventKind.COMPLETED, uid, provider, order_id)
+        else:
+            await publish(OrderEventKind.EXPIRED, uid, provider, order_id, lang=entry.get("lang"), notify=True)
+
+
+order_expiry = ExpirySweeper()
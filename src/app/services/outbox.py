@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from loguru import logger
+
+from ..config import settings
+from ..utils.ratelimit import TokenBucket
+
+
+class Priority(IntEnum):
+    """Delivery lanes; lower value is sent first."""
+
+    CODE = 0  # verification codes / final order status
+    USER = 1  # replies to user actions (top-up approved, ...)
+    ADMIN = 2  # admin fan-out
+    BULK = 3  # announcements, reports
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    seq: int
+    chat_id: int = field(compare=False)
+    text: str = field(compare=False)
+    kwargs: Dict[str, Any] = field(compare=False, default_factory=dict)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+    attempts: int = field(compare=False, default=0)
+
+
+@dataclass
+class _LaneStats:
+    sent: int = 0
+    failed: int = 0
+    retried: int = 0
+    latency_sum: float = 0.0
+    latency_max: float = 0.0
+
+
+class MessageOutbox:
+    """Rate-limit-aware outbound message queue.
+
+    Messages are enqueued without blocking the caller and delivered by a small
+    worker pool that respects Telegram's global (~30 msg/s) and per-chat limits
+    with token buckets. ``RetryAfter`` pauses the affected chat (or the whole
+    bot when it comes back on repeated attempts) and re-schedules the message,
+    up to ``max_attempts`` deliveries like network errors.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        *,
+        global_rate: Optional[float] = None,
+        per_chat_rate: Optional[float] = None,
+        per_chat_burst: Optional[int] = None,
+        workers: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+    ) -> None:
+        self.bot = bot
+        rate = global_rate or settings.OUTBOX_GLOBAL_RATE
+        self._global = TokenBucket(rate, capacity=rate)
+        self._chat_rate = per_chat_rate or settings.OUTBOX_PER_CHAT_RATE
+        self._chat_burst = per_chat_burst or settings.OUTBOX_PER_CHAT_BURST
+        self._chats: Dict[int, TokenBucket] = {}
+        self._workers_n = workers or settings.OUTBOX_WORKERS
+        self._max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+        self._queue: "asyncio.PriorityQueue[_Job]" = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._delayed = 0
+        self._pending = 0
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._stats: Dict[Priority, _LaneStats] = {p: _LaneStats() for p in Priority}
+        self.retry_after_hits = 0
+
+    # ---------------- lifecycle ----------------
+    def start(self) -> None:
+        if self._workers:
+            return
+        for i in range(self._workers_n):
+            self._workers.append(asyncio.create_task(self._worker(), name=f"outbox-{i}"))
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Try to drain pending messages (including delayed retries), then stop the workers."""
+        try:
+            await asyncio.wait_for(self._drained.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Outbox closed with {} undelivered message(s)", self.depth)
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    # ---------------- producer API ----------------
+    def send(self, chat_id: int, text: str, *, priority: Priority = Priority.USER, **kwargs: Any) -> None:
+        """Enqueue ``bot.send_message(chat_id, text, **kwargs)``; never blocks."""
+        self._pending += 1
+        self._drained.clear()
+        self._queue.put_nowait(_Job(int(priority), next(self._seq), chat_id, text, kwargs))
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() + self._delayed
+
+    def stats(self) -> Dict[str, Any]:
+        lanes: Dict[str, Any] = {}
+        for p, s in self._stats.items():
+            lanes[p.name.lower()] = {
+                "sent": s.sent,
+                "failed": s.failed,
+                "retried": s.retried,
+                "latency_avg": (s.latency_sum / s.sent) if s.sent else 0.0,
+                "latency_max": s.latency_max,
+            }
+        return {"depth": self.depth, "retry_after": self.retry_after_hits, "lanes": lanes}
+
+    # ---------------- internals ----------------
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        b = self._chats.get(chat_id)
+        if b is None:
+            if len(self._chats) > 10000:
+                self._chats = {k: v for k, v in self._chats.items() if not v.idle}
+            b = self._chats[chat_id] = TokenBucket(self._chat_rate, capacity=self._chat_burst)
+        return b
+
+    def _done(self) -> None:
+        self._pending -= 1
+        if self._pending <= 0:
+            self._pending = 0
+            self._drained.set()
+
+    def _requeue_later(self, job: _Job, delay: float) -> None:
+        self._delayed += 1
+
+        def _put() -> None:
+            self._delayed -= 1
+            self._queue.put_nowait(job)
+
+        asyncio.get_running_loop().call_later(delay, _put)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                wait = self._chat_bucket(job.chat_id).try_acquire()
+                if wait > 0:
+                    # Do not hold a worker for a busy chat; let other chats through
+                    self._requeue_later(job, wait)
+                    continue
+                await self._global.acquire()
+                if await self._deliver(job):
+                    self._done()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # never let a worker die
+                logger.exception("Outbox worker error: {}", e)
+                self._done()
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, job: _Job) -> bool:
+        """Send one job; return False if it was re-scheduled for a later attempt."""
+        lane = self._stats[Priority(job.priority)]
+        job.attempts += 1
+        try:
+            await self.bot.send_message(job.chat_id, job.text, **job.kwargs)
+        except TelegramRetryAfter as e:
+            self.retry_after_hits += 1
+            self._chat_bucket(job.chat_id).block_for(e.retry_after)
+            if job.attempts > 1:
+                # repeated flood waits usually mean the global limit was hit
+                self._global.block_for(e.retry_after)
+            if job.attempts < self._max_attempts:
+                lane.retried += 1
+                self._requeue_later(job, e.retry_after)
+                return False
+            lane.failed += 1
+            logger.warning("Outbox gave up on chat {} after {} flood waits", job.chat_id, job.attempts)
+            return True
+        except (TelegramNetworkError, TelegramServerError) as e:
+            if job.attempts < self._max_attempts:
+                lane.retried += 1
+                self._requeue_later(job, min(30.0, 0.5 * (2 ** job.attempts)))
+                return False
+            lane.failed += 1
+            logger.warning("Outbox gave up on chat {} after {} attempts: {}", job.chat_id, job.attempts, e)
+            return True
+        except TelegramAPIError as e:
+            # blocked by user, chat not found, bad markup: retrying will not help
+            lane.failed += 1
+            logger.info("Outbox dropped message to chat {}: {}", job.chat_id, e)
+            return True
+
+        latency = time.monotonic() - job.enqueued_at
+        lane.sent += 1
+        lane.latency_sum += latency
+        if latency > lane.latency_max:
+            lane.latency_max = latency
+        return True
+
+
+_outbox: Optional[MessageOutbox] = None
+
+
+def start_outbox(bot: Bot) -> MessageOutbox:
+    global _outbox
+    _outbox = MessageOutbox(bot)
+    _outbox.start()
+    return _outbox
+
+
+def get_outbox() -> Optional[MessageOutbox]:
+    return _outbox
+
+
+async def stop_outbox() -> None:
+    global _outbox
+    if _outbox is not None:
+        await _outbox.close()
+        _outbox = None
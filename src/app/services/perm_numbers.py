@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from ..config import settings
+from ..utils.metrics import cache_hit
+
+# Permanent ("special") number catalog. The provider's whole list is fetched
+# once per PERM_NUMBERS_REFRESH_SECONDS, kept in memory (and in the boot
+# snapshot) and indexed when it is built, so every filter the browser offers is
+# answered from the index instead of a provider call:
+#
+#   round / half      provider TYPE 2 / 1 (derived from the digits when missing)
+#   repeat            a run of RUN_MIN equal digits (0000) or a repeated block (3535, 123123)
+#   seq               RUN_MIN consecutive digits up or down (1234, 9876)
+#   "contains 1234"   2- and 3-digit postings over the digits; longer queries
+#                     intersect their trigrams and verify the few candidates
+#
+# Numbers are kept sorted by price, and postings are positions in that list, so
+# every result comes out cheapest first without sorting per query.
+
+TYPE_PLAIN, TYPE_HALF, TYPE_ROUND = 0, 1, 2
+TAGS = ("round", "half", "repeat", "seq")
+RUN_MIN = 4
+GRAM = 3
+
+_CC = re.compile(r"^\s*\+\s*(\d{1,4})[\s(\-]")
+
+
+@dataclass
+class PermNumber:
+    id: str
+    number: str  # as shown by the provider, e.g. "+1 (706) 610000 7"
+    price: int
+    type: int
+    digits: str = ""  # every digit, country code included (search)
+    national: str = ""  # digits after the country code (patterns)
+    tags: List[str] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        if not self.digits:
+            self.digits = _NON_DIGIT.sub("", self.number)
+        if not self.national:
+            m = _CC.match(self.number)
+            self.national = self.digits[len(m.group(1)):] if m else self.digits
+        if not self.tags:
+            self.tags = pattern_tags(self.national, self.type)
+
+    def as_row(self) -> Dict[str, Any]:
+        return {"id": self.id, "number": self.number, "price": self.price, "type": self.type}
+
+
+_NON_DIGIT = re.compile(r"\D+")
+_RUN = re.compile(r"(\d)\1{%d}" % (RUN_MIN - 1))
+_LONG_RUN = re.compile(r"(\d)\1{%d}" % RUN_MIN)
+# at every position the longest block (3, else 2 digits) that repeats right after it
+_BLOCK = re.compile(r"(?=(\d{2,3})\1)")
+_SEQ = re.compile("|".join(
+    sorted({s[i:i + RUN_MIN] for s in ("0123456789", "9876543210") for i in range(11 - RUN_MIN)})
+))
+
+
+def pattern_tags(national: str, type_: int) -> List[str]:
+    repeat = _RUN.search(national) is not None or any(
+        b.count(b[0]) != len(b) for b in _BLOCK.findall(national)
+    )
+    seq = _SEQ.search(national) is not None
+    if type_ < 0:  # provider did not classify the number
+        if _LONG_RUN.search(national):
+            type_ = TYPE_ROUND
+        else:
+            type_ = TYPE_HALF if repeat or seq else TYPE_PLAIN
+    tags = []
+    if type_ == TYPE_ROUND:
+        tags.append("round")
+    elif type_ == TYPE_HALF:
+        tags.append("half")
+    if repeat:
+        tags.append("repeat")
+    if seq:
+        tags.append("seq")
+    return tags
+
+
+def normalize(row: Dict[str, Any]) -> Optional[PermNumber]:
+    """PermNumber from a provider row (Numberland ID/NUMBER/PRICE/TYPE or the lowercase form)."""
+    if "NUMBER" not in row:
+        row = {k.upper(): v for k, v in row.items()}
+    number = str(row.get("NUMBER") or "").strip()
+    if not number or row.get("ID") is None:
+        return None
+    try:
+        price = int(float(row.get("PRICE") or 0))
+        type_ = int(row["TYPE"]) if row.get("TYPE") not in (None, "") else -1
+    except (TypeError, ValueError):
+        return None
+    return PermNumber(id=str(row["ID"]), number=number, price=price, type=type_)
+
+
+@dataclass
+class PermCatalog:
+    provider: str
+    fetched_at: int
+    numbers: List[PermNumber] = field(default_factory=list)
+    by_tag: Dict[str, List[int]] = field(default_factory=dict)
+    grams: Dict[str, List[int]] = field(default_factory=dict)
+    by_id: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if self.numbers and not self.by_id:
+            self._index()
+
+    def _index(self) -> None:
+        self.numbers.sort(key=lambda n: (n.price, n.digits))
+        by_tag: Dict[str, List[int]] = {t: [] for t in TAGS}
+        grams: Dict[str, List[int]] = {}
+        for pos, n in enumerate(self.numbers):
+            for tag in n.tags:
+                by_tag[tag].append(pos)
+            d = n.digits
+            for g in {d[i:i + k] for k in (GRAM - 1, GRAM) for i in range(len(d) - k + 1)}:
+                grams.setdefault(g, []).append(pos)
+        self.by_tag = by_tag
+        self.grams = grams
+        self.by_id = {n.id: pos for pos, n in enumerate(self.numbers)}
+
+    @classmethod
+    def build(cls, provider: str, rows: Iterable[Dict[str, Any]], fetched_at: Optional[int] = None) -> "PermCatalog":
+        numbers = [n for n in (normalize(r) for r in rows) if n is not None]
+        return cls(provider=provider, fetched_at=int(time.time()) if fetched_at is None else fetched_at, numbers=numbers)
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def get(self, number_id: str) -> Optional[PermNumber]:
+        pos = self.by_id.get(str(number_id))
+        return self.numbers[pos] if pos is not None else None
+
+    def _contains(self, query: str) -> List[int]:
+        if len(query) < GRAM - 1:
+            return [pos for pos, n in enumerate(self.numbers) if query in n.digits]
+        if len(query) <= GRAM:
+            return self.grams.get(query, [])
+        postings = []
+        for i in range(len(query) - GRAM + 1):
+            p = self.grams.get(query[i:i + GRAM])
+            if not p:
+                return []
+            postings.append(p)
+        postings.sort(key=len)
+        others = [set(p) for p in postings[1:]]
+        return [
+            pos for pos in postings[0]
+            if all(pos in s for s in others) and query in self.numbers[pos].digits
+        ]
+
+    def select(self, tag: Optional[str] = None, query: str = "") -> List[PermNumber]:
+        """Numbers carrying ``tag`` (None = all) whose digits contain ``query``, cheapest first."""
+        query = _NON_DIGIT.sub("", query)
+        if tag and tag not in self.by_tag:
+            return []
+        if not query:
+            return [self.numbers[p] for p in self.by_tag[tag]] if tag else list(self.numbers)
+        hits = self._contains(query)
+        if tag:
+            tagged = set(self.by_tag[tag])
+            hits = [p for p in hits if p in tagged]
+        return [self.numbers[p] for p in hits]
+
+
+class PermNumberCache:
+    """Per-provider permanent-number catalogs served from memory.
+
+    Same policy as the service/country catalogs: stale entries are served and
+    refreshed in the background, a failed or empty refresh keeps the previous
+    list, and only a provider never seen before is fetched inline.
+    """
+
+    def __init__(self) -> None:
+        self._catalogs: Dict[str, PermCatalog] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    def get(self, provider: str) -> Optional[PermCatalog]:
+        return self._catalogs.get(provider)
+
+    def put(self, catalog: PermCatalog) -> None:
+        self._catalogs[catalog.provider] = catalog
+
+    def all(self) -> List[PermCatalog]:
+        return list(self._catalogs.values())
+
+    async def catalog(self, provider: str) -> PermCatalog:
+        cat = self._catalogs.get(provider)
+        cache_hit("perm_numbers", cat is not None)
+        if cat is None:
+            return await self.refresh(provider)
+        if cat.age() > settings.PERM_NUMBERS_REFRESH_SECONDS:
+            self._refresh_soon(provider)
+        return cat
+
+    def _refresh_soon(self, provider: str) -> None:
+        task = self._refreshing.get(provider)
+        if task is None or task.done():
+            self._refreshing[provider] = asyncio.create_task(self._refresh_quietly(provider))
+
+    async def _refresh_quietly(self, provider: str) -> None:
+        try:
+            await self.refresh(provider)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Permanent number refresh for {} failed: {}", provider, e)
+
+    async def refresh(self, provider: str) -> PermCatalog:
+        from ..providers.registry import get_provider
+
+        rows = await get_provider(provider).perm_numbers()
+        old = self._catalogs.get(provider)
+        if not rows and old is not None:
+            return old
+        started = time.perf_counter()
+        # indexing a few thousand numbers takes tens of ms: keep it off the event loop
+        cat = await asyncio.to_thread(PermCatalog.build, provider, rows)
+        self._catalogs[provider] = cat
+        logger.info(
+            "Permanent numbers for {}: {} indexed in {:.1f} ms", provider, len(cat.numbers),
+            (time.perf_counter() - started) * 1000,
+        )
+        return cat
+
+    def start(self, providers: List[str]) -> None:
+        """Prefetch in the background the providers the boot snapshot did not cover."""
+        for key in providers:
+            if key not in self._catalogs:
+                self._refresh_soon(key)
+
+    async def stop(self) -> None:
+        tasks = list(self._refreshing.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refreshing.clear()
+
+
+perm_numbers = PermNumberCache()
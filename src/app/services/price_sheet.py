@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from ..config import settings
+from ..utils import codec
+from ..utils.metrics import cache_hit
+from .pricing import PricingEngine, pricing_engine
+
+SHEET_KEY = "pricing:sheet:{provider}"
+LOCK_KEY = "pricing:sheet:lock:{provider}"
+
+# service, country, operator, base amount, final price, stock
+Row = Tuple[str, str, str, int, int, int]
+
+
+@dataclass
+class PriceSheet:
+    """Final prices for a provider's whole tariff table plus "from X" floors."""
+
+    provider: str
+    built_at: int
+    rows: List[Row]
+    min_by_service: Dict[str, int] = field(default_factory=dict)
+    min_by_country: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if not self.min_by_service and self.rows:
+            self._index()
+
+    def _index(self) -> None:
+        by_sv: Dict[str, int] = {}
+        by_ct: Dict[str, Dict[str, int]] = {}
+        for sv, ct, _op, _base, price, count in self.rows:
+            if count <= 0:
+                continue
+            if price < by_sv.get(sv, price + 1):
+                by_sv[sv] = price
+            cts = by_ct.setdefault(sv, {})
+            if price < cts.get(ct, price + 1):
+                cts[ct] = price
+        self.min_by_service = by_sv
+        self.min_by_country = by_ct
+
+    @classmethod
+    def build(
+        cls, provider: str, tariffs: Iterable[Dict[str, Any]], engine: PricingEngine = pricing_engine
+    ) -> "PriceSheet":
+        raw = [
+            (str(t["service"]), str(t["country"]), str(t["operator"]), int(t["amount"]), int(t.get("count", 0)))
+            for t in tariffs
+        ]
+        prices = engine.quote_bulk([(sv, ct, op, base) for sv, ct, op, base, _ in raw])
+        rows = [(sv, ct, op, base, price, count) for (sv, ct, op, base, count), price in zip(raw, prices)]
+        return cls(provider=provider, built_at=int(time.time()), rows=rows)
+
+    def reprice(self, engine: PricingEngine = pricing_engine) -> "PriceSheet":
+        """Same tariff snapshot, prices recomputed with the engine's current rules."""
+        prices = engine.quote_bulk([(sv, ct, op, base) for sv, ct, op, base, _, _ in self.rows])
+        rows = [(sv, ct, op, base, price, count) for (sv, ct, op, base, _, count), price in zip(self.rows, prices)]
+        return PriceSheet(provider=self.provider, built_at=self.built_at, rows=rows)
+
+    def dumps(self) -> bytes:
+        return codec.dumps({"provider": self.provider, "built_at": self.built_at, "rows": self.rows})
+
+    @classmethod
+    def loads(cls, data: bytes) -> "PriceSheet":
+        obj = codec.loads(data)
+        rows = [tuple(r) for r in obj.get("rows", [])]
+        return cls(provider=obj["provider"], built_at=int(obj.get("built_at", 0)), rows=rows)  # type: ignore[arg-type]
+
+
+class PriceSheetCache:
+    """Per-provider price sheets kept in memory and shared through Redis.
+
+    One replica at a time (Redis lock) downloads tariffs and rebuilds; the
+    others pick the result up from Redis. Sheets are repriced in place when
+    pricing rules are reloaded.
+    """
+
+    def __init__(self) -> None:
+        self._sheets: Dict[str, PriceSheet] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def get(self, provider: str) -> Optional[PriceSheet]:
+        return self._sheets.get(provider)
+
+    def put(self, sheet: PriceSheet) -> None:
+        self._sheets[sheet.provider] = sheet
+
+    def all(self) -> List[PriceSheet]:
+        return list(self._sheets.values())
+
+    def service_floor(self, provider: str) -> Dict[str, int]:
+        sheet = self._sheets.get(provider)
+        cache_hit("price_sheet", sheet is not None)
+        return sheet.min_by_service if sheet else {}
+
+    def country_floor(self, provider: str, service: Any) -> Dict[str, int]:
+        sheet = self._sheets.get(provider)
+        cache_hit("price_sheet", sheet is not None)
+        return sheet.min_by_country.get(str(service), {}) if sheet else {}
+
+    async def load(self, redis, provider: str) -> Optional[PriceSheet]:
+        raw = await redis.get(SHEET_KEY.format(provider=provider))
+        if not raw:
+            return None
+        sheet = PriceSheet.loads(raw)
+        self._sheets[provider] = sheet
+        return sheet
+
+    async def refresh(self, redis, provider: str) -> Optional[PriceSheet]:
+        from ..providers.registry import get_provider
+
+        ttl = settings.PRICE_SHEET_REFRESH_SECONDS
+        got_lock = await redis.set(LOCK_KEY.format(provider=provider), b"1", nx=True, ex=max(30, ttl // 2))
+        if not got_lock:
+            return await self.load(redis, provider)
+        tariffs = await get_provider(provider).tariffs()
+        if not tariffs:
+            return self._sheets.get(provider)
+        sheet = PriceSheet.build(provider, tariffs)
+        self._sheets[provider] = sheet
+        await redis.set(SHEET_KEY.format(provider=provider), sheet.dumps(), ex=ttl * 3)
+        logger.info("Price sheet for {} rebuilt: {} rows", provider, len(sheet.rows))
+        return sheet
+
+    def reprice_all(self) -> None:
+        for key, sheet in list(self._sheets.items()):
+            self._sheets[key] = sheet.reprice()
+
+    def start(self, redis, providers: List[str]) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(redis, providers))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self, redis, providers: List[str]) -> None:
+        while True:
+            for key in providers:
+                try:
+                    await self.refresh(redis, key)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning("Price sheet refresh for {} failed: {}", key, e)
+            await asyncio.sleep(settings.PRICE_SHEET_REFRESH_SECONDS)
+
+
+price_sheets = PriceSheetCache()
+pricing_engine.add_listener(price_sheets.reprice_all)
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional
+import asyncio
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from loguru import logger
 
 from ..config import settings
+from ..utils import codec
+from ..utils.metrics import cache_hit
 
 
 @dataclass
@@ -24,13 +29,13 @@ def round_to_step(value: float, step: int) -> int:
     return int((int(value) + step - 1) // step * step)
 
 
-def calculate_price(
-    base_amount: int,
+def effective_params(
     rule: Optional[PricingRule] = None,
     default_margin_percent: Optional[float] = None,
     default_round_to: Optional[int] = None,
     default_min_margin: Optional[int] = None,
-) -> int:
+) -> Tuple[float, int, int]:
+    """(margin_percent, round_to, min_margin) after applying rule and global defaults."""
     margin_percent = (
         rule.margin_percent if rule and rule.margin_percent is not None else default_margin_percent
     )
@@ -43,6 +48,19 @@ def calculate_price(
         round_to = settings.MARKUP_ROUND_TO
     if min_margin is None:
         min_margin = 0
+    return margin_percent, int(round_to), min_margin
+
+
+def calculate_price(
+    base_amount: int,
+    rule: Optional[PricingRule] = None,
+    default_margin_percent: Optional[float] = None,
+    default_round_to: Optional[int] = None,
+    default_min_margin: Optional[int] = None,
+) -> int:
+    margin_percent, round_to, min_margin = effective_params(
+        rule, default_margin_percent, default_round_to, default_min_margin
+    )
 
     price_float = base_amount * (1.0 + margin_percent / 100.0)
     price = round_to_step(price_float, int(round_to))
@@ -53,3 +71,267 @@ def calculate_price(
         price = round_to_step(price, int(round_to))
 
     return int(price)
+
+
+_np: Any = None  # numpy once imported, False if unavailable
+
+
+def _numpy() -> Any:
+    """numpy is only needed for bulk pricing; import it on first use instead of at startup."""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - numpy is in infra/requirements.txt
+            _np = False
+        else:
+            _np = numpy
+    return _np or None
+
+
+def _round_to_step_vec(np: Any, values, steps):
+    # Same semantics as round_to_step: ceil(int(value) / step) * step, or round() when step <= 0
+    positive = steps > 0
+    safe = np.where(positive, steps, 1)
+    truncated = np.trunc(values).astype(np.int64)
+    stepped = (truncated + safe - 1) // safe * safe
+    return np.where(positive, stepped, np.round(values).astype(np.int64))
+
+
+def calculate_prices_bulk(
+    base_amounts: Sequence[int],
+    margin_percent: Sequence[float],
+    round_to: Sequence[int],
+    min_margin: Sequence[int],
+) -> List[int]:
+    """Vectorized ``calculate_price`` over parallel arrays of resolved parameters.
+
+    Produces exactly the scalar results (same float64 operations in the same
+    order, same truncation and rounding), just in one pass.
+    """
+    np = _numpy()
+    if np is None:  # pragma: no cover - numpy is in infra/requirements.txt
+        rules = (
+            PricingRule(scope="global", margin_percent=m, round_to=r, min_margin=mm)
+            for m, r, mm in zip(margin_percent, round_to, min_margin)
+        )
+        return [calculate_price(int(b), rule) for b, rule in zip(base_amounts, rules)]
+
+    base = np.asarray(base_amounts, dtype=np.int64)
+    margin = np.asarray(margin_percent, dtype=np.float64)
+    steps = np.asarray(round_to, dtype=np.int64)
+    min_m = np.asarray(min_margin, dtype=np.int64)
+
+    price = _round_to_step_vec(np, base * (1.0 + margin / 100.0), steps)
+    low = (price - base) < min_m
+    if low.any():
+        floor_price = _round_to_step_vec(np, (base + min_m).astype(np.float64), steps)
+        price = np.where(low, floor_price, price)
+    return price.tolist()
+
+
+# ---------------------- Rule index ----------------------
+
+# Most specific first; a more specific rule overrides fields of the less specific ones
+SCOPE_PRECEDENCE = ("combo", "operator", "country", "service", "global")
+_RULE_FIELDS = ("margin_percent", "min_margin", "round_to")
+_ANY = "*"
+
+RULES_KEY = "pricing:rules"
+RELOAD_CHANNEL = "pricing:reload"
+
+
+_SCOPE_FIELDS = {"service": "service_id", "country": "country_id", "operator": "operator"}
+
+
+def rule_key(rule: PricingRule) -> str:
+    """Stable identifier of the slot a rule occupies (one active rule per slot).
+
+    Raises ValueError for rules that could never match: a service/country/operator
+    rule without its id, or a combo rule with fewer than two of the three set (a
+    single one is the plain service/country/operator scope).
+    """
+    if rule.scope == "global":
+        return "global"
+    if rule.scope in _SCOPE_FIELDS:
+        value = getattr(rule, _SCOPE_FIELDS[rule.scope])
+        if value in (None, "", _ANY):
+            raise ValueError(f"{rule.scope} rule needs {rule.scope}=ID")
+        return f"{rule.scope}:{value}"
+    if rule.scope == "combo":
+        parts = [rule.service_id or _ANY, rule.country_id or _ANY, rule.operator or _ANY]
+        if sum(p != _ANY for p in parts) < 2:
+            raise ValueError("combo rule needs at least two of service=, country=, operator=")
+        return "combo:" + ":".join(parts)
+    raise ValueError(f"Unknown pricing scope: {rule.scope}")
+
+
+def rule_from_dict(data: Dict[str, Any]) -> PricingRule:
+    names = {f.name for f in fields(PricingRule)}
+    return PricingRule(**{k: v for k, v in data.items() if k in names})
+
+
+class PricingIndex:
+    """Immutable, precompiled view of the active pricing rules.
+
+    ``resolve`` does at most a handful of dict lookups (one per scope) and
+    memoizes the merged result per (service, country, operator).
+    """
+
+    def __init__(self, rules: Iterable[PricingRule] = ()) -> None:
+        self._slots: Dict[str, PricingRule] = {}
+        for r in rules:
+            if r.active:
+                self._slots[rule_key(r)] = r
+        self._cache: Dict[Tuple[str, str, str], Optional[PricingRule]] = {}
+        self._params: Dict[Tuple[Any, Any, Any], Tuple[float, int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def rules(self) -> List[PricingRule]:
+        return list(self._slots.values())
+
+    def _chain(self, service: str, country: str, operator: str) -> List[PricingRule]:
+        slots = self._slots
+        keys = (
+            f"combo:{service}:{country}:{operator}",
+            f"combo:{service}:{country}:{_ANY}",
+            f"combo:{service}:{_ANY}:{operator}",
+            f"combo:{_ANY}:{country}:{operator}",
+            f"operator:{operator}",
+            f"country:{country}",
+            f"service:{service}",
+            "global",
+        )
+        return [slots[k] for k in keys if k in slots]
+
+    def params(self, service: Any, country: Any, operator: Any) -> Tuple[float, int, int]:
+        """Memoized ``effective_params`` of the resolved rule (bulk pricing hot path)."""
+        ck = (service, country, operator)
+        try:
+            return self._params[ck]
+        except KeyError:
+            pass
+        p = effective_params(self.resolve(service, country, operator))
+        if len(self._params) > 200000:
+            self._params.clear()
+        self._params[ck] = p
+        return p
+
+    def resolve(self, service: Any, country: Any, operator: Any) -> Optional[PricingRule]:
+        ck = (str(service), str(country), str(operator))
+        try:
+            rule = self._cache[ck]
+            cache_hit("pricing_rules", True)
+            return rule
+        except KeyError:
+            cache_hit("pricing_rules", False)
+        chain = self._chain(*ck)
+        merged: Optional[PricingRule] = None
+        if chain:
+            merged = PricingRule(scope=chain[0].scope, service_id=ck[0], country_id=ck[1], operator=ck[2])
+            for name in _RULE_FIELDS:
+                for r in chain:
+                    v = getattr(r, name)
+                    if v is not None:
+                        setattr(merged, name, v)
+                        break
+        if len(self._cache) > 50000:
+            self._cache.clear()
+        self._cache[ck] = merged
+        return merged
+
+
+class PricingEngine:
+    """Holds the current ``PricingIndex`` and swaps it atomically on reload.
+
+    Rules live in the Redis hash ``pricing:rules`` (field = rule_key, value =
+    JSON rule). Writers publish on ``pricing:reload``; every replica listening
+    on that channel rebuilds its index without a restart.
+    """
+
+    def __init__(self) -> None:
+        self._index = PricingIndex()
+        self._watch_task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[], None]] = []
+
+    @property
+    def index(self) -> PricingIndex:
+        return self._index
+
+    def add_listener(self, fn: Callable[[], None]) -> None:
+        """Call ``fn`` after every index swap (e.g. to reprice cached sheets)."""
+        self._listeners.append(fn)
+
+    def quote(self, base_amount: int, service: Any, country: Any, operator: Any) -> int:
+        return calculate_price(base_amount, rule=self._index.resolve(service, country, operator))
+
+    def quote_bulk(self, rows: Sequence[Tuple[Any, Any, Any, int]]) -> List[int]:
+        """Final prices for many (service, country, operator, base_amount) rows at once."""
+        if not rows:
+            return []
+        params = self._index.params
+        margins, steps, mins = zip(*[params(sv, ct, op) for sv, ct, op, _ in rows])
+        return calculate_prices_bulk([r[3] for r in rows], margins, steps, mins)
+
+    async def load(self, redis) -> int:
+        raw = await redis.hgetall(RULES_KEY)
+        rules: List[PricingRule] = []
+        for k, v in (raw or {}).items():
+            try:
+                rule = rule_from_dict(codec.loads(v))
+                rule_key(rule)  # rules saved before validation may never match
+                rules.append(rule)
+            except Exception as e:
+                logger.warning("Skipping invalid pricing rule {}: {}", k, e)
+        self._index = PricingIndex(rules)
+        for fn in self._listeners:
+            try:
+                fn()
+            except Exception as e:
+                logger.warning("Pricing reload listener failed: {}", e)
+        return len(self._index)
+
+    async def save_rule(self, redis, rule: PricingRule) -> str:
+        key = rule_key(rule)
+        await redis.hset(RULES_KEY, key, codec.dumps(asdict(rule)))
+        await redis.publish(RELOAD_CHANNEL, key)
+        return key
+
+    async def delete_rule(self, redis, key: str) -> bool:
+        removed = await redis.hdel(RULES_KEY, key)
+        if removed:
+            await redis.publish(RELOAD_CHANNEL, key)
+        return bool(removed)
+
+    def start(self, redis) -> None:
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch(redis))
+
+    async def stop(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            await asyncio.gather(self._watch_task, return_exceptions=True)
+            self._watch_task = None
+
+    async def _watch(self, redis) -> None:
+        while True:
+            try:
+                async with redis.pubsub() as ps:
+                    await ps.subscribe(RELOAD_CHANNEL)
+                    # reload after (re)subscribing so no change is missed in between
+                    n = await self.load(redis)
+                    logger.info("Pricing rules loaded: {}", n)
+                    async for msg in ps.listen():
+                        if msg.get("type") == "message":
+                            n = await self.load(redis)
+                            logger.info("Pricing rules reloaded: {}", n)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Pricing reload listener error: {}; retrying", e)
+                await asyncio.sleep(5)
+
+
+pricing_engine = PricingEngine()
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import secrets
+from typing import Any, Dict, Optional
+
+from redis.exceptions import WatchError
+
+from ..config import settings
+from ..utils import codec
+
+# Exactly-once purchases for a confirmed quote. A double tap on "confirm" or a
+# redelivered update runs the confirm handler again with the same FSM data, and
+# without a guard each run would debit the wallet, call getnum, publish an
+# order and start a poller.
+#
+#   purchase:lock:{uid}     per-user lock (SET NX, random token) held while buying
+#   purchase:done:{key}     result of the purchase for idempotency key ``key``
+#
+# The key is a digest of the user and the quote they confirmed (provider,
+# service, country, operator, price and the nonce drawn when the quote was
+# shown), so confirming the same quote twice maps to one purchase while a new
+# quote for the same number is a new purchase. A second run finds the stored
+# result and shows it; one that arrives while the first is still buying waits
+# for the lock to go and then shows its result. The lock expires after
+# PURCHASE_LOCK_SECONDS in case its holder dies mid-purchase.
+
+RESULT_TTL = 86400
+POLL_SECONDS = 0.2
+
+
+def new_nonce() -> str:
+    return secrets.token_hex(8)
+
+
+def idempotency_key(uid: int, provider: str, data: Dict[str, Any]) -> str:
+    quote = data.get("quote") or {}
+    parts = (
+        uid, provider, data.get("service_id"), data.get("country_id"), data.get("operator"),
+        quote.get("final_price"), quote.get("nonce"),
+    )
+    return hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()[:32]
+
+
+def _lock_key(uid: int) -> str:
+    return f"purchase:lock:{uid}"
+
+
+def _done_key(key: str) -> str:
+    return f"purchase:done:{key}"
+
+
+async def result(redis, key: str) -> Optional[Dict[str, Any]]:
+    raw = await redis.get(_done_key(key))
+    return codec.loads(raw) if raw else None
+
+
+async def store(redis, key: str, res: Dict[str, Any]) -> None:
+    await redis.set(_done_key(key), codec.dumps(res), ex=RESULT_TTL)
+
+
+async def acquire(redis, uid: int) -> Optional[str]:
+    """Take the user's purchase lock: its token, or None if a purchase of theirs is running."""
+    token = secrets.token_hex(8)
+    ok = await redis.set(_lock_key(uid), token, nx=True, px=int(settings.PURCHASE_LOCK_SECONDS * 1000))
+    return token if ok else None
+
+
+async def release(redis, uid: int, token: str) -> None:
+    """Drop the lock if it is still ours (it may have expired and been taken by another purchase)."""
+    key = _lock_key(uid)
+    async with redis.pipeline(transaction=True) as pipe:
+        try:
+            await pipe.watch(key)
+            held = await pipe.get(key)
+            if (held.decode() if isinstance(held, bytes) else held) != token:
+                await pipe.unwatch()
+                return
+            pipe.multi()
+            pipe.delete(key)
+            await pipe.execute()
+        except WatchError:
+            pass  # changed hands in between: not ours any more
+
+
+async def wait(redis, uid: int, key: str) -> Optional[Dict[str, Any]]:
+    """Wait for the running purchase of ``uid`` to finish; the result stored for ``key`` if it made one."""
+    while await redis.exists(_lock_key(uid)):
+        res = await result(redis, key)
+        if res is not None:
+            return res
+        await asyncio.sleep(POLL_SECONDS)
+    return await result(redis, key)
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from ..config import settings
+from ..utils.metrics import QUOTE_PREFETCHES
+from ..utils.ratelimit import TokenBucket
+from .analytics import board_key, bucket
+from .operator_quotes import operator_quotes
+
+# Speculative operator quotes while the user browses countries. When a user
+# opens a country page for a service, the countries on it are ordered by
+# today's sales (the analytics "country" board) and the QUOTE_PREFETCH_COUNTRIES
+# most popular ones not already cached are fetched into operator_quotes, so the
+# operator menu and the quote step after a country tap usually need no provider
+# call.
+#
+# Prefetching is low priority: one call at a time per user, each waiting for a
+# token of a per-provider bucket (QUOTE_PREFETCH_RATE calls/s, which user-driven
+# quotes never wait for). A user has at most one prefetch; opening another page
+# replaces it, and picking a country or leaving the country list cancels it
+# (a call already in flight finishes and is cached for whoever asks next).
+
+
+class QuotePrefetcher:
+    def __init__(self) -> None:
+        self._tasks: Dict[int, Tuple[str, asyncio.Task]] = {}  # uid -> (provider, prefetch)
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def schedule(self, redis, uid: int, provider: str, service: Any, countries: List[str]) -> None:
+        """Replace ``uid``'s prefetch with one for ``countries`` (the ids visible on their page)."""
+        self.cancel(uid)
+        if settings.QUOTE_PREFETCH_COUNTRIES <= 0 or not countries:
+            return
+        task = asyncio.create_task(self._run(redis, provider, service, countries))
+        self._tasks[uid] = (provider, task)
+        task.add_done_callback(lambda t: self._forget(uid, t))
+
+    def _forget(self, uid: int, task: asyncio.Task) -> None:
+        cur = self._tasks.get(uid)
+        if cur is not None and cur[1] is task:
+            del self._tasks[uid]
+
+    def cancel(self, uid: int) -> None:
+        cur = self._tasks.pop(uid, None)
+        if cur is not None and not cur[1].done():
+            cur[1].cancel()
+            QUOTE_PREFETCHES.labels(cur[0], "cancelled").inc()
+
+    async def stop(self) -> None:
+        tasks = [t for _, t in self._tasks.values()]
+        self._tasks.clear()
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _bucket(self, provider: str) -> TokenBucket:
+        b = self._buckets.get(provider)
+        if b is None:
+            rate = settings.QUOTE_PREFETCH_RATE
+            b = self._buckets[provider] = TokenBucket(rate, capacity=max(1.0, rate))
+        return b
+
+    async def _run(self, redis, provider: str, service: Any, countries: List[str]) -> None:
+        todo = [c for c in countries if not operator_quotes.fresh(provider, service, c)]
+        if not todo:
+            return
+        todo = (await self._by_popularity(redis, provider, todo))[:settings.QUOTE_PREFETCH_COUNTRIES]
+        for country in todo:
+            await self._bucket(provider).acquire()
+            try:
+                fetched = await operator_quotes.warm(provider, service, country)
+            except Exception as e:
+                logger.debug("Quote prefetch {}:{}:{} failed: {}", provider, service, country, e)
+                continue
+            QUOTE_PREFETCHES.labels(provider, "fetched" if fetched else "fresh").inc()
+
+    async def _by_popularity(self, redis, provider: str, countries: List[str]) -> List[str]:
+        """``countries`` ordered by today's orders (page order among equals)."""
+        if not redis:
+            return countries
+        try:
+            scores: List[Optional[float]] = await redis.zmscore(
+                board_key("d", bucket("d", time.time()), "country"), [f"{provider}/{c}" for c in countries]
+            )
+        except Exception as e:
+            logger.debug("Quote prefetch popularity unavailable: {}", e)
+            return countries
+        rank = {c: -(s or 0.0) for c, s in zip(countries, scores)}
+        return sorted(countries, key=lambda c: rank[c])
+
+
+quote_prefetch = QuotePrefetcher()
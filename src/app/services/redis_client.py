@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Optional
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from ..config import settings
+from ..utils.metrics import REDIS_ERRORS, REDIS_LATENCY
+from ..utils.tracing import span
+
+
+def _command_name(args: tuple) -> str:
+    name = args[0] if args else "?"
+    if isinstance(name, bytes):
+        name = name.decode()
+    return str(name).upper()
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        name = "MULTI" if self.is_transaction else "PIPELINE"
+        try:
+            with span("redis", cmd=name, size=len(self.command_stack)):
+                return await super().execute(raise_on_error)
+        except Exception:
+            REDIS_ERRORS.labels(name).inc()
+            raise
+        finally:
+            REDIS_LATENCY.labels(name).observe(time.perf_counter() - start)
+
+
+class InstrumentedRedis(Redis):
+    """redis.asyncio.Redis that records per-command latency and errors."""
+
+    async def execute_command(self, *args: Any, **options: Any):
+        start = time.perf_counter()
+        name = _command_name(args)
+        try:
+            with span("redis", cmd=name):
+                return await super().execute_command(*args, **options)
+        except Exception:
+            REDIS_ERRORS.labels(name).inc()
+            raise
+        finally:
+            REDIS_LATENCY.labels(name).observe(time.perf_counter() - start)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> Pipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+_client: Optional[InstrumentedRedis] = None
+
+
+def get_redis_client() -> Optional[InstrumentedRedis]:
+    """Process-wide Redis client sharing one connection pool (None if unavailable)."""
+    global _client
+    if _client is None:
+        try:
+            _client = InstrumentedRedis.from_url(settings.REDIS_DSN)
+        except Exception:
+            return None
+    return _client
+
+
+def set_redis_client(client: Optional[Any]) -> None:
+    """Install a specific client (tests, load harness, in-memory stand-ins)."""
+    global _client
+    _client = client
+
+
+async def close_redis_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
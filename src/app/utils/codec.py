@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Union
+
+# Single JSON codec for everything we put in / read from Redis (wallet, orders,
+# active orders, top-ups, FSM storage) and for the Telegram session.
+# orjson is ~5-10x faster than stdlib json on our payloads; fall back to json
+# if the wheel is unavailable (e.g. exotic platforms).
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in infra/requirements.txt
+    orjson = None  # type: ignore[assignment]
+
+
+if orjson is not None:
+    _OPTS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize to compact UTF-8 JSON bytes (non-ASCII kept as-is)."""
+        return orjson.dumps(obj, option=_OPTS)
+
+    def dumps_str(obj: Any) -> str:
+        return orjson.dumps(obj, option=_OPTS).decode()
+
+    def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        return orjson.loads(data)
+
+else:
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def dumps_str(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+    def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        return json.loads(data)
+
+
+BACKEND = "orjson" if orjson is not None else "json"
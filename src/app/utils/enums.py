@@ -1,4 +1,4 @@
-from enum import IntEnum
+from enum import Enum, IntEnum
 
 
 class NumberStatus(IntEnum):
@@ -8,3 +8,13 @@ class NumberStatus(IntEnum):
     BANNED = 4
     WAIT_CODE_AGAIN = 5
     COMPLETED = 6
+
+
+class OrderEventKind(str, Enum):
+    PURCHASED = "purchased"
+    CODE = "code"
+    REPEAT = "repeat"
+    CANCELED = "canceled"
+    BANNED = "banned"
+    COMPLETED = "completed"
+    EXPIRED = "expired"
@@ -1,12 +1,13 @@
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from ..i18n import tr
 
-def status_kb_provider(lang: str, provider_key: str, number_id: str, t=lambda l, fa, en, ru: en):
+
+def status_kb_provider(lang: str, provider_key: str, number_id: str):
     b = InlineKeyboardBuilder()
-    b.button(text=t(lang, "لغو", "Cancel", "Отмена"), callback_data=f"st:cancel:{provider_key}:{number_id}")
-    b.button(text=t(lang, "تکرار", "Repeat", "Повтор"), callback_data=f"st:repeat:{provider_key}:{number_id}")
-    b.button(text=t(lang, "بستن", "Close", "Закрыть"), callback_data=f"st:close:{provider_key}:{number_id}")
-    b.button(text=t(lang, "بروزرسانی", "Refresh", "Обновить"), callback_data=f"st:refresh:{provider_key}:{number_id}")
+    b.button(text=tr("status.cancel", lang), callback_data=f"st:cancel:{provider_key}:{number_id}")
+    b.button(text=tr("status.repeat", lang), callback_data=f"st:repeat:{provider_key}:{number_id}")
+    b.button(text=tr("status.close", lang), callback_data=f"st:close:{provider_key}:{number_id}")
+    b.button(text=tr("status.refresh", lang), callback_data=f"st:refresh:{provider_key}:{number_id}")
     b.adjust(3, 1)
     return b.as_markup()
-
@@ -1,7 +1,24 @@
 from loguru import logger
 import sys
 
+from ..config import settings
+
+
+def _not_sampled_trace(record) -> bool:
+    # sampled traces are only interesting in the trace file; slow ones go everywhere
+    return record["extra"].get("trace") != "sample" or not settings.TRACE_LOG_PATH
+
 
 def setup_logging():
     logger.remove()
-    logger.add(sys.stdout, level="INFO", backtrace=False, diagnose=False, serialize=False)
+    logger.add(sys.stdout, level="INFO", backtrace=False, diagnose=False, serialize=False, filter=_not_sampled_trace)
+    if settings.TRACE_LOG_PATH:
+        logger.add(
+            settings.TRACE_LOG_PATH,
+            level="INFO",
+            format="{extra[trace_json]}",
+            filter=lambda record: "trace_json" in record["extra"],
+            rotation="50 MB",
+            retention=5,
+            enqueue=True,
+        )
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Minimal Prometheus-compatible metrics. Everything is in-process and lock-free
+# (single event loop); recording a sample is a dict lookup plus a bisect, so it
+# is cheap enough for Redis commands and handler calls.
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, doc, labelnames)
+        self._children: Dict[Tuple[str, ...], _CounterChild] = {}
+
+    def labels(self, *values: str) -> _CounterChild:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = _CounterChild()
+        return child
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def render(self) -> List[str]:
+        out = super().render()
+        for values, child in self._children.items():
+            out.append(f"{self.name}_total{_fmt_labels(self.labelnames, values)} {child.value}")
+        return out
+
+
+class Gauge(_Metric):
+    """Gauge whose value is either set explicitly or read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = float(value)
+
+    def set_function(self, fn: Callable[[], float], *labels: str) -> None:
+        self._functions[labels] = fn
+
+    def render(self) -> List[str]:
+        out = super().render()
+        values = dict(self._values)
+        for labels, fn in self._functions.items():
+            try:
+                values[labels] = float(fn())
+            except Exception:
+                continue
+        for labels, v in values.items():
+            out.append(f"{self.name}{_fmt_labels(self.labelnames, labels)} {v}")
+        return out
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, doc: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children: Dict[Tuple[str, ...], _HistogramChild] = {}
+
+    def labels(self, *values: str) -> _HistogramChild:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = _HistogramChild(self.buckets)
+        return child
+
+    def render(self) -> List[str]:
+        out = super().render()
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, n in zip(child.bounds, child.counts):
+                cumulative += n
+                le = _fmt_labels(self.labelnames, values, f'le="{bound}"')
+                out.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _fmt_labels(self.labelnames, values, 'le="+Inf"')
+            out.append(f"{self.name}_bucket{le} {child.count}")
+            labels = _fmt_labels(self.labelnames, values)
+            out.append(f"{self.name}_sum{labels} {child.sum}")
+            out.append(f"{self.name}_count{labels} {child.count}")
+        return out
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics.values():
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, doc: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, doc, labelnames))  # type: ignore[return-value]
+
+
+def gauge(name: str, doc: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, doc, labelnames))  # type: ignore[return-value]
+
+
+def histogram(
+    name: str, doc: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, doc, labelnames, buckets))  # type: ignore[return-value]
+
+
+# ---------------------- Application metrics ----------------------
+
+PROVIDER_LATENCY = histogram(
+    "viranum_provider_call_seconds", "Provider adapter call latency", ("provider", "method")
+)
+PROVIDER_ERRORS = counter("viranum_provider_errors", "Provider adapter call failures", ("provider", "method", "error"))
+PROVIDER_HTTP_LATENCY = histogram(
+    "viranum_provider_http_seconds", "Raw provider HTTP request latency (per attempt)", ("provider", "endpoint")
+)
+PROVIDER_HTTP_RETRIES = counter("viranum_provider_http_retries", "Provider HTTP retries", ("provider", "endpoint", "reason"))
+
+REDIS_LATENCY = histogram("viranum_redis_command_seconds", "Redis command latency", ("command",))
+REDIS_ERRORS = counter("viranum_redis_errors", "Redis command failures", ("command",))
+
+HANDLER_LATENCY = histogram("viranum_handler_seconds", "aiogram handler latency", ("event", "handler"))
+HANDLER_ERRORS = counter("viranum_handler_errors", "aiogram handler exceptions", ("event", "handler", "error"))
+
+ORDER_EVENT_LATENCY = histogram(
+    "viranum_order_event_seconds", "Order event handling time per consumer group", ("group", "kind")
+)
+ORDER_EVENT_ERRORS = counter("viranum_order_event_errors", "Order event handler failures", ("group", "kind"))
+ORDERS_EXPIRED = counter(
+    "viranum_orders_expired", "Orders closed by the expiry sweeper", ("provider", "action", "result")
+)
+QUOTE_PREFETCHES = counter(
+    "viranum_quote_prefetches", "Speculative operator quote fetches", ("provider", "result")
+)
+UPDATES_THROTTLED = counter(
+    "viranum_updates_throttled", "Updates delayed, degraded or shed by the throttle", ("event", "class", "action")
+)
+
+CACHE_REQUESTS = counter("viranum_cache_requests", "Cache lookups by result", ("cache", "result"))
+
+GAUGES = gauge("viranum_runtime", "Runtime gauges (active orders, queue depths, ...)", ("name",))
+
+
+def cache_hit(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+# ---------------------- HTTP exposition ----------------------
+
+async def metrics_handler(request) -> "object":
+    from aiohttp import web
+
+    return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8")
+
+
+async def start_metrics_server(host: str, port: int) -> Optional[object]:
+    """Serve /metrics on its own port (polling mode has no web server otherwise)."""
+    from aiohttp import web
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    return runner
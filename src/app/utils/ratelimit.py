@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens/second, up to ``capacity`` banked.
+
+    Not thread-safe; meant to be shared between coroutines on one event loop.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take ``tokens`` if available and return 0, else return seconds to wait."""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (tokens - self.tokens) / self.rate
+
+    def reserve(self, max_wait: float, tokens: float = 1.0) -> float:
+        """Take ``tokens`` now, going into debt, if they are due within ``max_wait`` seconds.
+
+        Returns the seconds until they are due (0 if available), or ``inf`` without
+        taking anything when that is longer than ``max_wait``. Unlike ``try_acquire``
+        the debt is recorded, so concurrent callers queue behind each other.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        blocked = max(0.0, self.blocked_until - now)
+        if self.tokens >= tokens and not blocked:
+            self.tokens -= tokens
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        wait = max(blocked, (tokens - self.tokens) / self.rate)
+        if wait > max_wait:
+            return float("inf")
+        self.tokens -= tokens
+        return wait
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def block_for(self, seconds: float) -> None:
+        """Refuse tokens for ``seconds`` (e.g. after a server-side RetryAfter)."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    @property
+    def idle(self) -> bool:
+        now = time.monotonic()
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import builtins
+import os
+import sys
+import time
+from importlib.util import resolve_name
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Startup-time report: how long the process took from exec to importing the
+# app, to being ready for updates, and to handling the first update, plus the
+# slowest imports. Import timing wraps builtins.__import__ while src.app.main
+# is being imported (same idea as `python -X importtime`, in-process) and is
+# removed right after, so it costs nothing at runtime. Stdlib only: this module
+# is imported before anything heavy.
+
+
+def _process_started_at() -> Optional[float]:
+    """Wall-clock start of this process from /proc (Linux); None elsewhere."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            btime = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return btime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration, AttributeError):
+        return None
+
+
+class StartupReport:
+    def __init__(self) -> None:
+        self.t0 = time.perf_counter()
+        self.wall0 = time.time()
+        self.phases: List[Tuple[str, float]] = []  # (name, seconds since t0)
+        self.imports: Dict[str, float] = {}  # module -> self time (s)
+        self._stack: List[List[float]] = []  # child time accumulators of imports in progress
+        self._orig_import: Optional[Callable[..., Any]] = None
+        self.first_update: Optional[float] = None
+
+    # ---------------- import timing ----------------
+    def _timed_import(self, name: str, globals=None, locals=None, fromlist=(), level: int = 0):
+        orig = self._orig_import
+        assert orig is not None
+        try:
+            full = resolve_name("." * level + name, globals.get("__package__")) if level and globals else name
+        except (ImportError, ValueError):
+            full = name
+        if full in sys.modules:
+            return orig(name, globals, locals, fromlist, level)
+        self._stack.append([0.0])
+        start = time.perf_counter()
+        try:
+            return orig(name, globals, locals, fromlist, level)
+        finally:
+            total = time.perf_counter() - start
+            children = self._stack.pop()[0]
+            self.imports[full] = self.imports.get(full, 0.0) + max(0.0, total - children)
+            if self._stack:
+                self._stack[-1][0] += total
+
+    def trace_imports(self) -> None:
+        if self._orig_import is None:
+            self._orig_import = builtins.__import__
+            builtins.__import__ = self._timed_import
+
+    def stop_tracing_imports(self) -> None:
+        if self._orig_import is not None:
+            builtins.__import__ = self._orig_import
+            self._orig_import = None
+
+    # ---------------- phases ----------------
+    def mark(self, phase: str) -> None:
+        self.phases.append((phase, time.perf_counter() - self.t0))
+
+    async def first_update_middleware(self, handler: Callable[..., Awaitable[Any]], event: Any, data: Dict[str, Any]) -> Any:
+        """Outer update middleware: logs the report once the first update has been handled."""
+        if self.first_update is not None:
+            return await handler(event, data)
+        try:
+            return await handler(event, data)
+        finally:
+            if self.first_update is None:
+                self.first_update = time.perf_counter() - self.t0
+                self.mark("first_update")
+                self.log()
+
+    # ---------------- output ----------------
+    def by_package(self) -> List[Tuple[str, float]]:
+        out: Dict[str, float] = {}
+        for mod, sec in self.imports.items():
+            root = "src.app" if mod.startswith("src.app") else mod.split(".", 1)[0]
+            out[root] = out.get(root, 0.0) + sec
+        return sorted(out.items(), key=lambda kv: -kv[1])
+
+    def as_dict(self, top: int = 10) -> Dict[str, Any]:
+        started = _process_started_at()
+        return {
+            "exec_to_import_ms": round((self.wall0 - started) * 1000, 1) if started else None,
+            "phases_ms": {name: round(sec * 1000, 1) for name, sec in self.phases},
+            "imports_ms": {k: round(v * 1000, 1) for k, v in self.by_package()[:top]},
+            "slowest_modules_ms": {
+                k: round(v * 1000, 1) for k, v in sorted(self.imports.items(), key=lambda kv: -kv[1])[:top]
+            },
+            "modules_loaded": len(sys.modules),
+        }
+
+    def log(self) -> None:
+        from loguru import logger
+
+        report = self.as_dict()
+        logger.bind(startup=report).info(
+            "Startup: {} | imports by package (ms): {}",
+            ", ".join(f"{k} {v} ms" for k, v in report["phases_ms"].items()),
+            report["imports_ms"],
+        )
+
+
+startup = StartupReport()
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import random
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from . import codec
+
+# Per-update span trees. The root span is opened by the update middleware and
+# lives in a ContextVar, so Redis, provider and Telegram calls made anywhere
+# below the handler attach themselves without any plumbing. Outside an update
+# (pollers, outbox workers, background refreshes) span() is a no-op.
+
+_current: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "end", "error", "children", "trace")
+
+    def __init__(self, name: str, attrs: Dict[str, Any], trace: "Trace") -> None:
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+        self.children: List[Span] = []
+        self.trace = trace
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000.0
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "name": self.name,
+            "at_ms": round((self.start - origin) * 1000.0, 2),
+            "ms": round(self.duration_ms, 2),
+        }
+        if self.attrs:
+            out["attrs"] = self.attrs
+        if self.error:
+            out["error"] = self.error
+        if self.children:
+            out["children"] = [c.to_dict(origin) for c in self.children]
+        return out
+
+
+class Trace:
+    def __init__(self, name: str, attrs: Dict[str, Any], max_spans: int = 200) -> None:
+        self.max_spans = max_spans
+        self.spans = 1
+        self.dropped = 0
+        self.finished = False
+        self.root = Span(name, attrs, self)
+
+    def breakdown(self) -> Dict[str, float]:
+        """Total milliseconds per top-level span kind (redis, provider, telegram, ...)."""
+        totals: Dict[str, float] = {}
+        stack = list(self.root.children)
+        while stack:
+            s = stack.pop()
+            kind = s.name.split(".", 1)[0]
+            if kind == "handler":
+                stack.extend(s.children)
+                continue
+            totals[kind] = round(totals.get(kind, 0.0) + s.duration_ms, 2)
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {
+            "total_ms": round(self.root.duration_ms, 2),
+            "breakdown": self.breakdown(),
+            "spans": self.root.to_dict(self.root.start),
+        }
+        if self.dropped:
+            out["dropped_spans"] = self.dropped
+        return out
+
+
+class _SpanScope:
+    __slots__ = ("_parent", "_name", "_attrs", "_span", "_token")
+
+    def __init__(self, parent: Span, name: str, attrs: Dict[str, Any]) -> None:
+        self._parent = parent
+        self._name = name
+        self._attrs = attrs
+        self._span: Optional[Span] = None
+        self._token = None
+
+    def __enter__(self) -> Optional[Span]:
+        trace = self._parent.trace
+        if trace.spans >= trace.max_spans:
+            trace.dropped += 1
+            return None
+        trace.spans += 1
+        self._span = Span(self._name, self._attrs, trace)
+        self._parent.children.append(self._span)
+        self._token = _current.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._span is None:
+            return
+        self._span.end = time.perf_counter()
+        if exc_type is not None:
+            self._span.error = exc_type.__name__
+        _current.reset(self._token)
+
+
+class _NoopScope:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+_NOOP = _NoopScope()
+
+
+def span(name: str, /, **attrs: Any):
+    """Child span of the current update's trace; no-op when nothing is being traced."""
+    parent = _current.get()
+    if parent is None or parent.trace.finished:
+        return _NOOP
+    return _SpanScope(parent, name, attrs)
+
+
+def current_trace() -> Optional[Trace]:
+    parent = _current.get()
+    return parent.trace if parent is not None else None
+
+
+class Tracer:
+    """Opens a root span per update and decides what gets written out.
+
+    Every update is recorded (a span is a handful of attributes, capped at
+    ``max_spans``). Updates slower than ``slow_ms`` always go to the slow-log
+    with their full tree; the rest are emitted with probability ``sample_rate``.
+    """
+
+    def __init__(self, slow_ms: float, sample_rate: float, max_spans: int = 200) -> None:
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.max_spans = max_spans
+
+    def start(self, name: str, /, **attrs: Any):
+        trace = Trace(name, attrs, self.max_spans)
+        token = _current.set(trace.root)
+        return trace, token
+
+    def finish(self, trace: Trace, token, error: Optional[BaseException] = None) -> None:
+        trace.root.end = time.perf_counter()
+        trace.finished = True
+        if error is not None:
+            trace.root.error = type(error).__name__
+        _current.reset(token)
+        self.emit(trace)
+
+    def emit(self, trace: Trace) -> None:
+        total = trace.root.duration_ms
+        if total >= self.slow_ms:
+            kind = "slow"
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            kind = "sample"
+        else:
+            return
+        payload = codec.dumps_str({"kind": kind, **trace.to_dict()})
+        # the JSON line goes to TRACE_LOG_PATH as-is (see utils/logger.py)
+        log = logger.bind(trace=kind, trace_json=payload)
+        if kind == "slow":
+            log.warning("slow update {:.0f}ms {}", total, payload)
+        else:
+            log.info("trace {}", payload)
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from loguru import logger
+
+from .config import settings
+from .services.redis_client import get_redis_client
+from .utils.metrics import metrics_handler
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """Webhook handler that acks Telegram immediately and processes updates
+    in the background, with at most ``max_concurrency`` updates in flight.
+
+    At most ``max_pending`` updates are accepted but not yet finished; past that
+    the webhook answers 503 without acking, so Telegram keeps the update and
+    redelivers it (to this or another replica) instead of it piling up here.
+    On shutdown the accepted updates get ``drain_seconds`` to finish."""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        *,
+        max_concurrency: int = 0,
+        max_pending: int = 0,
+        drain_seconds: float = 0,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, **kwargs)
+        self._sem: Optional[asyncio.Semaphore] = (
+            asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        )
+        self.max_pending = max_pending
+        self.drain_seconds = drain_seconds
+        self.in_flight = 0  # updates being processed (holding the semaphore)
+        self.rejected = 0
+        self._closing = False
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        if self._closing or 0 < self.max_pending <= self.pending:
+            # not acked: Telegram retries the update later
+            self.rejected += 1
+            return web.Response(status=503, headers={"Retry-After": "1"})
+        return await super()._handle_request_background(bot, request)
+
+    async def _background_feed_update(self, bot: Bot, update: Dict[str, Any]) -> None:
+        if self._sem is None:
+            await self._feed(bot, update)
+            return
+        async with self._sem:
+            await self._feed(bot, update)
+
+    async def _feed(self, bot: Bot, update: Dict[str, Any]) -> None:
+        self.in_flight += 1
+        try:
+            await super()._background_feed_update(bot, update)
+        finally:
+            self.in_flight -= 1
+
+    @property
+    def pending(self) -> int:
+        """Acked updates not finished yet (waiting for the semaphore or in flight)."""
+        return len(self._background_feed_update_tasks)
+
+    async def close(self) -> None:
+        # The site has stopped accepting requests by now; let acked updates finish
+        # before the bot session (and, after us, the dispatcher storage) goes away.
+        self._closing = True
+        tasks = set(self._background_feed_update_tasks)
+        if tasks:
+            logger.info("Webhook draining {} pending updates", len(tasks))
+            _, left = await asyncio.wait(tasks, timeout=self.drain_seconds or None)
+            if left:
+                logger.warning("Webhook shutdown dropped {} unfinished updates", len(left))
+                for t in left:
+                    t.cancel()
+                await asyncio.gather(*left, return_exceptions=True)
+        await super().close()
+
+
+def build_webhook_app(dp: Dispatcher, bot: Bot) -> web.Application:
+    if not settings.WEBHOOK_SECRET:
+        raise RuntimeError("WEBHOOK_SECRET is required when BOT_MODE=webhook")
+
+    app = web.Application()
+    handler = BoundedRequestHandler(
+        dp,
+        bot,
+        max_concurrency=settings.WEBHOOK_MAX_CONCURRENCY,
+        max_pending=settings.WEBHOOK_MAX_PENDING,
+        drain_seconds=settings.WEBHOOK_DRAIN_SECONDS,
+        secret_token=settings.WEBHOOK_SECRET,
+    )
+    handler.register(app, path=settings.WEBHOOK_PATH)
+    app["webhook_handler"] = handler
+
+    async def healthz(request: web.Request) -> web.Response:
+        # Used by the load balancer: a replica without Redis cannot serve FSM state
+        redis_ok = True
+        try:
+            r = get_redis_client()
+            if r is None:
+                raise RuntimeError("redis unavailable")
+            await asyncio.wait_for(r.ping(), timeout=2)
+        except Exception:
+            redis_ok = False
+        body = {
+            "status": "ok" if redis_ok else "degraded",
+            "redis": redis_ok,
+            "in_flight": handler.in_flight,
+            "pending": handler.pending,
+            "rejected": handler.rejected,
+        }
+        return web.json_response(body, status=200 if redis_ok else 503)
+
+    app.router.add_get("/healthz", healthz)
+    if settings.METRICS_ENABLED:
+        app.router.add_get("/metrics", metrics_handler)
+
+    async def on_startup(_: web.Application) -> None:
+        if not settings.WEBHOOK_SET_ON_STARTUP:
+            return
+        if not settings.WEBHOOK_BASE_URL:
+            logger.warning("WEBHOOK_BASE_URL is empty; skipping setWebhook")
+            return
+        url = settings.WEBHOOK_BASE_URL.rstrip("/") + settings.WEBHOOK_PATH
+        # Every replica registers the same URL/secret, so this is idempotent, and
+        # updates Telegram still holds (not yet acked) survive a rolling restart.
+        # Updates a replica already acked survive only if they finish within
+        # WEBHOOK_DRAIN_SECONDS of its shutdown (see BoundedRequestHandler.close).
+        await bot.set_webhook(
+            url,
+            secret_token=settings.WEBHOOK_SECRET,
+            max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=False,
+        )
+        logger.info("Webhook set to {}", url)
+
+    app.on_startup.append(on_startup)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    app = build_webhook_app(dp, bot)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.WEBHOOK_HOST, port=settings.WEBHOOK_PORT)
+    await site.start()
+    logger.info("Webhook server listening on {}:{}", settings.WEBHOOK_HOST, settings.WEBHOOK_PORT)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()